@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Hava Durumu Server Mikro Benchmark'ları
+
+Ağa çıkmadan ölçülebilen sıcak yolları karşılaştırır.
+
+Kullanım:
+    python benchmark.py
+"""
+
+import json
+import re
+import timeit
+
+from server import WeatherAssistant, _normalize_weather, _render, advice_rules, parse_intent
+
+# Türkçe ve İngilizce örnek mesajlar
+MESSAGES = [
+    "Merhaba",
+    "Selam, nasılsın?",
+    "Yardım",
+    "Teşekkürler!",
+    "İstanbul için hava durumu",
+    "Ankara hava",
+    "Ankara'nın hava durumu nedir?",
+    "İzmir'de hava nasıl?",
+    "şehir: Bursa",
+    "Enlem: 41.0082, Boylam: 28.9784",
+    "lat: 39.9334 lon: 32.8597",
+    "39.9334, 32.8597",
+    "Bugün yağmur yağacak mı?",
+    "hello",
+    "thank you so much",
+    "what's the weather in London",
+    "weather for Paris please",
+    "latitude 40.7128 longitude -74.0060",
+    "Can you help me?",
+    "Bu akşam dışarı çıkmalı mıyım, hava soğuk olacak mı acaba bilmiyorum",
+]
+
+# Karşılaştırma için eski sırayla çalışan regex/anahtar kelime taraması
+LEGACY_COORD_PATTERNS = [
+    r'enlem[:\s]*(-?\d+\.?\d*)[,\s]*boylam[:\s]*(-?\d+\.?\d*)',
+    r'lat[:\s]*(-?\d+\.?\d*)[,\s]*lon[:\s]*(-?\d+\.?\d*)',
+    r'latitude[:\s]*(-?\d+\.?\d*)[,\s]*longitude[:\s]*(-?\d+\.?\d*)',
+    r'(-?\d+\.?\d*)[,\s]+(-?\d+\.?\d*)'
+]
+
+LEGACY_CITY_PATTERNS = [
+    r'(?:şehir|city|konum|location)[:\s]*([a-zA-ZğüşıöçĞÜŞİÖÇ]+)',
+    r'([a-zA-ZğüşıöçĞÜŞİÖÇ]+)(?:\s+için\s+hava|\s+hava)',
+    r'([a-zA-ZğüşıöçĞÜŞİÖÇ]+)(?:\s+için)',
+]
+
+def legacy_parse(message: str) -> tuple:
+    """Önceki chat_weather_assistant çözümleme adımları"""
+    message = message.lower().strip()
+
+    for pattern in LEGACY_COORD_PATTERNS:
+        match = re.search(pattern, message)
+        if match:
+            try:
+                lat = float(match.group(1))
+                lon = float(match.group(2))
+                if -90 <= lat <= 90 and -180 <= lon <= 180:
+                    return "koordinat", {"enlem": lat, "boylam": lon}
+                return "geçersiz_koordinat", {"enlem": lat, "boylam": lon}
+            except ValueError:
+                continue
+
+    for pattern in LEGACY_CITY_PATTERNS:
+        match = re.search(pattern, message)
+        if match:
+            city_name = match.group(1).strip()
+            if len(city_name) > 2:
+                return "şehir", {"şehir": city_name}
+
+    if any(word in message for word in ['merhaba', 'selam', 'hello', 'hi']):
+        return "selamlama", {}
+    elif any(word in message for word in ['teşekkür', 'sağol', 'thanks', 'thank you']):
+        return "teşekkür", {}
+    elif any(word in message for word in ['yardım', 'help', 'nasıl']):
+        return "yardım", {}
+    return "bilinmiyor", {}
+
+def bench(name: str, func, corpus: list, repeat: int = 5, number: int = 2000, unit: str = "mesaj") -> float:
+    """Fonksiyonu tüm örnekler üzerinde çalıştırır, örnek başına en iyi süreyi (µs) döndürür"""
+    def run():
+        for message in corpus:
+            func(message)
+
+    best = min(timeit.repeat(run, repeat=repeat, number=number))
+    per_message = best / (number * len(corpus)) * 1e6
+    print(f"  {name:<22} {per_message:8.2f} µs/{unit}")
+    return per_message
+
+def bench_intent_parser() -> None:
+    print("🧭 Niyet çözümleme")
+    legacy = bench("eski (regex döngüsü)", legacy_parse, MESSAGES)
+    current = bench("parse_intent", parse_intent, MESSAGES)
+    print(f"  hızlanma: {legacy / current:.1f}x")
+
+# Asistan biçimlendirmesi için örnek OpenWeatherMap yanıtları
+def _sample_payload(name: str, lat: float, lon: float, temp: float, main: str, description: str,
+                    rain: float = 0) -> dict:
+    payload = {
+        "coord": {"lat": lat, "lon": lon},
+        "weather": [{"id": 500 if rain else 800, "main": main, "description": description, "icon": "01d"}],
+        "main": {"temp": temp, "feels_like": temp - 1.2, "temp_min": temp - 2, "temp_max": temp + 2,
+                 "pressure": 1013, "humidity": 64},
+        "visibility": 10000,
+        "wind": {"speed": 4.6, "deg": 200},
+        "clouds": {"all": 20},
+        "sys": {"country": "TR", "sunrise": 1700000000, "sunset": 1700040000},
+        "dt": 1700020000,
+        "timezone": 10800,
+        "name": name
+    }
+    if rain:
+        payload["rain"] = {"1h": rain}
+    return payload
+
+WEATHER_SAMPLES = [
+    _normalize_weather(_sample_payload("Istanbul", 41.0082, 28.9784, 18.4, "Clear", "açık"), "metric"),
+    _normalize_weather(_sample_payload("Ankara", 39.9334, 32.8597, 4.1, "Rain", "hafif yağmur", rain=0.6), "metric"),
+    _normalize_weather(_sample_payload("Antalya", 36.8969, 30.7133, 31.7, "Clear", "açık"), "metric"),
+]
+
+def legacy_format(weather_data: str) -> str:
+    """Önceki format_weather_response: JSON'u geri okur ve metni += ile biriktirir"""
+    data = json.loads(weather_data)
+    konum = data.get("konum", {})
+    hava = data.get("hava_durumu", {})
+    sicaklik = data.get("sıcaklık", {})
+    atmosfer = data.get("atmosfer", {})
+    ruzgar = data.get("rüzgar", {})
+
+    response = f"🌍 **{konum.get('şehir', 'Bilinmeyen konum')}, {konum.get('ülke', '')}** için hava durumu:\n\n"
+    response += f"🌤️ **Genel Durum:** {hava.get('açıklama', 'Bilinmiyor').title()}\n"
+    birim = sicaklik.get('birim', '°C')
+    response += f"🌡️ **Sıcaklık:** {sicaklik.get('mevcut', 'N/A')}{birim}"
+    if sicaklik.get('hissedilen', 'N/A') != 'N/A':
+        response += f" (Hissedilen: {sicaklik['hissedilen']}{birim})"
+    response += "\n"
+    min_temp = sicaklik.get('minimum', 'N/A')
+    max_temp = sicaklik.get('maksimum', 'N/A')
+    if min_temp != 'N/A' and max_temp != 'N/A':
+        response += f"📊 **Günlük Aralık:** {min_temp}{birim} - {max_temp}{birim}\n"
+    response += f"💧 **Nem:** %{atmosfer.get('nem', 'N/A')}\n"
+    response += f"🔽 **Basınç:** {atmosfer.get('basınç', 'N/A')} hPa\n"
+    response += f"💨 **Rüzgar:** {ruzgar.get('hız', 0)} {ruzgar.get('birim', 'm/s')}\n"
+    if "yağış" in data:
+        response += f"🌧️ **Yağış (Son 1 saat):** {data['yağış'].get('son_1_saat', 0)} mm\n"
+    if "kar" in data:
+        response += f"❄️ **Kar (Son 1 saat):** {data['kar'].get('son_1_saat', 0)} mm\n"
+    response += "\n" + WeatherAssistant()._get_weather_advice(data)
+    return response
+
+def bench_assistant_format() -> None:
+    print("💬 Asistan yanıtı biçimlendirme")
+    assistant = WeatherAssistant()
+
+    # Eski yol: araç JSON üretir, asistan geri okur
+    legacy = bench("eski (JSON gidiş-dönüş)", lambda data: legacy_format(_render(data)),
+                   WEATHER_SAMPLES, number=500, unit="yanıt")
+
+    # Önbelleksiz şablon yolu: her çağrıda metin yeniden üretilir
+    templates = bench("şablonlar", assistant._render, WEATHER_SAMPLES, number=500, unit="yanıt")
+
+    # Tekrarlanan sorgu: aynı konum ve veri zamanı önbellekten döner
+    cached = bench("şablonlar + önbellek", assistant.format_weather_response, WEATHER_SAMPLES, number=500, unit="yanıt")
+
+    print(f"  hızlanma: {legacy / templates:.1f}x (şablon), {legacy / cached:.1f}x (önbellek)")
+
+def legacy_advice(data: dict) -> str:
+    """Önceki _get_weather_advice: eşikler ve ana_durum kontrolleri kodda if/elif zinciri"""
+    sicaklik = data.get("sıcaklık", {}).get("mevcut", 20)
+    nem = data.get("atmosfer", {}).get("nem", 50)
+    ruzgar = data.get("rüzgar", {}).get("hız", 0)
+    hava_durumu = data.get("hava_durumu", {}).get("ana_durum", "").lower()
+
+    advice = "💡 **Tavsiyelerim:**\n"
+    if sicaklik < 0:
+        advice += "🧥 Çok soğuk! Kalın kıyafetler giyin ve sıcak tutun.\n"
+    elif sicaklik < 10:
+        advice += "🧥 Soğuk hava, mont almayı unutmayın!\n"
+    elif sicaklik < 20:
+        advice += "👕 Serin hava, hafif bir ceket yeterli.\n"
+    elif sicaklik < 30:
+        advice += "👕 Güzel hava! Rahat kıyafetler tercih edin.\n"
+    else:
+        advice += "🌞 Çok sıcak! Bol su için ve gölgede kalın.\n"
+
+    if "rain" in hava_durumu or "drizzle" in hava_durumu:
+        advice += "☂️ Yağmur var, şemsiye almayı unutmayın!\n"
+    elif "snow" in hava_durumu:
+        advice += "❄️ Kar yağıyor, dikkatli yürüyün!\n"
+    elif "clear" in hava_durumu:
+        advice += "☀️ Açık hava! Dışarıda vakit geçirmek için harika!\n"
+
+    if ruzgar > 10:
+        advice += "💨 Rüzgarlı hava, saçınızı bağlamayı unutmayın!\n"
+    if nem > 80:
+        advice += "💧 Yüksek nem, serinletici içecekler tercih edin!\n"
+    return advice
+
+def bench_advice_rules() -> None:
+    print("💡 Tavsiye kuralları")
+    assistant = WeatherAssistant()
+    legacy = bench("eski (if/elif)", legacy_advice, WEATHER_SAMPLES, unit="kayıt")
+    single = bench("kural tablosu", assistant._get_weather_advice, WEATHER_SAMPLES, unit="kayıt")
+
+    # Toplu ve alan araçları binlerce kaydı tek çağrıda işaretler
+    batch = WEATHER_SAMPLES * 1000
+    best = min(timeit.repeat(lambda: advice_rules.annotate(batch), repeat=5, number=5))
+    per_record = best / (5 * len(batch)) * 1e6
+    print(f"  {'toplu (3000 kayıt)':<22} {per_record:8.2f} µs/kayıt")
+    print(f"  hızlanma: {legacy / single:.1f}x (tek), {legacy / per_record:.1f}x (toplu)")
+
+if __name__ == "__main__":
+    bench_intent_parser()
+    bench_assistant_format()
+    bench_advice_rules()
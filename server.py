@@ -7,24 +7,2993 @@ hava durumu bilgilerini sağlar. Ayrıca kullanıcı dostu asistan fonksiyonlar
 """
 
 import asyncio
+import bisect
+import heapq
 import json
+import logging
+import math
 import os
+import random
 import re
+import sqlite3
+import tempfile
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import AsyncIterator, Iterable, List, Optional, Union
 
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 yalnızca h2 paketi kuruluysa kullanılır (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# orjson kuruluysa JSON çıktısı onunla üretilir
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# NumPy kuruluysa toplu özetler vektörel hesaplanır, değilse saf Python kullanılır
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # OpenWeatherMap API anahtarı - çevre değişkeninden al, yoksa varsayılan kullan
 API_KEY = os.getenv("OPENWEATHER_API_KEY", "6b2e97b1b6559436aee37b83b71412b3")
 BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
 DEFAULT_UNITS = os.getenv("DEFAULT_UNITS", "metric")
 LANGUAGE = os.getenv("LANGUAGE", "tr")
 
+# Çıktı biçimi: pretty (girintili), compact (boşluksuz) veya minimal (boşluksuz, temel alanlar)
+OUTPUT_MODE = os.getenv("OUTPUT_MODE", "pretty")
+
+# Bağlantı havuzu ve zaman aşımı ayarları (saniye)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "5"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+
+# Geçici hatalarda (bağlantı hataları, 5xx) yeniden deneme ve devre kesici ayarları
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_RETRY_BASE_DELAY = float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.25"))
+HTTP_RETRY_MAX_DELAY = float(os.getenv("HTTP_RETRY_MAX_DELAY", "2"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+
+# OpenWeatherMap kota ayarları: dakikalık ve günlük çağrı bütçesi (0 = sınırsız)
+# ve bütçe aşıldığında bir isteğin sırada bekleyebileceği en uzun süre (saniye)
+OWM_CALLS_PER_MINUTE = int(os.getenv("OWM_CALLS_PER_MINUTE", "60"))
+OWM_CALLS_PER_DAY = int(os.getenv("OWM_CALLS_PER_DAY", "0"))
+RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "5"))
+
+# Yanıt önbelleği ayarları: koordinat ızgarası (derece), TTL (saniye) ve kayıt sınırı
+WEATHER_CACHE_GRID = float(os.getenv("WEATHER_CACHE_GRID", "0.01"))
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "600"))
+# Süresi dolan kayıtların bayat olarak sunulabileceği en uzun yaş (saniye).
+# Bu süre içindeki kayıtlar API'ye ulaşılamadığında ya da kota dolduğunda yedek
+# olarak döndürülür.
+WEATHER_CACHE_STALE_TTL = float(os.getenv("WEATHER_CACHE_STALE_TTL", "3600"))
+# Açıksa bayat kayıt beklemeden döndürülür ve arka planda yenilenir; güncel veri
+# ancak sonraki isteğe ulaştığından varsayılan olarak kapalıdır
+STALE_WHILE_REVALIDATE = os.getenv("STALE_WHILE_REVALIDATE", "false").lower() in ("1", "true", "yes")
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "1024"))
+CITY_CACHE_MAX_ENTRIES = int(os.getenv("CITY_CACHE_MAX_ENTRIES", "4096"))
+# Asistanın hazır metin önbelleğindeki en fazla kayıt sayısı
+ASSISTANT_CACHE_MAX_ENTRIES = int(os.getenv("ASSISTANT_CACHE_MAX_ENTRIES", "1024"))
+# Asistan sohbet oturumları: en fazla oturum, boşta kalma süresi (saniye)
+# ve oturum başına hatırlanan son sorgu sayısı
+ASSISTANT_MAX_SESSIONS = int(os.getenv("ASSISTANT_MAX_SESSIONS", "4096"))
+ASSISTANT_SESSION_TTL = float(os.getenv("ASSISTANT_SESSION_TTL", "1800"))
+ASSISTANT_SESSION_HISTORY = max(0, int(os.getenv("ASSISTANT_SESSION_HISTORY", "5")))
+
+# Bu mesafe (km) içindeki koordinatlar önbellek anahtarında en yakın bilinen
+# şehre ya da izleme listesi noktasına yapıştırılır (0 = kapalı)
+WEATHER_CACHE_SNAP_KM = float(os.getenv("WEATHER_CACHE_SNAP_KM", "0"))
+
+# Serileştirilmiş yanıt önbelleğinin bayt cinsinden üst sınırı (0 = kapalı)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+# 5 günlük tahmin 3 saatte bir güncellendiğinden daha uzun süre önbellekte tutulur
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "1800"))
+
+# Yeniden başlatmalarda korunan disk önbelleği (boş bırakılırsa kapalı)
+WEATHER_DISK_CACHE_PATH = os.getenv(
+    "WEATHER_DISK_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "weather_mcp_cache.sqlite3")
+)
+WEATHER_DISK_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_DISK_CACHE_MAX_ENTRIES", "20000"))
+
+# Ön ısıtma: izleme listesi dosyası ve ön ısıtmanın kullanabileceği API bütçesi payı
+# (0-1 aralığına sınırlanır; 0 ön ısıtmayı kapatır)
+WATCHLIST_FILE = os.getenv("WATCHLIST_FILE", "")
+PREWARM_QUOTA_SHARE = min(1.0, max(0.0, float(os.getenv("PREWARM_QUOTA_SHARE", "0.5"))))
+
+# Çevrimdışı şehir sözlüğü; GeoNames cities*.txt dosyası da verilebilir (boş bırakılırsa kapalı)
+GAZETTEER_FILE = os.getenv(
+    "GAZETTEER_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cities.tsv")
+)
+
+# Hava durumu açıklamalarının dil tablosu: koşul kodu → dile göre açıklama
+CONDITIONS_FILE = os.getenv(
+    "CONDITIONS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "conditions.json")
+)
+
+# Asistan ve toplu sorgu tavsiyelerinin kural dosyası
+ADVICE_RULES_FILE = os.getenv(
+    "ADVICE_RULES_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "advice_rules.json")
+)
+
+# Toplu sorgu ayarları
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "10"))
+BATCH_MAX_LOCATIONS = int(os.getenv("BATCH_MAX_LOCATIONS", "500"))
+
+# Alan örneklemesinde tek sorgudaki en fazla ızgara hücresi
+AREA_MAX_CELLS = int(os.getenv("AREA_MAX_CELLS", "400"))
+
+# ============================================================================
+# PAYLAŞILAN HTTP İSTEMCİSİ
+# ============================================================================
+
+class PoolStats:
+    """Bağlantı havuzu istatistiklerini tutar"""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections_opened = 0
+        self.retries = 0
+
+    async def trace(self, event_name: str, info: dict) -> None:
+        """httpcore trace olaylarından yeni açılan bağlantıları sayar"""
+        if event_name == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "istek_sayısı": self.requests,
+            "açılan_bağlantı": self.connections_opened,
+            "yeniden_kullanılan_bağlantı": max(0, self.requests - self.connections_opened),
+            "yeniden_deneme": self.retries,
+            "limitler": {
+                "maksimum_bağlantı": HTTP_MAX_CONNECTIONS,
+                "maksimum_keepalive": HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                "keepalive_süresi": HTTP_KEEPALIVE_EXPIRY
+            }
+        }
+
+pool_stats = PoolStats()
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_http_client_guard = None
+_lifespan_users = 0
+
+def _create_http_client() -> httpx.AsyncClient:
+    """Havuz limitleri ve aşama bazlı zaman aşımları ile yeni bir istemci oluşturur"""
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(
+            connect=HTTP_CONNECT_TIMEOUT,
+            read=HTTP_READ_TIMEOUT,
+            write=HTTP_WRITE_TIMEOUT,
+            pool=HTTP_POOL_TIMEOUT
+        )
+    )
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Süreç boyunca paylaşılan HTTP istemcisini döndürür.
+
+    İstemci normalde server başlarken oluşturulur. Araçlar doğrudan (örneğin test
+    betiklerinden) çağrıldığında ilk kullanımda oluşturulur; bağlantılar event
+    loop'a bağlı olduğundan loop değişirse istemci yeniden oluşturulur.
+    """
+    global _http_client, _http_client_loop, _http_client_guard
+
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _retire_http_client(_http_client, _http_client_loop)
+        _http_client = _create_http_client()
+        _http_client_loop = loop
+
+        # Loop kapanırken (örneğin asyncio.run sonunda) istemci de kapatılır
+        _http_client_guard = _close_on_loop_shutdown(_http_client)
+        asyncio.ensure_future(_http_client_guard.__anext__())
+    return _http_client
+
+async def _close_on_loop_shutdown(client: httpx.AsyncClient):
+    """
+    İstemciyi bağlı olduğu loop kapanmadan önce kapatan async generator.
+
+    asyncio, loop'u kapatmadan önce askıda kalan async generator'ları loop
+    hâlâ çalışırken kapatır (shutdown_asyncgens). Bağlantılar yalnızca kendi
+    loop'larında kapatılabildiğinden havuz bu sırada boşaltılır.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+def _retire_http_client(client: Optional[httpx.AsyncClient], loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Yerine yenisi oluşturulan istemcinin bağlantılarını kendi loop'unda kapatır"""
+    if client is None or client.is_closed:
+        return
+    if loop is not None and not loop.is_closed():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        # Loop shutdown_asyncgens çağrılmadan kapatıldıysa bağlantılar artık kapatılamaz
+        logger.debug("Kapanmış loop'a bağlı HTTP istemcisi kapatılamadı")
+
+async def close_http_client() -> None:
+    """Paylaşılan HTTP istemcisini kapatır"""
+    global _http_client, _http_client_loop, _http_client_guard
+
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+    _http_client_guard = None
+
+def _backoff_delay(attempt: int) -> float:
+    """Üstel geri çekilme süresini tam rastgele sapma (full jitter) ile hesaplar"""
+    return random.uniform(0, min(HTTP_RETRY_MAX_DELAY, HTTP_RETRY_BASE_DELAY * 2 ** attempt))
+
+async def _get_with_retries(url: str, params: dict, max_wait: float) -> httpx.Response:
+    """GET isteğini bağlantı hatalarında ve 5xx yanıtlarında sınırlı sayıda yeniden dener"""
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        # Her deneme API bütçesinden ayrı bir jeton harcar
+        await rate_limiter.acquire(max_wait)
+
+        client = get_http_client()
+        pool_stats.requests += 1
+        try:
+            response = await client.get(url, params=params, extensions={"trace": pool_stats.trace})
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == HTTP_MAX_RETRIES:
+                return response
+        except httpx.TransportError:
+            if attempt == HTTP_MAX_RETRIES:
+                raise
+
+        pool_stats.retries += 1
+        await asyncio.sleep(_backoff_delay(attempt))
+
+async def _owm_get(url: str, params: dict, max_wait: float = RATE_LIMIT_MAX_WAIT) -> dict:
+    """
+    OpenWeatherMap'e paylaşılan istemci üzerinden GET isteği atar ve JSON döndürür.
+
+    max_wait, API bütçesi doluyken isteğin sırada bekleyebileceği en uzun süredir.
+    """
+    # Servis sağlıksızken ağa hiç çıkmadan hemen hata ver
+    circuit_breaker.check()
+
+    healthy = None
+    try:
+        response = await _get_with_retries(url, params, max_wait)
+        # 4xx yanıtları (şehir bulunamadı, 429 vb.) servisin ayakta olduğunu gösterir
+        healthy = response.status_code < 500
+        if response.status_code == 429:
+            rate_limiter.throttle()
+        response.raise_for_status()
+        return response.json()
+    except httpx.TransportError:
+        healthy = False
+        raise
+    finally:
+        circuit_breaker.record(healthy)
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP):
+    """Server başlarken HTTP istemcisini ve ön ısıtmayı başlatır, kapanırken durdurur"""
+    global _lifespan_users
+
+    # Lifespan oturum başına çalışabildiğinden kaynaklar son kullanıcıyla kapatılır
+    _lifespan_users += 1
+    get_http_client()
+    prewarmer.start()
+    try:
+        yield
+    finally:
+        _lifespan_users -= 1
+        if _lifespan_users == 0:
+            await prewarmer.stop()
+            await close_http_client()
+
+# ============================================================================
+# KOTA YÖNETİMİ
+# ============================================================================
+
+class RateLimitExceeded(Exception):
+    """API çağrı bütçesi bekleme süresi içinde açılmadığında fırlatılır"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"API istek limiti aşıldı, {retry_after:.1f} saniye sonra tekrar deneyin")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Belirli bir sürede kapasitesi kadar dolan jeton kovası"""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Bir jeton için beklenmesi gereken süre (saniye)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        self.tokens -= 1
+
+    def drain(self) -> None:
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+    def remaining(self) -> int:
+        self._refill()
+        return int(self.tokens)
+
+class RateLimiter:
+    """Tüm araçların paylaştığı dakikalık ve günlük API çağrı bütçesi"""
+
+    def __init__(self, per_minute: int, per_day: int):
+        self.buckets = {}
+        if per_minute > 0:
+            self.buckets["dakikalık"] = TokenBucket(per_minute, 60)
+        if per_day > 0:
+            self.buckets["günlük"] = TokenBucket(per_day, 86400)
+        self.acquired = 0
+        self.queued = 0
+        self.rejected = 0
+        self.throttled = 0
+
+    def _wait_time(self) -> float:
+        return max((bucket.wait_time() for bucket in self.buckets.values()), default=0.0)
+
+    async def acquire(self, max_wait: float) -> None:
+        """
+        Bir API çağrısı için bütçeden jeton alır.
+
+        Bütçe doluysa en fazla max_wait saniye sırada bekler; bu sürede jeton
+        açılmayacaksa RateLimitExceeded fırlatır.
+        """
+        deadline = time.monotonic() + max_wait
+        waited = False
+        while True:
+            wait = self._wait_time()
+            if wait <= 0:
+                for bucket in self.buckets.values():
+                    bucket.consume()
+                self.acquired += 1
+                return
+
+            if time.monotonic() + wait > deadline:
+                self.rejected += 1
+                raise RateLimitExceeded(wait)
+
+            if not waited:
+                self.queued += 1
+                waited = True
+            await asyncio.sleep(wait)
+
+    def has_headroom(self, reserve: float) -> bool:
+        """Her kovada kapasitenin reserve oranından fazla jeton kalmışsa True döner"""
+        return all(
+            bucket.remaining() >= 1 + bucket.capacity * reserve
+            for bucket in self.buckets.values()
+        )
+
+    def throttle(self) -> None:
+        """API 429 döndürdüğünde dakikalık bütçeyi boşaltır"""
+        self.throttled += 1
+        bucket = self.buckets.get("dakikalık")
+        if bucket is not None:
+            bucket.drain()
+
+    def snapshot(self) -> dict:
+        return {
+            "limitler": {name: bucket.capacity for name, bucket in self.buckets.items()},
+            "kalan": {name: bucket.remaining() for name, bucket in self.buckets.items()},
+            "kullanılan": self.acquired,
+            "bekletilen": self.queued,
+            "reddedilen": self.rejected,
+            "api_429": self.throttled
+        }
+
+rate_limiter = RateLimiter(OWM_CALLS_PER_MINUTE, OWM_CALLS_PER_DAY)
+
+# ============================================================================
+# DEVRE KESİCİ
+# ============================================================================
+
+class CircuitOpenError(Exception):
+    """Devre açıkken (servis sağlıksızken) yapılan çağrılarda fırlatılır"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Hava durumu servisi geçici olarak yanıt vermiyor, {retry_after:.1f} saniye sonra tekrar deneyin")
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """
+    Art arda başarısız olan API çağrılarından sonra devreyi açan kesici.
+
+    Devre açıkken çağrılar ağa çıkmadan reddedilir. Bekleme süresi dolunca
+    yarı açık duruma geçilir ve tek bir deneme çağrısına izin verilir; bu
+    çağrı başarılıysa devre kapanır, başarısızsa yeniden açılır.
+    """
+
+    CLOSED = "kapalı"
+    OPEN = "açık"
+    HALF_OPEN = "yarı_açık"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def check(self) -> None:
+        """Çağrıya izin verilmiyorsa CircuitOpenError fırlatır"""
+        if self.state == self.OPEN:
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(remaining)
+            self.state = self.HALF_OPEN
+
+        if self.state == self.HALF_OPEN:
+            if self.probe_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(0)
+            self.probe_in_flight = True
+
+    def record(self, healthy: Optional[bool]) -> None:
+        """Çağrının sonucunu kaydeder; None sonuç durumu değiştirmez"""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+
+        if healthy is None:
+            return
+
+        if healthy:
+            self.state = self.CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "durum": self.state,
+            "ardışık_hata": self.failures,
+            "hata_eşiği": self.failure_threshold,
+            "bekleme_saniye": self.reset_timeout,
+            "açılma_sayısı": self.times_opened,
+            "reddedilen": self.rejected
+        }
+
+circuit_breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+# ============================================================================
+# YANIT ÖNBELLEĞİ
+# ============================================================================
+
+class TTLCache:
+    """
+    Süre sınırlı (TTL) ve boyut sınırlı (LRU) bellek içi önbellek.
+
+    Kayıtlar ttl süresince taze, stale_ttl süresine kadar bayat kabul edilir.
+    Bayat kayıtlar hemen yanıt vermek ya da API'ye ulaşılamadığında yedek
+    olarak kullanılmak üzere tutulur; stale_ttl aşıldığında silinir.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, stale_ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else max(ttl, stale_ttl)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _entry(self, key) -> Optional[tuple]:
+        """Kaydı (değer, yaş_saniye) olarak döndürür; stale_ttl'yi aşan kaydı siler"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, value = entry
+        age = time.time() - stored_at
+        if age > self.stale_ttl:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+
+        return value, age
+
+    def get(self, key):
+        """Taze kaydı döndürür, yoksa None"""
+        entry = self._entry(key)
+        if entry is None or entry[1] > self.ttl:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def lookup(self, key) -> Optional[tuple]:
+        """Taze ya da bayat kaydı (değer, yaş_saniye) olarak döndürür, yoksa None"""
+        entry = self._entry(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if entry[1] > self.ttl:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get_stale(self, key) -> Optional[tuple]:
+        """İstatistikleri etkilemeden kaydı (değer, yaş_saniye) olarak döndürür, yoksa None"""
+        return self._entry(key)
+
+    def set(self, key, value, stored_at: Optional[float] = None) -> None:
+        """Kaydı ekler; sınır aşılırsa en eski kullanılan kayıt çıkarılır"""
+        self._entries[key] = (time.time() if stored_at is None else stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def prune(self) -> int:
+        """
+        stale_ttl'yi aşmış kayıtları en eski kullanılandan başlayarak siler.
+
+        Süresi dolmamış ilk kayıtta durur; her erişimde set ile yenilenen
+        kayıtlarda (sohbet oturumları gibi) bu, süresi dolan tüm kayıtlardır.
+        """
+        now = time.time()
+        removed = 0
+        while self._entries:
+            key, (stored_at, _) = next(iter(self._entries.items()))
+            if now - stored_at <= self.stale_ttl:
+                break
+            del self._entries[key]
+            removed += 1
+        self.expirations += removed
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> dict:
+        return {
+            "kayıt_sayısı": len(self._entries),
+            "maksimum_kayıt": self.max_entries,
+            "ttl_saniye": None if self.ttl == float("inf") else self.ttl,
+            "bayat_ttl_saniye": None if self.stale_ttl == float("inf") else self.stale_ttl,
+            "isabet": self.hits,
+            "bayat_isabet": self.stale_hits,
+            "ıskalama": self.misses,
+            "çıkarılan": self.evictions,
+            "süresi_dolan": self.expirations
+        }
+
+weather_cache = TTLCache(WEATHER_CACHE_TTL, WEATHER_CACHE_MAX_ENTRIES, WEATHER_CACHE_STALE_TTL)
+
+# Şehir koordinatları değişmediğinden şehir → koordinat çözümlemeleri süresiz tutulur
+city_coords_cache = TTLCache(float("inf"), CITY_CACHE_MAX_ENTRIES)
+
+def _cache_key(latitude: float, longitude: float) -> tuple:
+    """
+    Koordinatları ızgara hücresine yuvarlayarak önbellek anahtarı üretir.
+
+    Veriler her zaman CANONICAL_UNITS biriminde ve CANONICAL_LANGUAGE dilinde
+    tutulduğundan anahtar birim ve dilden bağımsızdır; farklı birim ve dillerle
+    gelen istekler aynı kaydı paylaşır.
+    """
+    if WEATHER_CACHE_SNAP_KM > 0:
+        # Bilinen bir noktanın yakınındaki koordinatlar o noktanın kaydını paylaşır
+        site = site_index.nearest_within(latitude, longitude, WEATHER_CACHE_SNAP_KM)
+        if site is not None:
+            latitude, longitude = site["enlem"], site["boylam"]
+    return (
+        round(latitude / WEATHER_CACHE_GRID),
+        round(longitude / WEATHER_CACHE_GRID)
+    )
+
+def _city_key(city_name: str, country_code: str) -> tuple:
+    """Şehir adı ve ülke kodundan büyük/küçük harf ve aksan duyarsız anahtar üretir"""
+    return (normalize_place_name(city_name), country_code.strip().upper())
+
+# ============================================================================
+# ŞEHİR SÖZLÜĞÜ (GAZETTEER)
+# ============================================================================
+
+# Türkçe karakterler aksansız karşılıklarına indirgenir; diğer aksanlar NFKD ile atılır
+_TURKISH_FOLD = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u",
+    "Ç": "c", "Ğ": "g", "I": "i", "İ": "i", "Ö": "o", "Ş": "s", "Ü": "u", "Â": "a", "Î": "i", "Û": "u",
+})
+
+# Serbest metindeki kelimeler; kesme işaretinden sonraki ek dahil ("ankara'da")
+_TEXT_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+
+def normalize_place_name(name: str) -> str:
+    """Yer adını büyük/küçük harf ve aksan duyarsız karşılaştırma anahtarına çevirir"""
+    folded = unicodedata.normalize("NFKD", name.translate(_TURKISH_FOLD).casefold())
+    return " ".join("".join(ch for ch in folded if not unicodedata.combining(ch)).split())
+
+class Gazetteer:
+    """
+    Şehir adlarını API'ye gitmeden koordinatlara çeviren çevrimdışı sözlük.
+
+    Dosya ilk sorguda okunur. Koordinatlar ve nüfus array sütunlarında, adlar
+    sıralı anahtar listesinde tutulur; tam eşleşme ve önek araması bisect ile
+    yapılır. Kendi TSV biçimimizin yanında GeoNames cities*.txt dosyaları da okunur.
+    """
+
+    # GeoNames dökümündeki sütunlar: ad, alternatif adlar, enlem, boylam, ülke, nüfus
+    GEONAMES_COLUMNS = (1, 3, 4, 5, 8, 14)
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.load_seconds = None
+        self._names = []
+        self._countries = []
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        self._populations = array("q")
+        self._keys = []
+        self._rows = array("l")
+
+    def _parse(self, line: str) -> Optional[tuple]:
+        """Satırı (ad, alternatif_adlar, enlem, boylam, ülke, nüfus) olarak çözümler"""
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) >= 19:
+            name, alternates, lat, lon, country, population = (fields[i] for i in self.GEONAMES_COLUMNS)
+        elif len(fields) >= 4:
+            fields += [""] * (6 - len(fields))
+            name, country, lat, lon, population, alternates = fields[:6]
+        else:
+            return None
+        return name, alternates, float(lat), float(lon), country.upper(), int(population or 0)
+
+    def _load(self) -> None:
+        started = time.perf_counter()
+        entries = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip() or line.startswith("#"):
+                        continue
+                    try:
+                        parsed = self._parse(line)
+                    except ValueError:
+                        parsed = None
+                    if parsed is None:
+                        logger.warning("Şehir sözlüğünde geçersiz satır atlandı: %r", line[:80])
+                        continue
+
+                    name, alternates, lat, lon, country, population = parsed
+                    row = len(self._names)
+                    self._names.append(name)
+                    self._countries.append(country)
+                    self._latitudes.append(lat)
+                    self._longitudes.append(lon)
+                    self._populations.append(population)
+
+                    keys = {normalize_place_name(name)}
+                    keys.update(normalize_place_name(alt) for alt in alternates.split(",") if alt.strip())
+                    entries.extend((key, -population, row) for key in keys if key)
+        except OSError as e:
+            logger.warning("Şehir sözlüğü okunamadı (%s): %s", self.path, e)
+
+        # Aynı adı taşıyan şehirler nüfusa göre büyükten küçüğe sıralanır
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._rows = array("l", (row for _, _, row in entries))
+        self.load_seconds = time.perf_counter() - started
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def _record(self, row: int) -> dict:
+        return {
+            "ad": self._names[row],
+            "ülke": self._countries[row],
+            "enlem": self._latitudes[row],
+            "boylam": self._longitudes[row],
+            "nüfus": self._populations[row]
+        }
+
+    def lookup(self, name: str, country_code: str = "") -> Optional[dict]:
+        """Adı (ve verilirse ülke kodu) eşleşen en kalabalık şehri döndürür, yoksa None"""
+        self._ensure_loaded()
+        key = normalize_place_name(name)
+        country = country_code.strip().upper()
+        index = bisect.bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index] == key:
+            row = self._rows[index]
+            if not country or self._countries[row] == country:
+                return self._record(row)
+            index += 1
+        return None
+
+    def search(self, prefix: str, country_code: str = "", limit: int = 10) -> List[dict]:
+        """Adı önekle başlayan şehirleri nüfusa göre sıralı döndürür"""
+        self._ensure_loaded()
+        key = normalize_place_name(prefix)
+        country = country_code.strip().upper()
+        rows = set()
+        index = bisect.bisect_left(self._keys, key)
+        while index < len(self._keys) and self._keys[index].startswith(key):
+            row = self._rows[index]
+            if not country or self._countries[row] == country:
+                rows.add(row)
+            index += 1
+
+        ranked = sorted(rows, key=lambda row: -self._populations[row])
+        return [self._record(row) for row in ranked[:limit]]
+
+    def places(self):
+        """Tüm şehirleri (ad, ülke, enlem, boylam) olarak dolaşır"""
+        self._ensure_loaded()
+        for row in range(len(self._names)):
+            yield self._names[row], self._countries[row], self._latitudes[row], self._longitudes[row]
+
+    def find_in_text(self, text: str) -> Optional[dict]:
+        """Serbest metinde geçen ilk bilinen şehri döndürür ("İzmir'de", "New York'ta" gibi)"""
+        words = [normalize_place_name(word.split("'")[0]) for word in _TEXT_WORD.findall(text)]
+        for i, word in enumerate(words):
+            # İki kelimelik adlar tek kelimelik adlardan önce denenir
+            if i + 1 < len(words):
+                place = self.lookup(f"{word} {words[i + 1]}")
+                if place is not None:
+                    return place
+            if len(word) > 2:
+                place = self.lookup(word)
+                if place is not None:
+                    return place
+        return None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._names)
+
+    def snapshot(self) -> dict:
+        return {
+            "dosya": self.path,
+            "yüklendi": self._loaded,
+            "şehir_sayısı": len(self._names),
+            "ad_sayısı": len(self._keys),
+            "yükleme_süresi_ms": None if self.load_seconds is None else round(self.load_seconds * 1000, 2)
+        }
+
+gazetteer = Gazetteer(GAZETTEER_FILE) if GAZETTEER_FILE else None
+
+# ============================================================================
+# DİSK ÖNBELLEĞİ
+# ============================================================================
+
+class DiskCache:
+    """
+    Bellek içi önbelleğin altında, yeniden başlatmalarda korunan SQLite katmanı.
+
+    Normalize edilmiş hava durumu yanıtlarını ve şehir → koordinat çözümlemelerini
+    saklar. WAL kipi sayesinde aynı makinedeki birden fazla server süreci dosyayı
+    güvenle paylaşabilir. SQLite çağrıları event loop'u bloklamamak için
+    iş parçacığı havuzunda çalıştırılır.
+
+    İki tablo da max_entries kayıtla sınırlıdır; sınır aşılınca en eski kayıtlar
+    silinir. Hava durumu anahtarları namespace ile öneklenir. Namespace kayıt biçiminin
+    sürümünü ve anahtarı belirleyen ayarları içerdiğinden, bunlardan biri
+    değiştiğinde eski kayıtlar başka bir konumun yanıtı olarak okunmaz; süreleri
+    dolunca silinirler.
+    """
+
+    # Kayıt sayısı sınırı her yazmada değil, bu kadar yazmada bir denetlenir
+    EVICT_EVERY = 64
+
+    def __init__(self, path: str, max_entries: int, stale_ttl: float, namespace: str = ""):
+        self.path = path
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS weather "
+                "(key TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS weather_stored_at ON weather (stored_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cities "
+                "(key TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL, stored_at REAL NOT NULL DEFAULT 0)"
+            )
+            # Eski dosyalardaki şehir tablosunda yazılma zamanı yoktur; bu kayıtlar ilk silinir
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cities)")}
+            if "stored_at" not in columns:
+                conn.execute("ALTER TABLE cities ADD COLUMN stored_at REAL NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS cities_stored_at ON cities (stored_at)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(key: tuple) -> str:
+        return "|".join(str(part) for part in key)
+
+    def _weather_key(self, key: tuple) -> str:
+        return f"{self.namespace}|{self._key(key)}"
+
+    async def _run(self, func, *args):
+        """SQLite işlemini iş parçacığı havuzunda çalıştırır; hatada None döndürür"""
+        def call():
+            with self._lock:
+                return func(self._connect(), *args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, call)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning("Disk önbelleği hatası: %s", e)
+            return None
+
+    async def get_weather(self, key: tuple) -> Optional[tuple]:
+        """Kaydı (değer, yaş_saniye) olarak döndürür; yaşı stale_ttl'yi aşıyorsa None"""
+        def query(conn, db_key, oldest):
+            return conn.execute(
+                "SELECT payload, stored_at FROM weather WHERE key = ? AND stored_at >= ?",
+                (db_key, oldest)
+            ).fetchone()
+
+        row = await self._run(query, self._weather_key(key), time.time() - self.stale_ttl)
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0]), time.time() - row[1]
+
+    async def set_weather(self, key: tuple, value: dict) -> None:
+        def write(conn, db_key, payload, stored_at):
+            conn.execute(
+                "INSERT OR REPLACE INTO weather (key, payload, stored_at) VALUES (?, ?, ?)",
+                (db_key, payload, stored_at)
+            )
+            return self._after_write(conn)
+
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        evicted = await self._run(write, self._weather_key(key), payload, time.time())
+        self.evictions += evicted or 0
+
+    def _after_write(self, conn: sqlite3.Connection) -> int:
+        """Her EVICT_EVERY yazmada bir sınırları denetler; silinen kayıt sayısını döndürür"""
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            return self._evict(conn)
+        return 0
+
+    def _evict(self, conn: sqlite3.Connection) -> int:
+        """Süresi geçmiş hava durumu kayıtlarını ve iki tabloda sınırı aşan en eski kayıtları siler"""
+        removed = conn.execute(
+            "DELETE FROM weather WHERE stored_at < ?", (time.time() - self.stale_ttl,)
+        ).rowcount
+        for table in ("weather", "cities"):
+            excess = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += conn.execute(
+                    f"DELETE FROM {table} WHERE key IN "
+                    f"(SELECT key FROM {table} ORDER BY stored_at LIMIT ?)", (excess,)
+                ).rowcount
+        return removed
+
+    async def get_city(self, key: tuple) -> Optional[tuple]:
+        def query(conn, db_key):
+            return conn.execute("SELECT lat, lon FROM cities WHERE key = ?", (db_key,)).fetchone()
+
+        row = await self._run(query, self._key(key))
+        return tuple(row) if row is not None else None
+
+    async def set_city(self, key: tuple, lat: float, lon: float) -> None:
+        def write(conn, db_key, stored_at):
+            conn.execute(
+                "INSERT OR REPLACE INTO cities (key, lat, lon, stored_at) VALUES (?, ?, ?, ?)",
+                (db_key, lat, lon, stored_at)
+            )
+            return self._after_write(conn)
+
+        evicted = await self._run(write, self._key(key), time.time())
+        self.evictions += evicted or 0
+
+    def snapshot(self) -> dict:
+        return {
+            "dosya": self.path,
+            "namespace": self.namespace,
+            "maksimum_kayıt": self.max_entries,
+            "isabet": self.hits,
+            "ıskalama": self.misses,
+            "çıkarılan": self.evictions,
+            "hata": self.errors
+        }
+
+# Diskteki normalize yanıtların biçim sürümü; yanıt yapısı değiştiğinde artırılır
+DISK_CACHE_FORMAT_VERSION = 2
+
+def _disk_cache_namespace() -> str:
+    """Kayıt biçimi sürümü ve önbellek anahtarını belirleyen ayarlardan namespace üretir"""
+    return f"v{DISK_CACHE_FORMAT_VERSION}|ızgara={WEATHER_CACHE_GRID}|yapıştırma_km={WEATHER_CACHE_SNAP_KM}"
+
+disk_cache = (
+    DiskCache(WEATHER_DISK_CACHE_PATH, WEATHER_DISK_CACHE_MAX_ENTRIES, WEATHER_CACHE_STALE_TTL,
+              _disk_cache_namespace())
+    if WEATHER_DISK_CACHE_PATH else None
+)
+
+async def _promote_from_disk(cache_key: tuple) -> Optional[tuple]:
+    """Disk katmanındaki kaydı yaşını koruyarak belleğe taşır ve (değer, yaş) döndürür"""
+    if disk_cache is None:
+        return None
+
+    entry = await disk_cache.get_weather(cache_key)
+    if entry is not None:
+        value, age = entry
+        weather_cache.set(cache_key, value, stored_at=time.time() - age)
+    return entry
+
+async def _store_weather(cache_key: tuple, weather_info: dict) -> None:
+    """Yanıtı bellek ve disk önbelleğine yazar"""
+    weather_cache.set(cache_key, weather_info)
+    if disk_cache is not None:
+        await disk_cache.set_weather(cache_key, weather_info)
+
+async def _resolve_city(city_key: tuple) -> Optional[tuple]:
+    """Şehrin koordinatlarını bellekten, diskten ya da şehir sözlüğünden döndürür"""
+    coords = city_coords_cache.get(city_key)
+    if coords is None and disk_cache is not None:
+        coords = await disk_cache.get_city(city_key)
+        if coords is not None:
+            city_coords_cache.set(city_key, coords)
+    if coords is None and gazetteer is not None:
+        place = gazetteer.lookup(*city_key)
+        if place is not None:
+            coords = (place["enlem"], place["boylam"])
+            city_coords_cache.set(city_key, coords)
+    return coords
+
+# ============================================================================
+# ÇIKTI BİÇİMİ
+# ============================================================================
+
+OUTPUT_MODES = ("pretty", "compact", "minimal")
+
+# minimal kipte fields verilmezse döndürülen alanlar
+MINIMAL_FIELDS = (
+    "konum.şehir,konum.ülke,hava_durumu.açıklama,sıcaklık.mevcut,sıcaklık.birim,"
+    "atmosfer.nem,rüzgar.hız,rüzgar.birim,yağış,kar,önbellek"
+)
+
+def _dumps(obj, pretty: bool) -> str:
+    """Nesneyi JSON'a çevirir; orjson kuruluysa onu kullanır"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0).decode()
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+@lru_cache(maxsize=256)
+def _parse_fields(fields: str) -> tuple:
+    """ "a.b,c" biçimindeki alan listesini yol demetlerine çevirir"""
+    return tuple(
+        tuple(part.strip() for part in field.split("."))
+        for field in fields.split(",") if field.strip()
+    )
+
+def _select_fields(payload: dict, paths: tuple) -> dict:
+    """Yanıttan yalnızca verilen alan yollarını içeren iç içe bir alt küme çıkarır"""
+    selected = {}
+    for path in paths:
+        source = payload
+        for part in path:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = selected
+            for part in path[:-1]:
+                target = target.setdefault(part, {})
+            target[path[-1]] = source
+    return selected
+
+def _render(payload, output_mode: Optional[str] = None) -> str:
+    """
+    Araç yanıtını JSON'a çevirir; pretty dışındaki kipler sıkışık çıktı üretir.
+
+    Alan seçimi yapılmaz; minimal kipin alan alt kümesi yalnızca hava durumu
+    yanıtlarına uygulanır (bkz. _render_weather).
+    """
+    return _dumps(payload, pretty=((output_mode or OUTPUT_MODE) == "pretty"))
+
+def _render_weather(payload, output_mode: Optional[str] = None, fields: Optional[str] = None) -> str:
+    """
+    Hava durumu yanıtını istenen çıktı biçiminde JSON'a çevirir.
+
+    fields ("sıcaklık.mevcut,hava_durumu.açıklama" gibi) verilirse yalnızca bu alanlar,
+    minimal kipte fields yoksa MINIMAL_FIELDS döndürülür; hata yanıtları her zaman
+    eksiksiz döner.
+    """
+    mode = output_mode or OUTPUT_MODE
+    if mode == "minimal" and not fields:
+        fields = MINIMAL_FIELDS
+    if fields and isinstance(payload, dict) and "error" not in payload:
+        payload = _select_fields(payload, _parse_fields(fields))
+    return _render(payload, mode)
+
+def _invalid_output_mode(output_mode: Optional[str]) -> Optional[str]:
+    """Çıktı biçimi geçersizse hata yanıtını, geçerliyse None döndürür"""
+    if output_mode is None or output_mode in OUTPUT_MODES:
+        return None
+    return _render({
+        "error": "Geçersiz çıktı biçimi. pretty, compact veya minimal olmalıdır.",
+        "output_mode": output_mode
+    })
+
+# ============================================================================
+# SERİLEŞTİRİLMİŞ YANIT ÖNBELLEĞİ
+# ============================================================================
+
+class ResponseCache:
+    """
+    Hazır JSON yanıtlarını (konum, birim, dil, çıktı biçimi) varyantı başına tutar.
+
+    Her kayıt üretildiği önbellek değerine bağlıdır; veri önbelleğindeki kayıt
+    yenilendiğinde eski metin kullanılmaz. Sınır kayıt sayısı değil, metinlerin
+    UTF-8 boyutu üzerinden uygulanır ve en eski kullanılan kayıtlar çıkarılır.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, source) -> Optional[str]:
+        """source'tan üretilmiş metni döndürür; kayıt yoksa ya da eskiyse None"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not source:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, source, text: str) -> None:
+        """Metni ekler; bayt sınırı aşılırsa en eski kullanılan kayıtlar çıkarılır"""
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= old[2]
+
+        self._entries[key] = (source, text, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def snapshot(self) -> dict:
+        return {
+            "kayıt_sayısı": len(self._entries),
+            "bayt": self.size,
+            "maksimum_bayt": self.max_bytes,
+            "isabet": self.hits,
+            "ıskalama": self.misses,
+            "çıkarılan": self.evictions
+        }
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES)
+
+def _splice_cache_age(text: str, age: float, stale: bool, pretty: bool) -> str:
+    """Serileştirilmiş nesnenin sonuna önbellek yaşı alanını ekler"""
+    block = _dumps({"önbellek": {"bayat": stale, "yaş_saniye": int(age)}}, pretty)
+    if text == "{}":
+        return block
+    return text[:-2 if pretty else -1] + "," + block[1:]
+
+def _cached_render(cache_key: tuple, value: dict, age: float, units: str, language: str,
+                   output_mode: str, fields: Optional[str]) -> str:
+    """
+    Taze önbellek kaydını units birimine ve language diline çevirip
+    _render_weather(_with_cache_age(...)) ile aynı metni üreterek döndürür.
+
+    Yaşa bağlı "önbellek" alanı dışındaki metin bir kez serileştirilip saklanır;
+    sonraki isabetlerde yalnızca yaş alanı eklenir.
+    """
+    pretty = output_mode == "pretty"
+    if output_mode == "minimal" and not fields:
+        fields = MINIMAL_FIELDS
+
+    paths = _parse_fields(fields) if fields else None
+    with_age = paths is None or ("önbellek",) in paths
+    if paths is not None and any(path[0] == "önbellek" and len(path) > 1 for path in paths):
+        # Yaş alanının bir kısmı isteniyorsa metin saklanmadan üretilir
+        return _render_weather(_with_cache_age(_convert_weather(value, units, language), age, stale=False),
+                               output_mode, fields)
+
+    variant = (cache_key, units, language, output_mode, fields)
+    text = response_cache.get(variant, value)
+    if text is None:
+        converted = _convert_weather(value, units, language)
+        selected = converted if paths is None else _select_fields(converted, tuple(
+            path for path in paths if path != ("önbellek",)
+        ))
+        text = _dumps(selected, pretty)
+        response_cache.set(variant, value, text)
+
+    return _splice_cache_age(text, age, False, pretty) if with_age else text
+
+# ============================================================================
+# AÇIKLAMA TABLOSU
+# ============================================================================
+
+# API'den açıklamalar her zaman bu dilde çekilir; diğer diller koşul kodundan
+# yerel tabloyla çözülür, böylece ek diller ağ çağrısı gerektirmez
+CANONICAL_LANGUAGE = "en"
+
+def _load_conditions(path: str) -> dict:
+    """
+    Dil tablosunu okur: {dil: {"koşullar": {kod: açıklama}, "ikonlar": {ikon: açıklama}}}.
+
+    "ikonlar", ikon kodunun gündüz/gece eki olmadan ilk iki hanesine göre genel
+    açıklamalardır; tabloda bulunmayan koşul kodları için kullanılır.
+    """
+    if not path:
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Açıklama tablosu okunamadı (%s): %s", path, e)
+        return {}
+
+condition_descriptions = _load_conditions(CONDITIONS_FILE)
+
+def _language_table(language: str) -> Optional[dict]:
+    """Dilin tablosunu döndürür; "pt_BR", "zh-CN" gibi kodlarda ana dile düşer"""
+    code = language.lower().replace("-", "_")
+    return condition_descriptions.get(code) or condition_descriptions.get(code.split("_")[0])
+
+def describe_condition(condition_id: int, icon: str, language: str, default: str) -> str:
+    """
+    OpenWeatherMap koşul kodunun language dilindeki açıklamasını döndürür.
+
+    Kod tabloda yoksa ikonun genel açıklaması, dil tabloda yoksa default kullanılır.
+    """
+    table = _language_table(language)
+    if table is None:
+        return default
+    return table["koşullar"].get(str(condition_id)) or table["ikonlar"].get(icon[:2]) or default
+
+# ============================================================================
+# YANIT NORMALİZASYONU
+# ============================================================================
+
+def _temperature_unit(units: str) -> str:
+    return "°C" if units == "metric" else ("°F" if units == "imperial" else "K")
+
+def _wind_unit(units: str) -> str:
+    return "m/s" if units != "imperial" else "mph"
+
+# API'den her zaman bu birimde veri çekilir ve önbellekte bu birimde tutulur;
+# istenen birime dönüşüm yanıt üretilirken yerelde yapılır
+CANONICAL_UNITS = "metric"
+
+def _response_units(units: str) -> str:
+    """OpenWeatherMap gibi tanınmayan birimleri standard (Kelvin, m/s) kabul eder"""
+    return units if units in _TO_KELVIN else "standard"
+
+def _convert_weather(weather_info: dict, units: str, language: str) -> dict:
+    """
+    Önbellekteki yanıtın sıcaklık ve rüzgar değerlerini units birimine, hava
+    durumu açıklamasını language diline çevirir. Birim ve dil önbellektekiyle
+    aynıysa ya da yanıt hataysa aynı nesne döndürülür.
+    """
+    units = _response_units(units)
+    if "error" in weather_info or (units == CANONICAL_UNITS and language == CANONICAL_LANGUAGE):
+        return weather_info
+
+    converted = dict(weather_info)
+    if units != CANONICAL_UNITS:
+        temp_scale, temp_offset = _temperature_conversion(CANONICAL_UNITS, units)
+        wind_scale = _wind_conversion(CANONICAL_UNITS, units)
+        temperature = weather_info["sıcaklık"]
+        wind = weather_info["rüzgar"]
+        converted["sıcaklık"] = {
+            "mevcut": round(temperature["mevcut"] * temp_scale + temp_offset, 2),
+            "hissedilen": round(temperature["hissedilen"] * temp_scale + temp_offset, 2),
+            "minimum": round(temperature["minimum"] * temp_scale + temp_offset, 2),
+            "maksimum": round(temperature["maksimum"] * temp_scale + temp_offset, 2),
+            "birim": _temperature_unit(units)
+        }
+        converted["rüzgar"] = {
+            **wind,
+            "hız": round(wind["hız"] * wind_scale, 2),
+            "birim": _wind_unit(units)
+        }
+
+    if language != CANONICAL_LANGUAGE:
+        condition = weather_info["hava_durumu"]
+        converted["hava_durumu"] = {
+            **condition,
+            "açıklama": describe_condition(condition["kod"], condition["ikon"], language, condition["açıklama"])
+        }
+    return converted
+
+def _normalize_weather(data: dict, units: str) -> dict:
+    """Ham OpenWeatherMap yanıtını server'ın yanıt yapısına dönüştürür"""
+    weather_info = {
+        "konum": {
+            "enlem": data["coord"]["lat"],
+            "boylam": data["coord"]["lon"],
+            "şehir": data.get("name", "Bilinmiyor"),
+            "ülke": data["sys"].get("country", "Bilinmiyor")
+        },
+        "hava_durumu": {
+            "ana_durum": data["weather"][0]["main"],
+            "açıklama": data["weather"][0]["description"],
+            "ikon": data["weather"][0]["icon"],
+            "kod": data["weather"][0]["id"]
+        },
+        "sıcaklık": {
+            "mevcut": data["main"]["temp"],
+            "hissedilen": data["main"]["feels_like"],
+            "minimum": data["main"]["temp_min"],
+            "maksimum": data["main"]["temp_max"],
+            "birim": _temperature_unit(units)
+        },
+        "atmosfer": {
+            "basınç": data["main"]["pressure"],
+            "nem": data["main"]["humidity"],
+            "görüş_mesafesi": data.get("visibility", "Bilinmiyor")
+        },
+        "rüzgar": {
+            "hız": data["wind"].get("speed", 0),
+            "yön": data["wind"].get("deg", 0),
+            "birim": _wind_unit(units)
+        },
+        "bulutluluk": {
+            "yüzde": data["clouds"]["all"]
+        },
+        "güneş": {
+            "doğuş": data["sys"]["sunrise"],
+            "batış": data["sys"]["sunset"]
+        },
+        "zaman": {
+            "veri_zamanı": data["dt"],
+            "saat_dilimi": data["timezone"]
+        }
+    }
+
+    # Yağış bilgisi varsa ekle
+    if "rain" in data:
+        weather_info["yağış"] = {
+            "son_1_saat": data["rain"].get("1h", 0),
+            "birim": "mm"
+        }
+
+    if "snow" in data:
+        weather_info["kar"] = {
+            "son_1_saat": data["snow"].get("1h", 0),
+            "birim": "mm"
+        }
+
+    return weather_info
+
+# ============================================================================
+# HAVA DURUMU SORGULARI
+# ============================================================================
+
+class SingleFlight:
+    """Aynı anahtar için eşzamanlı çağrıları tek bir işte birleştirir"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(self, key, factory):
+        """
+        Anahtar için süren bir iş varsa onun sonucunu bekler, yoksa yenisini başlatır.
+
+        Hata tüm bekleyenlere iletilir; iş bittiğinde kayıt silindiğinden hatalar
+        saklanmaz ve bir sonraki çağrı yeniden dener.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        # Bir bekleyenin iptali diğerlerinin beklediği işi iptal etmemeli
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Tüm bekleyenler iptal edildiyse hatanın kaydedilmemiş kalmasını önle
+        if not task.cancelled():
+            task.exception()
+
+    def __contains__(self, key) -> bool:
+        return key in self._inflight
+
+    def snapshot(self) -> dict:
+        return {
+            "başlatılan": self.started,
+            "birleştirilen": self.coalesced,
+            "süren": len(self._inflight)
+        }
+
+weather_flights = SingleFlight()
+
+async def _fetch_weather(latitude: float, longitude: float, cache_key: tuple,
+                         max_wait: float = RATE_LIMIT_MAX_WAIT) -> dict:
+    """Koordinatlar için API'den CANONICAL_UNITS biriminde veri çeker, normalize eder ve önbelleğe yazar"""
+    params = {
+        "lat": latitude,
+        "lon": longitude,
+        "appid": API_KEY,
+        "units": CANONICAL_UNITS,
+        "lang": CANONICAL_LANGUAGE
+    }
+
+    data = await _owm_get(BASE_URL, params, max_wait)
+    weather_info = _normalize_weather(data, CANONICAL_UNITS)
+    await _store_weather(cache_key, weather_info)
+    return weather_info
+
+async def _fetch_city_weather(q: str, city_key: tuple) -> dict:
+    """Şehir için API'den veri çeker; yanıtı ve çözümlenen koordinatları önbelleğe yazar"""
+    params = {
+        "q": q,
+        "appid": API_KEY,
+        "units": CANONICAL_UNITS,
+        "lang": CANONICAL_LANGUAGE
+    }
+
+    data = await _owm_get(BASE_URL, params)
+
+    # Yanıtı ilk istekten oluştur, ikinci bir API çağrısı yapma
+    weather_info = _normalize_weather(data, CANONICAL_UNITS)
+
+    lat = data["coord"]["lat"]
+    lon = data["coord"]["lon"]
+    city_coords_cache.set(city_key, (lat, lon))
+    if disk_cache is not None:
+        await disk_cache.set_city(city_key, lat, lon)
+    await _store_weather(_cache_key(lat, lon), weather_info)
+    return weather_info
+
+# Süren arka plan yenilemeleri; görevlerin çöp toplayıcı tarafından silinmemesi
+# için de referans tutar
+_refresh_tasks = {}
+refresh_stats = {"başlatılan": 0, "başarısız": 0}
+
+def _with_cache_age(value: dict, age: float, stale: bool) -> dict:
+    """Önbellekten sunulan yanıta verinin yaşını ekler"""
+    return {
+        **value,
+        "önbellek": {
+            "bayat": stale,
+            "yaş_saniye": int(age)
+        }
+    }
+
+async def _background_refresh(latitude: float, longitude: float, cache_key: tuple) -> None:
+    """Bayat kaydı arka planda yeniler; bütçe yoksa sırada beklemeden vazgeçer"""
+    try:
+        await weather_flights.do(
+            cache_key,
+            lambda: _fetch_weather(latitude, longitude, cache_key, max_wait=0)
+        )
+    except Exception:
+        refresh_stats["başarısız"] += 1
+
+def _schedule_refresh(latitude: float, longitude: float, cache_key: tuple) -> None:
+    """Anahtar için süren bir yenileme yoksa arka plan yenilemesi başlatır"""
+    if cache_key in _refresh_tasks or cache_key in weather_flights:
+        return
+
+    refresh_stats["başlatılan"] += 1
+    task = asyncio.ensure_future(_background_refresh(latitude, longitude, cache_key))
+    _refresh_tasks[cache_key] = task
+    task.add_done_callback(lambda t: _refresh_tasks.pop(cache_key, None))
+
+def _stale_or_error(cache_key: tuple, error: dict) -> dict:
+    """Güncel veri alınamadığında varsa bayat önbellek kaydını, yoksa hatayı döndürür"""
+    stale = weather_cache.get_stale(cache_key)
+    if stale is None:
+        return error
+
+    value, age = stale
+    return {
+        **value,
+        "önbellek": {
+            "bayat": True,
+            "yaş_saniye": int(age),
+            "neden": error["error"]
+        }
+    }
+
+def _is_transient(e: Exception) -> bool:
+    """Hata geçiciyse (kota, devre kesici, bağlantı, 429 ve 5xx) True döner"""
+    if isinstance(e, (RateLimitExceeded, CircuitOpenError, httpx.TransportError)):
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return False
+
+def _upstream_error(e: Exception, status_message: str, context: dict) -> dict:
+    """
+    API çağrısında oluşan hatayı araçların döndürdüğü hata sözlüğüne çevirir.
+
+    status_message, 429 dışındaki HTTP hata kodlarında kullanıcıya gösterilir;
+    context ise hataya eklenecek sorgu bilgileridir.
+    """
+    if isinstance(e, RateLimitExceeded):
+        error = {
+            "error": "API istek limiti aşıldı",
+            "mesaj": str(e),
+            "tekrar_deneme_saniye": round(e.retry_after, 1)
+        }
+    elif isinstance(e, CircuitOpenError):
+        error = {
+            "error": "Hava durumu servisi geçici olarak kullanılamıyor",
+            "mesaj": str(e),
+            "tekrar_deneme_saniye": round(e.retry_after, 1)
+        }
+    elif isinstance(e, httpx.TransportError):
+        error = {
+            "error": f"Bağlantı hatası: {str(e) or type(e).__name__}",
+            "mesaj": "Hava durumu servisine ulaşılamadı."
+        }
+    elif isinstance(e, httpx.HTTPStatusError) and e.response.status_code == 429:
+        error = {
+            "error": "API istek limiti aşıldı: 429",
+            "mesaj": "OpenWeatherMap çağrı limiti doldu. Bir süre sonra tekrar deneyin."
+        }
+    elif isinstance(e, httpx.HTTPStatusError):
+        error = {
+            "error": f"API hatası: {e.response.status_code}",
+            "mesaj": status_message
+        }
+    else:
+        error = {
+            "error": f"Beklenmeyen hata: {str(e)}"
+        }
+
+    error.update(context)
+    return error
+
+def _validate_coordinates(latitude: float, longitude: float) -> Optional[dict]:
+    """Koordinatlar geçersizse hata sözlüğü, geçerliyse None döndürür"""
+    if not (-90 <= latitude <= 90):
+        return {
+            "error": "Geçersiz enlem değeri. -90 ile 90 arasında olmalıdır.",
+            "latitude": latitude
+        }
+
+    if not (-180 <= longitude <= 180):
+        return {
+            "error": "Geçersiz boylam değeri. -180 ile 180 arasında olmalıdır.",
+            "longitude": longitude
+        }
+
+    return None
+
+async def _weather_for_coordinates(latitude: float, longitude: float, units: str, language: str) -> dict:
+    """Koordinatlar için normalize edilmiş hava durumunu veya hata sözlüğünü döndürür"""
+    return _convert_weather(await _canonical_weather_for_coordinates(latitude, longitude), units, language)
+
+async def _canonical_weather_for_coordinates(latitude: float, longitude: float) -> dict:
+    """Koordinatlar için önbellek biriminde ve dilindeki hava durumunu veya hata sözlüğünü döndürür"""
+
+    # Koordinat doğrulaması
+    error = _validate_coordinates(latitude, longitude)
+    if error is not None:
+        return error
+
+    # Yakın koordinatlar aynı ızgara hücresini paylaşır; isabette ağa çıkılmaz
+    cache_key = _cache_key(latitude, longitude)
+    cached = weather_cache.lookup(cache_key) or await _promote_from_disk(cache_key)
+    if cached is not None:
+        value, age = cached
+        if age <= weather_cache.ttl:
+            return _with_cache_age(value, age, stale=False)
+
+        # Bayat kayıt hemen döndürülür, güncel veri arka planda çekilir
+        if STALE_WHILE_REVALIDATE:
+            _schedule_refresh(latitude, longitude, cache_key)
+            return _with_cache_age(value, age, stale=True)
+
+    try:
+        # Aynı hücre için eşzamanlı istekler tek bir API çağrısını bekler
+        return await weather_flights.do(
+            cache_key,
+            lambda: _fetch_weather(latitude, longitude, cache_key)
+        )
+
+    except Exception as e:
+        error = _upstream_error(e, "Hava durumu bilgisi alınamadı. Koordinatları kontrol edin.", {
+            "latitude": latitude,
+            "longitude": longitude
+        })
+        if _is_transient(e):
+            return _stale_or_error(cache_key, error)
+        return error
+
+async def _weather_for_city(city_name: str, country_code: str, units: str, language: str) -> dict:
+    """Şehir için normalize edilmiş hava durumunu veya hata sözlüğünü döndürür"""
+
+    # Daha önce çözümlenen şehirler doğrudan koordinat önbelleğine gider
+    city_key = _city_key(city_name, country_code)
+    coords = await _resolve_city(city_key)
+    if coords is not None:
+        return await _weather_for_coordinates(coords[0], coords[1], units, language)
+
+    return await _weather_for_unresolved_city(city_name, country_code, units, language, city_key)
+
+async def _weather_for_unresolved_city(city_name: str, country_code: str, units: str, language: str,
+                                       city_key: tuple) -> dict:
+    """Koordinatları henüz bilinmeyen şehri adıyla sorgular"""
+
+    # Şehir adı parametresi
+    if country_code:
+        q = f"{city_name},{country_code}"
+    else:
+        q = city_name
+
+    try:
+        weather_info = await weather_flights.do(
+            ("şehir", city_key),
+            lambda: _fetch_city_weather(q, city_key)
+        )
+        return _convert_weather(weather_info, units, language)
+
+    except Exception as e:
+        return _upstream_error(e, "Şehir bulunamadı. Şehir adını kontrol edin.", {
+            "şehir": city_name,
+            "ülke_kodu": country_code
+        })
+
+async def _coordinates_response(
+    latitude: float,
+    longitude: float,
+    units: str,
+    language: str,
+    output_mode: Optional[str] = None,
+    fields: Optional[str] = None
+) -> str:
+    """Koordinatlar için araç yanıtını döndürür; taze isabetlerde hazır metni kullanır"""
+    mode = output_mode or OUTPUT_MODE
+    if response_cache.max_bytes > 0 and _validate_coordinates(latitude, longitude) is None:
+        cache_key = _cache_key(latitude, longitude)
+        entry = weather_cache.get_stale(cache_key)
+        if entry is not None and entry[1] <= weather_cache.ttl:
+            value, age = weather_cache.lookup(cache_key)
+            return _cached_render(cache_key, value, age, units, language, mode, fields)
+
+    weather_info = await _weather_for_coordinates(latitude, longitude, units, language)
+    return _render_weather(weather_info, mode, fields)
+
+def _parse_location(item) -> Optional[tuple]:
+    """
+    Toplu sorgudaki bir konumu çözümler.
+
+    Kabul edilen biçimler: {"latitude": .., "longitude": ..}, {"city": .., "country_code": ..},
+    [enlem, boylam], "enlem, boylam" veya "Şehir adı". Çözümlenemezse None döner.
+    """
+    if isinstance(item, dict):
+        if "latitude" in item and "longitude" in item:
+            return ("koordinat", float(item["latitude"]), float(item["longitude"]))
+        city = item.get("city") or item.get("city_name")
+        if city:
+            return ("şehir", str(city), str(item.get("country_code", "")))
+        return None
+
+    if isinstance(item, (list, tuple)) and len(item) == 2:
+        return ("koordinat", float(item[0]), float(item[1]))
+
+    if isinstance(item, str) and item.strip():
+        parts = item.split(",")
+        if len(parts) == 2:
+            try:
+                return ("koordinat", float(parts[0]), float(parts[1]))
+            except ValueError:
+                pass
+        return ("şehir", item.strip(), "")
+
+    return None
+
+async def _weather_for_location(item, units: str, language: str) -> dict:
+    """Toplu sorgudaki tek bir konum için hava durumunu veya hata sözlüğünü döndürür"""
+    try:
+        location = _parse_location(item)
+    except (TypeError, ValueError):
+        location = None
+
+    if location is None:
+        return {
+            "error": "Geçersiz konum formatı",
+            "konum": item
+        }
+
+    kind, first, second = location
+    if kind == "koordinat":
+        return await _weather_for_coordinates(first, second, units, language)
+    return await _weather_for_city(first, second, units, language)
+
+async def _stream_completed(items: Iterable, work, max_concurrency: Optional[int] = None) -> AsyncIterator[tuple]:
+    """
+    Öğeleri sınırlı sayıda işçiyle işler ve (sıra, sonuç) çiftlerini tamamlanma sırasıyla üretir.
+
+    Girdi tembel olarak tüketilir ve aynı anda en fazla işçi sayısı kadar sorgu
+    sürer; tamamlanan sonuçlar da işçi sayısı kadar yer açan bir kuyrukta bekler.
+    Böylece bellek kullanımı toplam öğe sayısından bağımsız kalır. Üretici erken
+    kapatılırsa süren sorgular iptal edilir.
+    """
+    if not max_concurrency or max_concurrency < 1:
+        max_concurrency = BATCH_MAX_CONCURRENCY
+    worker_count = min(max_concurrency, BATCH_MAX_CONCURRENCY)
+
+    source = enumerate(items)
+    queue = asyncio.Queue(maxsize=worker_count)
+
+    async def worker() -> None:
+        try:
+            for index, item in source:
+                await queue.put((index, await work(item)))
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(worker_count)]
+    try:
+        running = worker_count
+        while running:
+            entry = await queue.get()
+            if entry is None:
+                running -= 1
+            elif isinstance(entry, Exception):
+                raise entry
+            else:
+                yield entry
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+async def iter_weather_for_locations(
+    locations: Iterable,
+    units: Optional[str] = None,
+    max_concurrency: Optional[int] = None,
+    language: Optional[str] = None
+) -> AsyncIterator[tuple]:
+    """
+    Konumların hava durumunu tamamlandıkça (sıra, sonuç) olarak üretir.
+
+    Python'dan büyük toplu sorgular için: ilk sonuçlar en yavaş sorgu beklenmeden
+    kullanılabilir ve girdi bir üreteç olabilir.
+    """
+    if units is None:
+        units = DEFAULT_UNITS
+    if language is None:
+        language = LANGUAGE
+
+    async for entry in _stream_completed(
+        locations,
+        lambda item: _weather_for_location(item, units, language),
+        max_concurrency
+    ):
+        yield entry
+
+async def _weather_for_locations(
+    locations: list,
+    units: str,
+    language: str,
+    max_concurrency: Optional[int] = None,
+    progress=None
+) -> list:
+    """
+    Konumları sınırlı eşzamanlılıkla sorgular ve sonuçları girdi sırasıyla döndürür.
+
+    progress verilirse her sonuçta progress(tamamlanan, toplam, sonuç) beklenir.
+    """
+    results = [None] * len(locations)
+    done = 0
+    async for index, result in iter_weather_for_locations(locations, units, max_concurrency, language):
+        results[index] = result
+        done += 1
+        if progress is not None:
+            await progress(done, len(locations), result)
+    return results
+
+def _progress_line(result: dict) -> str:
+    """Tamamlanan sonucun ilerleme bildirimindeki kısa özeti"""
+    if "error" in result:
+        return f"hata: {result['error']}"
+    konum = result.get("konum", {})
+    sicaklik = result.get("sıcaklık", {})
+    name = konum.get("şehir") or f"{konum.get('enlem')}, {konum.get('boylam')}"
+    return f"{name}: {sicaklik.get('mevcut')}{sicaklik.get('birim', '')}, {result.get('hava_durumu', {}).get('açıklama', '')}"
+
+def _progress_reporter(ctx: Optional[Context]):
+    """İstemci ilerleme istediyse MCP ilerleme bildirimi gönderen geri çağırım döndürür"""
+    if ctx is None:
+        return None
+
+    async def report(done: int, total: int, result: dict) -> None:
+        try:
+            await ctx.report_progress(done, total, f"{done}/{total} · {_progress_line(result)}")
+        except Exception as e:
+            # İlerleme bildirimi sorgunun kendisini bozmamalı
+            logger.debug("İlerleme bildirimi gönderilemedi: %s", e)
+
+    return report
+
+def _too_many_locations(locations: list) -> Optional[dict]:
+    """Konum sayısı sınırı aşıyorsa hata yanıtını, aşmıyorsa None döndürür"""
+    if len(locations) > BATCH_MAX_LOCATIONS:
+        return {
+            "error": f"Çok fazla konum. En fazla {BATCH_MAX_LOCATIONS} konum sorgulanabilir.",
+            "konum_sayısı": len(locations)
+        }
+    return None
+
+# ============================================================================
+# HAVA TAHMİNİ
+# ============================================================================
+
+class ForecastSeries:
+    """
+    5 günlük / 3 saatlik tahminin sütun tabanlı gösterimi.
+
+    40 zaman adımı, iç içe sözlükler yerine her değişken için ayrı bir dizi
+    (array) olarak tutulur. Günlük özetler ve eşik sorguları bu diziler
+    üzerinde hesaplanır.
+    """
+
+    __slots__ = (
+        "location", "timezone", "units", "language", "times", "temp", "feels_like", "humidity",
+        "pressure", "wind_speed", "wind_gust", "pop", "rain", "snow", "clouds",
+        "condition_ids", "descriptions"
+    )
+
+    def __init__(self, data: dict, units: str, language: str):
+        steps = data["list"]
+        city = data["city"]
+
+        self.location = {
+            "enlem": city["coord"]["lat"],
+            "boylam": city["coord"]["lon"],
+            "şehir": city.get("name") or "Bilinmiyor",
+            "ülke": city.get("country") or "Bilinmiyor"
+        }
+        self.timezone = city.get("timezone", 0)
+        self.units = units
+        self.language = language
+
+        self.times = array("q", [step["dt"] for step in steps])
+        self.temp = array("d", [step["main"]["temp"] for step in steps])
+        self.feels_like = array("d", [step["main"]["feels_like"] for step in steps])
+        self.humidity = array("d", [step["main"]["humidity"] for step in steps])
+        self.pressure = array("d", [step["main"]["pressure"] for step in steps])
+        self.wind_speed = array("d", [step["wind"].get("speed", 0) for step in steps])
+        self.wind_gust = array("d", [step["wind"].get("gust", 0) for step in steps])
+        self.pop = array("d", [step.get("pop", 0) for step in steps])
+        self.rain = array("d", [step.get("rain", {}).get("3h", 0) for step in steps])
+        self.snow = array("d", [step.get("snow", {}).get("3h", 0) for step in steps])
+        self.clouds = array("d", [step["clouds"]["all"] for step in steps])
+        self.condition_ids = array("H", [step["weather"][0]["id"] for step in steps])
+
+        # Tekrarlanan açıklamalar tek bir string nesnesini paylaşır
+        interned = {}
+        self.descriptions = [
+            interned.setdefault(step["weather"][0]["description"], step["weather"][0]["description"])
+            for step in steps
+        ]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def converted(self, units: str, language: str) -> "ForecastSeries":
+        """
+        Sıcaklık ve rüzgar dizileri units birimine, açıklamaları language diline
+        çevrilmiş bir kopya döndürür. Birim ve dil aynıysa aynı nesne döndürülür;
+        değişmeyen diziler kopyalanmadan paylaşılır.
+        """
+        if units == self.units and language == self.language:
+            return self
+
+        converted = ForecastSeries.__new__(ForecastSeries)
+        for name in self.__slots__:
+            setattr(converted, name, getattr(self, name))
+
+        if units != self.units:
+            temp_scale, temp_offset = _temperature_conversion(self.units, units)
+            wind_scale = _wind_conversion(self.units, units)
+            converted.units = units
+            converted.temp = array("d", [round(value * temp_scale + temp_offset, 2) for value in self.temp])
+            converted.feels_like = array("d", [round(value * temp_scale + temp_offset, 2) for value in self.feels_like])
+            converted.wind_speed = array("d", [round(value * wind_scale, 2) for value in self.wind_speed])
+            converted.wind_gust = array("d", [round(value * wind_scale, 2) for value in self.wind_gust])
+
+        if language != self.language:
+            # Her koşul kodu bir kez çözülür; aynı koddaki adımlar aynı string'i paylaşır
+            names = {
+                condition_id: describe_condition(condition_id, "", language, description)
+                for condition_id, description in zip(self.condition_ids, self.descriptions)
+            }
+            converted.language = language
+            converted.descriptions = [names[condition_id] for condition_id in self.condition_ids]
+        return converted
+
+    def local_time(self, index: int) -> str:
+        """Adımın yerel saatini "YYYY-AA-GG SS:DD" biçiminde döndürür"""
+        moment = datetime.fromtimestamp(self.times[index] + self.timezone, timezone.utc)
+        return moment.strftime("%Y-%m-%d %H:%M")
+
+    def _day_ranges(self) -> list:
+        """Aynı yerel güne düşen adımların [başlangıç, bitiş) aralıklarını döndürür"""
+        ranges = []
+        start = 0
+        for i in range(1, len(self.times) + 1):
+            if i == len(self.times) or \
+                    (self.times[i] + self.timezone) // 86400 != (self.times[start] + self.timezone) // 86400:
+                ranges.append((start, i))
+                start = i
+        return ranges
+
+    def daily(self) -> list:
+        """Günlük minimum/maksimum sıcaklık, toplam yağış ve en yüksek yağış olasılığı"""
+        days = []
+        for start, end in self._day_ranges():
+            temps = self.temp[start:end]
+            descriptions = self.descriptions[start:end]
+            days.append({
+                "tarih": self.local_time(start)[:10],
+                "minimum": min(temps),
+                "maksimum": max(temps),
+                "yağış_mm": round(sum(self.rain[start:end]) + sum(self.snow[start:end]), 2),
+                "yağış_olasılığı": round(max(self.pop[start:end]) * 100),
+                "maksimum_rüzgar": max(self.wind_speed[start:end]),
+                "baskın_durum": max(set(descriptions), key=descriptions.count)
+            })
+        return days
+
+    def first_rain(self) -> Optional[dict]:
+        """İlk yağışlı adımı (gök gürültülü fırtına, çisenti, yağmur veya kar) döndürür"""
+        for i, condition_id in enumerate(self.condition_ids):
+            if 200 <= condition_id < 700 or self.rain[i] > 0 or self.snow[i] > 0:
+                return {
+                    "zaman": self.local_time(i),
+                    "açıklama": self.descriptions[i],
+                    "miktar_mm": round(self.rain[i] + self.snow[i], 2),
+                    "olasılık": round(self.pop[i] * 100)
+                }
+        return None
+
+    def windy_periods(self, threshold: float) -> list:
+        """Rüzgar hızının eşiğe eşit ya da üstünde olduğu kesintisiz dönemler"""
+        periods = []
+        start = None
+        for i in range(len(self.wind_speed) + 1):
+            windy = i < len(self.wind_speed) and self.wind_speed[i] >= threshold
+            if windy and start is None:
+                start = i
+            elif not windy and start is not None:
+                periods.append({
+                    "başlangıç": self.local_time(start),
+                    "bitiş": self.local_time(i - 1),
+                    "maksimum_hız": max(self.wind_speed[start:i]),
+                    "maksimum_hamle": max(self.wind_gust[start:i])
+                })
+                start = None
+        return periods
+
+    def series(self) -> dict:
+        """Zaman adımlarını değişken başına liste olarak döndürür"""
+        return {
+            "zaman": list(self.times),
+            "sıcaklık": list(self.temp),
+            "hissedilen": list(self.feels_like),
+            "nem": list(self.humidity),
+            "rüzgar_hız": list(self.wind_speed),
+            "yağış_olasılığı": list(self.pop),
+            "yağış_mm": [round(rain + snow, 2) for rain, snow in zip(self.rain, self.snow)],
+            "durum_kodu": list(self.condition_ids)
+        }
+
+    def summary(self, wind_threshold: float, include_series: bool) -> dict:
+        result = {
+            "konum": self.location,
+            "birimler": {
+                "sıcaklık": _temperature_unit(self.units),
+                "rüzgar": _wind_unit(self.units)
+            },
+            "adım_sayısı": len(self),
+            "başlangıç": self.local_time(0) if len(self) else None,
+            "günlük": self.daily(),
+            "ilk_yağış": self.first_rain(),
+            "rüzgarlı_dönemler": {
+                "eşik": wind_threshold,
+                "dönemler": self.windy_periods(wind_threshold)
+            }
+        }
+        if include_series:
+            result["seriler"] = self.series()
+        return result
+
+forecast_cache = TTLCache(FORECAST_CACHE_TTL, WEATHER_CACHE_MAX_ENTRIES, WEATHER_CACHE_STALE_TTL)
+
+async def _fetch_forecast(latitude: float, longitude: float, cache_key: tuple) -> ForecastSeries:
+    """Koordinatlar için 5 günlük tahmini çeker, sütunlara dönüştürür ve önbelleğe yazar"""
+    params = {
+        "lat": latitude,
+        "lon": longitude,
+        "appid": API_KEY,
+        "units": CANONICAL_UNITS,
+        "lang": CANONICAL_LANGUAGE
+    }
+
+    data = await _owm_get(FORECAST_URL, params)
+    forecast = ForecastSeries(data, CANONICAL_UNITS, CANONICAL_LANGUAGE)
+    forecast_cache.set(cache_key, forecast)
+    return forecast
+
+async def _forecast_for_coordinates(latitude: float, longitude: float, units: str, language: str):
+    """Koordinatlar için units biriminde ve language dilinde ForecastSeries ya da hata sözlüğü döndürür"""
+    forecast = await _canonical_forecast_for_coordinates(latitude, longitude)
+    if isinstance(forecast, dict):
+        return forecast
+    return forecast.converted(_response_units(units), language)
+
+async def _canonical_forecast_for_coordinates(latitude: float, longitude: float):
+    """Koordinatlar için önbellek biriminde ve dilindeki ForecastSeries ya da hata sözlüğü döndürür"""
+    error = _validate_coordinates(latitude, longitude)
+    if error is not None:
+        return error
+
+    # Güncel hava durumuyla aynı ızgara hücresi anahtarı kullanılır
+    cache_key = _cache_key(latitude, longitude)
+    cached = forecast_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    try:
+        return await weather_flights.do(
+            ("tahmin", cache_key),
+            lambda: _fetch_forecast(latitude, longitude, cache_key)
+        )
+
+    except Exception as e:
+        error = _upstream_error(e, "Hava tahmini alınamadı. Koordinatları kontrol edin.", {
+            "latitude": latitude,
+            "longitude": longitude
+        })
+        stale = forecast_cache.get_stale(cache_key) if _is_transient(e) else None
+        return stale[0] if stale is not None else error
+
+# ============================================================================
+# TOPLU ÖZETLER
+# ============================================================================
+
+# Rüzgar hızı dönüşümü: 1 m/s = 2.23694 mph
+MPS_TO_MPH = 2.2369362920544
+
+# Sıcaklıkların Kelvin'e doğrusal dönüşümü: K = değer * ölçek + kayma
+_TO_KELVIN = {
+    "metric": (1.0, 273.15),
+    "imperial": (5 / 9, 273.15 - 32 * 5 / 9),
+    "standard": (1.0, 0.0)
+}
+
+RAIN_CONDITIONS = {"Rain", "Drizzle", "Thunderstorm"}
+
+def _temperature_conversion(from_units: str, to_units: str) -> tuple:
+    """from_units'ten to_units'e sıcaklık dönüşümünün (ölçek, kayma) katsayıları"""
+    scale_in, offset_in = _TO_KELVIN[from_units]
+    scale_out, offset_out = _TO_KELVIN[to_units]
+    return scale_in / scale_out, (offset_in - offset_out) / scale_out
+
+def _wind_conversion(from_units: str, to_units: str) -> float:
+    """from_units'ten to_units'e rüzgar hızı dönüşüm katsayısı"""
+    if (from_units == "imperial") == (to_units == "imperial"):
+        return 1.0
+    return MPS_TO_MPH if to_units == "imperial" else 1 / MPS_TO_MPH
+
+class _Columns:
+    """Sütun işlemleri; NumPy varsa dizilerle, yoksa listelerle çalışır"""
+
+    engine = "numpy" if np is not None else "python"
+
+    @staticmethod
+    def array(values: list):
+        return np.asarray(values, dtype=float) if np is not None else values
+
+    @staticmethod
+    def linear(values, scale: float, offset: float = 0.0):
+        if scale == 1.0 and offset == 0.0:
+            return values
+        if np is not None:
+            return values * scale + offset
+        return [value * scale + offset for value in values]
+
+    @staticmethod
+    def take(values, indices: list):
+        if np is not None:
+            return values[indices]
+        return [values[i] for i in indices]
+
+    @staticmethod
+    def stats(values) -> tuple:
+        """(ortalama, minimum, maksimum)"""
+        if np is not None:
+            return float(values.mean()), float(values.min()), float(values.max())
+        return sum(values) / len(values), min(values), max(values)
+
+    @staticmethod
+    def mean(values) -> float:
+        return float(values.mean()) if np is not None else sum(values) / len(values)
+
+    @staticmethod
+    def total(values) -> float:
+        return float(values.sum()) if np is not None else float(sum(values))
+
+def _summarize_columns(columns: dict, indices: Optional[list] = None) -> dict:
+    """Sütunların (ya da indices ile seçilen satırlarının) özet istatistikleri"""
+    if indices is not None:
+        columns = {name: _Columns.take(values, indices) for name, values in columns.items()}
+
+    temp_mean, temp_min, temp_max = _Columns.stats(columns["temp"])
+    wind_mean, _, wind_max = _Columns.stats(columns["wind"])
+    count = len(columns["temp"])
+
+    return {
+        "nokta_sayısı": count,
+        "sıcaklık": {
+            "ortalama": round(temp_mean, 2),
+            "minimum": round(temp_min, 2),
+            "maksimum": round(temp_max, 2)
+        },
+        "hissedilen_ortalama": round(_Columns.mean(columns["feels_like"]), 2),
+        "nem_ortalama": round(_Columns.mean(columns["humidity"]), 1),
+        "rüzgar": {
+            "ortalama": round(wind_mean, 2),
+            "maksimum": round(wind_max, 2)
+        },
+        "yağışlı_oran": round(_Columns.total(columns["rain"]) / count, 3),
+        "karlı_oran": round(_Columns.total(columns["snow"]) / count, 3),
+        "toplam_yağış_mm_1s": round(_Columns.total(columns["precipitation"]), 2)
+    }
+
+def summarize_weather(results: list, units: str, target_units: Optional[str] = None,
+                      regions: Optional[list] = None) -> dict:
+    """
+    Normalize edilmiş hava durumu sonuçlarını tek bir özet halinde toplar.
+
+    Sonuçlar units biriminde olmalıdır; target_units verilirse sıcaklık ve rüzgar
+    değerleri toplu olarak o birime çevrilir. regions, sonuçlarla aynı uzunlukta
+    bölge adları listesidir; verilirse her bölge için ayrı özet hesaplanır.
+    Bölge adları str() ile metne çevrilir, boş ya da None olanlar
+    "Belirtilmemiş" altında toplanır.
+    Hatalı sonuçlar özete katılmaz.
+    """
+    target_units = target_units or units
+    rows = []
+    row_regions = []
+    for i, result in enumerate(results):
+        if "error" in result:
+            continue
+        rows.append(result)
+        if regions is not None:
+            row_regions.append(regions[i])
+
+    summary = {
+        "birimler": {
+            "sıcaklık": _temperature_unit(target_units),
+            "rüzgar": _wind_unit(target_units)
+        },
+        "toplam": len(results),
+        "hatalı": len(results) - len(rows),
+        "motor": _Columns.engine
+    }
+    if not rows:
+        summary["genel"] = None
+        return summary
+
+    temp_scale, temp_offset = _temperature_conversion(units, target_units)
+    wind_scale = _wind_conversion(units, target_units)
+
+    columns = {
+        "temp": _Columns.linear(
+            _Columns.array([row["sıcaklık"]["mevcut"] for row in rows]), temp_scale, temp_offset),
+        "feels_like": _Columns.linear(
+            _Columns.array([row["sıcaklık"]["hissedilen"] for row in rows]), temp_scale, temp_offset),
+        "humidity": _Columns.array([row["atmosfer"]["nem"] for row in rows]),
+        "wind": _Columns.linear(
+            _Columns.array([row["rüzgar"]["hız"] for row in rows]), wind_scale),
+        "rain": _Columns.array([
+            1.0 if "yağış" in row or row["hava_durumu"]["ana_durum"] in RAIN_CONDITIONS else 0.0
+            for row in rows
+        ]),
+        "snow": _Columns.array([
+            1.0 if "kar" in row or row["hava_durumu"]["ana_durum"] == "Snow" else 0.0
+            for row in rows
+        ]),
+        "precipitation": _Columns.array([
+            row.get("yağış", {}).get("son_1_saat", 0) + row.get("kar", {}).get("son_1_saat", 0)
+            for row in rows
+        ])
+    }
+
+    summary["genel"] = _summarize_columns(columns)
+
+    if regions is not None:
+        groups = {}
+        for i, region in enumerate(row_regions):
+            # Bölge adı JSON anahtarı olur; liste/sözlük gibi değerler de metne çevrilir
+            key = "Belirtilmemiş" if region is None or region == "" else str(region)
+            groups.setdefault(key, []).append(i)
+        summary["bölgeler"] = {
+            region: _summarize_columns(columns, indices) for region, indices in groups.items()
+        }
+
+    return summary
+
+# ============================================================================
+# TAVSİYE KURALLARI
+# ============================================================================
+
+# Yanıtlardaki birim etiketlerinin ölçü sistemleri
+_TEMPERATURE_LABELS = {"°C": "metric", "°F": "imperial", "K": "standard"}
+_WIND_LABELS = {"m/s": "metric", "mph": "imperial"}
+
+def _label_conversion(label: Optional[str], units: str) -> tuple:
+    """Birim etiketiyle verilen değeri units sistemine çeviren (ölçek, kayma) katsayıları"""
+    if label in _TEMPERATURE_LABELS:
+        return _temperature_conversion(_TEMPERATURE_LABELS[label], units)
+    if label in _WIND_LABELS:
+        return _wind_conversion(_WIND_LABELS[label], units), 0.0
+    return 1.0, 0.0
+
+def _field_value(record: Optional[dict], path: tuple):
+    """İç içe sözlükten noktalı yolun değerini okur, yoksa None"""
+    value = record
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+class _ThresholdRule:
+    """
+    Sayısal alanı sıralı eşiklerle aralıklara böler; her aralığın bir tavsiyesi
+    (ya da null) vardır. Aralık bisect ile bulunur.
+    """
+
+    __slots__ = ("path", "units", "default", "bounds", "advice", "find", "conversions")
+
+    def __init__(self, spec: dict):
+        self.path = tuple(spec["alan"].split("."))
+        self.units = spec.get("birim")
+        self.default = spec.get("varsayılan")
+        if self.default is not None:
+            self.default = float(self.default)
+        self.bounds = [float(bound) for bound in spec["eşikler"]]
+        self.advice = list(spec["tavsiyeler"])
+        if self.bounds != sorted(self.bounds):
+            raise ValueError(f"{spec['alan']}: eşikler artan sırada olmalı")
+        if len(self.advice) != len(self.bounds) + 1:
+            raise ValueError(f"{spec['alan']}: eşik sayısından bir fazla tavsiye olmalı")
+
+        # üst_sınır_dahil: eşiğe eşit değer alttaki aralığa düşer (değer > eşik)
+        self.find = bisect.bisect_left if spec.get("üst_sınır_dahil") else bisect.bisect_right
+        self.conversions = {}
+
+    def _conversion(self, label: Optional[str]) -> tuple:
+        """Etiketteki birimden kuralın birimine (ölçek, kayma); etiket başına bir kez hesaplanır"""
+        conversion = self.conversions.get(label)
+        if conversion is None:
+            conversion = _label_conversion(label, self.units) if self.units else (1.0, 0.0)
+            self.conversions[label] = conversion
+        return conversion
+
+    def checker(self):
+        """
+        Tek kaydın tavsiyesini (ya da None) döndüren fonksiyon.
+
+        Varsayılan değerin tavsiyesi ve kuralın biriminden farklı etiketlerin
+        çevrim katsayıları burada bir kez hesaplanır; çağrı başına yalnızca alan
+        okunur ve eşiklerde bisect yapılır.
+        """
+        # Yol: bölüm, bölümdeki anahtar (tek düzeyli yolda None) ve daha derin anahtarlar
+        first, key, rest = self.path[0], (self.path[1] if len(self.path) > 1 else None), self.path[2:]
+        bounds, advice, find = self.bounds, self.advice, self.find
+        default = advice[find(bounds, self.default)] if self.default is not None else None
+        conversions = {}
+        if self.units and key is not None:
+            for label in (*_TEMPERATURE_LABELS, *_WIND_LABELS):
+                if self._conversion(label) != (1.0, 0.0):
+                    conversions[label] = self._conversion(label)
+
+        def check(record: dict) -> Optional[str]:
+            section = record.get(first)
+            if key is None:
+                value = section
+            elif isinstance(section, dict):
+                value = section.get(key)
+                if rest:
+                    value = _field_value(value, rest)
+            else:
+                value = None
+            if value is None:
+                return default
+            if conversions:
+                conversion = conversions.get(section.get("birim"))
+                if conversion is not None:
+                    value = value * conversion[0] + conversion[1]
+            return advice[find(bounds, value)]
+        return check
+
+    def apply(self, values: list, label: Optional[str], out: list) -> None:
+        scale, offset = self._conversion(label)
+        bounds, advice, find, default = self.bounds, self.advice, self.find, self.default
+        for lines, value in zip(out, values):
+            if lines is None:
+                continue
+            if value is None:
+                value = default
+                if value is None:
+                    continue
+            else:
+                value = value * scale + offset
+            text = advice[find(bounds, value)]
+            if text:
+                lines.append(text)
+
+# OpenWeatherMap koşul kodlarının aralığı (2xx gök gürültüsü ... 8xx bulutluluk)
+_CONDITION_CODE_RANGE = (200, 899)
+
+class _ConditionRule:
+    """OpenWeatherMap koşul kodu aralıklarını koşul kodu → tavsiye sözlüğüne açar"""
+
+    __slots__ = ("path", "advice")
+
+    def __init__(self, spec: dict):
+        self.path = tuple(spec["alan"].split("."))
+        self.advice = {}
+        lowest, highest = _CONDITION_CODE_RANGE
+        for entry in spec["kodlar"]:
+            low, high = (int(code) for code in entry["aralık"])
+            # Hatalı yazılmış bir aralık import sırasında dev bir sözlük oluşturmasın
+            if not lowest <= low <= high <= highest:
+                raise ValueError(f"{spec['alan']}: kod aralığı {lowest}-{highest} içinde olmalı: {entry['aralık']}")
+            for code in range(low, high + 1):
+                self.advice.setdefault(code, entry["tavsiye"])
+
+    def checker(self):
+        """Tek kaydın tavsiyesini (ya da None) döndüren fonksiyon"""
+        path, advice = self.path, self.advice
+        if len(path) != 2:
+            return lambda record: advice.get(_field_value(record, path))
+        first, key = path
+
+        def check(record: dict) -> Optional[str]:
+            section = record.get(first)
+            return advice.get(section.get(key)) if isinstance(section, dict) else None
+        return check
+
+    def apply(self, values: list, label: Optional[str], out: list) -> None:
+        advice = self.advice
+        for lines, value in zip(out, values):
+            if lines is not None:
+                text = advice.get(value)
+                if text:
+                    lines.append(text)
+
+class AdviceRules:
+    """
+    Veri dosyasından yüklenen tavsiye kuralları.
+
+    Kurallar başlangıçta derlenir: eşik kuralları sıralı eşik dizilerine, koşul
+    kuralları koşul kodu → tavsiye sözlüğüne dönüşür ve her kural için tek
+    kaydı değerlendiren bir fonksiyon bir kez oluşturulur. Kurallar dosyadaki
+    sırayla uygulanır; ızgara sütunlarında kural kural, sütun sütun çalışılır.
+    Eşikler "birim" sisteminde yazılır, farklı birimdeki değerler önce çevrilir.
+    """
+
+    RULE_TYPES = {"eşik": _ThresholdRule, "koşul": _ConditionRule}
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rules = []
+        self.checks = ()
+        try:
+            with open(path, encoding="utf-8") as f:
+                specs = json.load(f)["kurallar"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Tavsiye kuralları okunamadı (%s): %s", path, e)
+            return
+
+        for spec in specs:
+            try:
+                self.rules.append(self.RULE_TYPES[spec["tür"]](spec))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning("Geçersiz tavsiye kuralı atlandı: %s", e)
+        self.checks = tuple(rule.checker() for rule in self.rules)
+
+    def advise(self, record: dict) -> list:
+        """Tek kaydın tavsiyeleri"""
+        if "error" in record:
+            return []
+        lines = []
+        for check in self.checks:
+            text = check(record)
+            if text:
+                lines.append(text)
+        return lines
+
+    def evaluate(self, column, label, present: list) -> list:
+        """
+        Kuralları sütunlar üzerinde çalıştırır ve satır başına tavsiye listesi döndürür.
+
+        column(yol) alanın satır başına değer listesini, label(bölüm) bölümün birim
+        etiketini döndürür. present[i] False olan satırlar için None döner.
+        """
+        out = [[] if ok else None for ok in present]
+        for rule in self.rules:
+            rule.apply(column(rule.path), label(rule.path[0]), out)
+        return out
+
+    def annotate(self, records: list) -> list:
+        """Normalize edilmiş kayıtların her biri için tavsiye listesi; hatalı kayıtlar için None"""
+        advise = self.advise
+        return [None if "error" in record else advise(record) for record in records]
+
+    def snapshot(self) -> dict:
+        return {
+            "dosya": self.path,
+            "kural_sayısı": len(self.rules)
+        }
+
+advice_rules = AdviceRules(ADVICE_RULES_FILE)
+
+# ============================================================================
+# ALAN ÖRNEKLEME
+# ============================================================================
+
+# Izgara çıktısındaki değişkenler: ad → normalize yanıttaki yol
+AREA_VARIABLES = {
+    "sıcaklık": ("sıcaklık", "mevcut"),
+    "hissedilen": ("sıcaklık", "hissedilen"),
+    "nem": ("atmosfer", "nem"),
+    "basınç": ("atmosfer", "basınç"),
+    "rüzgar_hızı": ("rüzgar", "hız"),
+    "rüzgar_yönü": ("rüzgar", "yön"),
+    "bulutluluk": ("bulutluluk", "yüzde"),
+    "yağış": ("yağış", "son_1_saat"),
+    "durum": ("hava_durumu", "ana_durum"),
+    "durum_kodu": ("hava_durumu", "kod"),
+}
+
+def _wrap_longitude(longitude: float) -> float:
+    """Boylamı [-180, 180) aralığına indirger"""
+    return (longitude + 180) % 360 - 180
+
+def _point_in_polygon(latitude: float, longitude: float, polygon: list) -> bool:
+    """Noktanın [enlem, boylam] köşeli çokgenin içinde olup olmadığını (çift-tek kuralı) döndürür"""
+    inside = False
+    previous_lat, previous_lon = polygon[-1]
+    for lat, lon in polygon:
+        if (lat > latitude) != (previous_lat > latitude):
+            crossing = lon + (latitude - lat) * (previous_lon - lon) / (previous_lat - lat)
+            if longitude < crossing:
+                inside = not inside
+        previous_lat, previous_lon = lat, lon
+    return inside
+
+def _area_grid(bbox: Optional[list], polygon: Optional[list], resolution: float) -> Union[dict, tuple]:
+    """
+    Alan için örnekleme ızgarasını (enlemler, boylamlar, maske) üretir; hata varsa hata sözlüğü döndürür.
+
+    Örnek noktalar hücre merkezleridir. Batı sınırı doğudan büyükse kutu 180.
+    meridyeni aşıyor kabul edilir. Çokgen verilirse kutu çokgenin sınırlarıdır ve
+    maske yalnızca çokgenin içindeki hücreleri işaretler.
+    """
+    if not resolution or resolution <= 0:
+        return {"error": "Çözünürlük sıfırdan büyük olmalıdır.", "resolution": resolution}
+
+    if polygon:
+        try:
+            polygon = [(float(lat), float(lon)) for lat, lon in polygon]
+        except (TypeError, ValueError):
+            return {"error": "Geçersiz çokgen. Köşeler [enlem, boylam] listesi olmalıdır."}
+        if len(polygon) < 3:
+            return {"error": "Çokgen en az 3 köşeden oluşmalıdır.", "köşe_sayısı": len(polygon)}
+        lats = [lat for lat, _ in polygon]
+        lons = [lon for _, lon in polygon]
+        south, west, north, east = min(lats), min(lons), max(lats), max(lons)
+    elif bbox:
+        try:
+            south, west, north, east = (float(value) for value in bbox)
+        except (TypeError, ValueError):
+            return {"error": "Geçersiz alan. bbox [güney, batı, kuzey, doğu] olmalıdır.", "bbox": bbox}
+    else:
+        return {"error": "bbox ya da polygon verilmelidir."}
+
+    for latitude, longitude in ((south, west), (north, east)):
+        error = _validate_coordinates(latitude, longitude)
+        if error is not None:
+            return error
+    if south > north:
+        return {"error": "Güney sınırı kuzey sınırından büyük olamaz.", "bbox": [south, west, north, east]}
+    if west > east:
+        east += 360
+
+    rows = max(1, math.ceil((north - south) / resolution))
+    cols = max(1, math.ceil((east - west) / resolution))
+    if rows * cols > AREA_MAX_CELLS:
+        return {
+            "error": f"Izgara çok büyük. En fazla {AREA_MAX_CELLS} hücre örneklenebilir; çözünürlüğü büyütün.",
+            "hücre_sayısı": rows * cols
+        }
+
+    latitudes = [round(min(north, south + (i + 0.5) * resolution), 6) for i in range(rows)]
+    longitudes = [round(_wrap_longitude(min(east, west + (j + 0.5) * resolution)), 6) for j in range(cols)]
+    if polygon:
+        mask = [[_point_in_polygon(lat, lon, polygon) for lon in longitudes] for lat in latitudes]
+    else:
+        mask = [[True] * cols for _ in range(rows)]
+
+    return (south, west, north, _wrap_longitude(east) if east > 180 else east), latitudes, longitudes, mask
+
+def _area_value(result: dict, path: tuple):
+    """Normalize yanıttan ızgara değişkeninin değerini okur"""
+    section = result.get(path[0])
+    if section is None:
+        # Yağış alanı yalnızca yağış varken döner
+        return 0 if path[0] == "yağış" else None
+    return section.get(path[1])
+
+async def _weather_for_area(
+    bbox: Optional[list],
+    polygon: Optional[list],
+    resolution: float,
+    units: str,
+    max_concurrency: Optional[int] = None,
+    progress=None,
+    include_advice: bool = False
+) -> dict:
+    """
+    Alanı ızgara olarak örnekler ve değişken başına satır×sütun dizileri döndürür.
+
+    Aynı önbellek hücresine düşen örnekler tek sorguyla doldurulur; taze önbellek
+    kaydı olan hücreler için API'ye gidilmez. Eksik hücreler toplu sorgularla aynı
+    sınırlı eşzamanlılık ve API kotasıyla çekilir. progress verilirse her hücre
+    sorgusu tamamlandığında progress(tamamlanan, toplam, sonuç) beklenir.
+    include_advice True ise hücre tavsiyeleri ızgara dizileri üzerinden tek
+    geçişte hesaplanır.
+    """
+    grid = _area_grid(bbox, polygon, resolution)
+    if isinstance(grid, dict):
+        return grid
+    bounds, latitudes, longitudes, mask = grid
+
+    # Örnekler önbellek anahtarına göre gruplanır; her anahtar bir kez sorgulanır
+    cells = {}
+    for i, lat in enumerate(latitudes):
+        for j, lon in enumerate(longitudes):
+            if mask[i][j]:
+                cells.setdefault(_cache_key(lat, lon), []).append((i, j))
+
+    cached = 0
+    for key in cells:
+        entry = weather_cache.get_stale(key)
+        if entry is not None and entry[1] <= weather_cache.ttl:
+            cached += 1
+
+    async def run(samples: list) -> dict:
+        i, j = samples[0]
+        # Izgarada açıklama bulunmadığından yalnızca birim dönüşümü yapılır
+        return await _weather_for_coordinates(latitudes[i], longitudes[j], units, CANONICAL_LANGUAGE)
+
+    # Sonuçlar geldikçe ızgaraya yazılır; hücre başına yanıtlar bellekte biriktirilmez
+    groups = list(cells.values())
+    values = {name: [[None] * len(longitudes) for _ in latitudes] for name in AREA_VARIABLES}
+    failed = 0
+    done = 0
+    async for index, result in _stream_completed(groups, run, max_concurrency):
+        done += 1
+        if progress is not None:
+            await progress(done, len(groups), result)
+        if "error" in result:
+            failed += 1
+            continue
+        for name, path in AREA_VARIABLES.items():
+            value = _area_value(result, path)
+            grid_values = values[name]
+            for i, j in groups[index]:
+                grid_values[i][j] = value
+
+    south, west, north, east = bounds
+    area = {
+        "alan": {
+            "güney": south,
+            "batı": west,
+            "kuzey": north,
+            "doğu": east,
+            "çözünürlük": resolution
+        },
+        "satır": len(latitudes),
+        "sütun": len(longitudes),
+        "enlemler": latitudes,
+        "boylamlar": longitudes,
+        "birimler": {
+            "sıcaklık": _temperature_unit(_response_units(units)),
+            "rüzgar": _wind_unit(_response_units(units)),
+            "yağış": "mm"
+        },
+        "değişkenler": values,
+        "hücreler": {
+            "örnek": sum(row.count(True) for row in mask),
+            "sorgu": len(cells),
+            "önbellekten": cached,
+            "hatalı": failed
+        }
+    }
+    if include_advice:
+        area["tavsiyeler"] = _area_advice(values, units, len(longitudes))
+    return area
+
+def _area_advice(values: dict, units: str, columns: int) -> dict:
+    """
+    Izgara değişkenlerinden hücre başına tavsiyeleri hesaplar.
+
+    Aynı metin her hücrede tekrarlanmaz: metinler bir kez listelenir, hücreler
+    bu listedeki sıra numaralarını tutar. Alınamayan hücreler null döner.
+    """
+    paths = {path: name for name, path in AREA_VARIABLES.items()}
+    flat = {name: [value for row in grid for value in row] for name, grid in values.items()}
+    labels = {
+        "sıcaklık": _temperature_unit(_response_units(units)),
+        "rüzgar": _wind_unit(_response_units(units))
+    }
+    present = [value is not None for value in flat["durum"]]
+    cells = advice_rules.evaluate(
+        lambda path: flat[paths[path]] if path in paths else [None] * len(present),
+        labels.get,
+        present
+    )
+
+    texts = {}
+    indices = [
+        None if lines is None else [texts.setdefault(text, len(texts)) for text in lines]
+        for lines in cells
+    ]
+    return {
+        "metinler": list(texts),
+        "hücreler": [indices[start:start + columns] for start in range(0, len(indices), columns)]
+    }
+
+# ============================================================================
+# ÖN ISITMA (İZLEME LİSTESİ)
+# ============================================================================
+
+def _load_watchlist(path: str) -> list:
+    """
+    İzleme listesi dosyasını okur ve çözümlenmiş konumları döndürür.
+
+    Dosya, toplu sorgudaki biçimlerde konumlar içeren bir JSON listesi ya da her
+    satırda "enlem, boylam" veya şehir adı bulunan düz metin olabilir. Düz metinde
+    boş satırlar ve # ile başlayan satırlar atlanır.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+    except OSError as e:
+        logger.warning("İzleme listesi okunamadı: %s", e)
+        return []
+
+    try:
+        items = json.loads(content)
+    except ValueError:
+        items = [
+            line.strip() for line in content.splitlines()
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+    locations = []
+    for item in items:
+        try:
+            location = _parse_location(item)
+        except (TypeError, ValueError):
+            location = None
+
+        if location is None or (location[0] == "koordinat" and _validate_coordinates(*location[1:])):
+            logger.warning("İzleme listesindeki konum atlandı: %r", item)
+            continue
+        locations.append(location)
+    return locations
+
+class Prewarmer:
+    """
+    İzleme listesindeki konumların önbellek kayıtlarını süreleri dolmadan yeniler.
+
+    Yenilemeler TTL penceresine eşit aralıklarla yayılır. Aralık, ön ısıtmanın
+    dakikalık API bütçesinin en fazla quota_share kadarını kullanacağı şekilde
+    seçilir. Bütçenin geri kalanı araç çağrılarına ayrıldığından, bütçe bu payın
+    altına düştüğünde yenileme atlanır. quota_share 0 ise ön ısıtma kapalıdır.
+    """
+
+    def __init__(self, locations: list, ttl: float, quota_share: float):
+        self.locations = locations
+        self.quota_share = quota_share
+        # Kayıtlar TTL dolmadan, pencerenin %80'i geçtiğinde yenilenir
+        self.cycle = ttl * 0.8
+        self.refreshed = 0
+        self.skipped = 0
+        self.failed = 0
+        self._task = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.locations) and self.quota_share > 0
+
+    @property
+    def interval(self) -> float:
+        """İki yenileme arasındaki süre (saniye); ön ısıtma kapalıysa sonsuz"""
+        if self.quota_share <= 0:
+            return float("inf")
+        interval = self.cycle / max(1, len(self.locations))
+        # Dakikalık bütçe yoksa (OWM_CALLS_PER_MINUTE = 0) aralık yalnızca TTL'ye göre seçilir
+        if OWM_CALLS_PER_MINUTE > 0:
+            interval = max(interval, 60 / (OWM_CALLS_PER_MINUTE * self.quota_share))
+        return interval
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            for location in self.locations:
+                await self._refresh(location)
+                await asyncio.sleep(self.interval)
+
+    async def _refresh(self, location: tuple) -> None:
+        kind, first, second = location
+
+        if kind == "şehir":
+            city_key = _city_key(first, second)
+            resolved = await _resolve_city(city_key)
+            if resolved is None:
+                # Şehir ilk turda bir kez çözümlenir, sonra koordinatla yenilenir
+                q = f"{first},{second}" if second else first
+                await self._fetch(("şehir", city_key),
+                                  lambda: _fetch_city_weather(q, city_key))
+                return
+            first, second = resolved
+
+        cache_key = _cache_key(first, second)
+
+        # Kayıt bir sonraki tura kadar taze kalacaksa (örneğin bir araç çağrısı
+        # yeni yenilediyse) bütçe harcama
+        entry = weather_cache.get_stale(cache_key) or await _promote_from_disk(cache_key)
+        if entry is not None and entry[1] + self.interval * len(self.locations) < weather_cache.ttl:
+            self.skipped += 1
+            return
+
+        await self._fetch(cache_key,
+                          lambda: _fetch_weather(first, second, cache_key, max_wait=0))
+
+    async def _fetch(self, key, factory) -> None:
+        if not rate_limiter.has_headroom(1 - self.quota_share):
+            self.skipped += 1
+            return
+
+        try:
+            await weather_flights.do(key, factory)
+            self.refreshed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Ön ısıtma yenilemesi başarısız: %s", e)
+
+    def snapshot(self) -> dict:
+        return {
+            "konum_sayısı": len(self.locations),
+            "çalışıyor": self._task is not None,
+            "aralık_saniye": round(self.interval, 2) if self.enabled else None,
+            "kota_payı": self.quota_share,
+            "yenilenen": self.refreshed,
+            "atlanan": self.skipped,
+            "başarısız": self.failed
+        }
+
+prewarmer = Prewarmer(
+    _load_watchlist(WATCHLIST_FILE) if WATCHLIST_FILE else [],
+    WEATHER_CACHE_TTL,
+    PREWARM_QUOTA_SHARE
+)
+
+# ============================================================================
+# EN YAKIN NOKTA DİZİNİ
+# ============================================================================
+
+EARTH_RADIUS_KM = 6371.0088
+
+def _unit_vector(latitude: float, longitude: float) -> tuple:
+    """Koordinatı birim küre üzerindeki 3 boyutlu noktaya çevirir"""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+def _chord_to_km(chord_sq: float) -> float:
+    """Birim küredeki kiriş uzunluğunun karesini büyük daire mesafesine (km) çevirir"""
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+def _km_to_chord_sq(distance_km: float) -> float:
+    """Büyük daire mesafesini (km) birim küredeki kiriş uzunluğunun karesine çevirir"""
+    chord = 2 * math.sin(min(math.pi, distance_km / EARTH_RADIUS_KM) / 2)
+    return chord * chord
+
+class SiteIndex:
+    """
+    Şehir sözlüğü ve izleme listesi noktaları üzerinde k-en yakın ve yarıçap sorguları.
+
+    Noktalar birim küre üzerinde 3 boyutlu vektörlere çevrilip dizi tabanlı bir
+    k-d ağacına yerleştirilir. Kiriş uzunluğu büyük daire (haversine) mesafesiyle
+    aynı sırayı verdiğinden budama doğrudan 3 boyutta yapılır; boylamın ±180'de
+    sarması ya da kutuplar özel durum gerektirmez. Dizin ilk sorguda kurulur.
+    """
+
+    LEAF_SIZE = 8
+
+    def __init__(self, sources):
+        # sources: (ad, ülke, tür, enlem, boylam) demetleri üreten çağrılabilir
+        self._sources = sources
+        self._lock = threading.Lock()
+        self._built = False
+        self._points = []
+        self.queries = 0
+
+    def _build(self) -> None:
+        points = list(self._sources())
+        vectors = [_unit_vector(lat, lon) for _, _, _, lat, lon in points]
+        order = list(range(len(points)))
+        axes = array("b", bytes(len(points)))
+
+        def split(lo: int, hi: int) -> None:
+            if hi - lo <= self.LEAF_SIZE:
+                return
+            # En geniş yayılıma sahip eksen boyunca ortadan bölünür
+            spans = []
+            for axis in range(3):
+                values = [vectors[i][axis] for i in order[lo:hi]]
+                spans.append(max(values) - min(values))
+            axis = spans.index(max(spans))
+            order[lo:hi] = sorted(order[lo:hi], key=lambda i: vectors[i][axis])
+            mid = (lo + hi) // 2
+            axes[mid] = axis
+            split(lo, mid)
+            split(mid + 1, hi)
+
+        split(0, len(points))
+
+        # Sütunlar ağaç sırasıyla saklanır; sorgular ardışık bellekte dolaşır
+        self._axes = axes
+        self._coords = tuple(array("d", (vectors[i][axis] for i in order)) for axis in range(3))
+        self._points = [points[i] for i in order]
+
+    def _ensure_built(self) -> None:
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self._build()
+                self._built = True
+
+    def _record(self, position: int, chord_sq: float) -> dict:
+        name, country, kind, lat, lon = self._points[position]
+        return {
+            "ad": name,
+            "ülke": country,
+            "tür": kind,
+            "enlem": lat,
+            "boylam": lon,
+            "mesafe_km": round(_chord_to_km(chord_sq), 3)
+        }
+
+    def _search(self, query: tuple, k: int, max_chord_sq: float) -> list:
+        """max_chord_sq içindeki en yakın k noktayı (kiriş², konum) olarak döndürür"""
+        self._ensure_built()
+        self.queries += 1
+        coords = self._coords
+        xs, ys, zs = coords
+        qx, qy, qz = query
+        best = []  # (-kiriş², konum) en büyük öbek
+
+        def visit(lo: int, hi: int) -> None:
+            if hi - lo <= self.LEAF_SIZE:
+                for position in range(lo, hi):
+                    dx, dy, dz = xs[position] - qx, ys[position] - qy, zs[position] - qz
+                    dist = dx * dx + dy * dy + dz * dz
+                    if dist <= max_chord_sq:
+                        if len(best) < k:
+                            heapq.heappush(best, (-dist, position))
+                        elif dist < -best[0][0]:
+                            heapq.heapreplace(best, (-dist, position))
+                return
+
+            mid = (lo + hi) // 2
+            visit(mid, mid + 1)
+
+            axis = self._axes[mid]
+            diff = query[axis] - coords[axis][mid]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            visit(*near)
+            bound = max_chord_sq if len(best) < k else min(max_chord_sq, -best[0][0])
+            if diff * diff <= bound:
+                visit(*far)
+
+        visit(0, len(self._points))
+        return sorted((-neg, position) for neg, position in best)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1,
+                radius_km: Optional[float] = None) -> List[dict]:
+        """En yakın k noktayı, verilirse radius_km içinde kalanlarla sınırlı, yakından uzağa döndürür"""
+        max_chord_sq = 4.0 if radius_km is None else _km_to_chord_sq(radius_km)
+        found = self._search(_unit_vector(latitude, longitude), k, max_chord_sq)
+        return [self._record(position, dist) for dist, position in found]
+
+    def nearest_within(self, latitude: float, longitude: float, radius_km: float) -> Optional[dict]:
+        """radius_km içindeki en yakın noktayı döndürür, yoksa None"""
+        found = self.nearest(latitude, longitude, 1, radius_km)
+        return found[0] if found else None
+
+    def __len__(self) -> int:
+        self._ensure_built()
+        return len(self._points)
+
+    def snapshot(self) -> dict:
+        return {
+            "kuruldu": self._built,
+            "nokta_sayısı": len(self._points),
+            "sorgu": self.queries,
+            "önbellek_yapıştırma_km": WEATHER_CACHE_SNAP_KM or None
+        }
+
+def _site_sources():
+    """Dizine girecek noktalar: şehir sözlüğü ve izleme listesindeki konumlar"""
+    if gazetteer is not None:
+        for name, country, lat, lon in gazetteer.places():
+            yield name, country, "şehir", lat, lon
+
+    for kind, first, second in prewarmer.locations:
+        if kind == "koordinat":
+            yield f"{first:.4f}, {second:.4f}", "", "izleme", first, second
+        elif gazetteer is not None:
+            place = gazetteer.lookup(first, second)
+            if place is not None:
+                yield place["ad"], place["ülke"], "izleme", place["enlem"], place["boylam"]
+
+site_index = SiteIndex(_site_sources)
+
 # MCP server oluştur
-mcp = FastMCP("Weather Forecast")
+mcp = FastMCP("Weather Forecast", lifespan=server_lifespan)
 
 @mcp.tool()
-async def get_weather_by_coordinates(latitude: float, longitude: float, units: str = None) -> str:
+async def get_weather_by_coordinates(
+    latitude: float,
+    longitude: float,
+    units: str = None,
+    language: str = None,
+    output_mode: str = None,
+    fields: str = None
+) -> str:
     """
     Enlem ve boylam koordinatlarına göre hava durumu bilgilerini getirir.
 
@@ -32,182 +3001,355 @@ async def get_weather_by_coordinates(latitude: float, longitude: float, units: s
         latitude: Enlem (-90 ile 90 arasında)
         longitude: Boylam (-180 ile 180 arasında)
         units: Ölçü birimi (metric, imperial, standard)
+        language: Açıklamaların dili (tr, en, es, fr, de, it, pt, ru, ja, zh; varsayılan: LANGUAGE)
+        output_mode: Çıktı biçimi (pretty, compact, minimal)
+        fields: Döndürülecek alanlar, virgülle ayrılmış (örn: "sıcaklık.mevcut,hava_durumu.açıklama")
 
     Returns:
         JSON formatında hava durumu bilgileri
     """
 
-    # Varsayılan units değerini ayarla
+    # Varsayılan units ve language değerlerini ayarla
     if units is None:
         units = DEFAULT_UNITS
+    if language is None:
+        language = LANGUAGE
 
-    # Koordinat doğrulaması
-    if not (-90 <= latitude <= 90):
-        return json.dumps({
-            "error": "Geçersiz enlem değeri. -90 ile 90 arasında olmalıdır.",
-            "latitude": latitude
-        }, ensure_ascii=False, indent=2)
+    error = _invalid_output_mode(output_mode)
+    if error is not None:
+        return error
 
-    if not (-180 <= longitude <= 180):
-        return json.dumps({
-            "error": "Geçersiz boylam değeri. -180 ile 180 arasında olmalıdır.",
-            "longitude": longitude
-        }, ensure_ascii=False, indent=2)
+    return await _coordinates_response(latitude, longitude, units, language, output_mode, fields)
 
-    # API parametreleri
-    params = {
-        "lat": latitude,
-        "lon": longitude,
-        "appid": API_KEY,
-        "units": units,
-        "lang": LANGUAGE  # Dil ayarı
-    }
+@mcp.tool()
+async def get_weather_by_city(
+    city_name: str,
+    country_code: str = "",
+    units: str = None,
+    language: str = None,
+    output_mode: str = None,
+    fields: str = None
+) -> str:
+    """
+    Şehir adına göre hava durumu bilgilerini getirir.
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(BASE_URL, params=params)
-            response.raise_for_status()
-
-            data = response.json()
-
-            # Hava durumu bilgilerini düzenle
-            weather_info = {
-                "konum": {
-                    "enlem": data["coord"]["lat"],
-                    "boylam": data["coord"]["lon"],
-                    "şehir": data.get("name", "Bilinmiyor"),
-                    "ülke": data["sys"].get("country", "Bilinmiyor")
-                },
-                "hava_durumu": {
-                    "ana_durum": data["weather"][0]["main"],
-                    "açıklama": data["weather"][0]["description"],
-                    "ikon": data["weather"][0]["icon"]
-                },
-                "sıcaklık": {
-                    "mevcut": data["main"]["temp"],
-                    "hissedilen": data["main"]["feels_like"],
-                    "minimum": data["main"]["temp_min"],
-                    "maksimum": data["main"]["temp_max"],
-                    "birim": "°C" if units == "metric" else ("°F" if units == "imperial" else "K")
-                },
-                "atmosfer": {
-                    "basınç": data["main"]["pressure"],
-                    "nem": data["main"]["humidity"],
-                    "görüş_mesafesi": data.get("visibility", "Bilinmiyor")
-                },
-                "rüzgar": {
-                    "hız": data["wind"].get("speed", 0),
-                    "yön": data["wind"].get("deg", 0),
-                    "birim": "m/s" if units != "imperial" else "mph"
-                },
-                "bulutluluk": {
-                    "yüzde": data["clouds"]["all"]
-                },
-                "güneş": {
-                    "doğuş": data["sys"]["sunrise"],
-                    "batış": data["sys"]["sunset"]
-                },
-                "zaman": {
-                    "veri_zamanı": data["dt"],
-                    "saat_dilimi": data["timezone"]
-                }
-            }
+    Args:
+        city_name: Şehir adı
+        country_code: Ülke kodu (opsiyonel, örn: TR, US)
+        units: Ölçü birimi (metric, imperial, standard)
+        language: Açıklamaların dili (tr, en, es, fr, de, it, pt, ru, ja, zh; varsayılan: LANGUAGE)
+        output_mode: Çıktı biçimi (pretty, compact, minimal)
+        fields: Döndürülecek alanlar, virgülle ayrılmış (örn: "sıcaklık.mevcut,hava_durumu.açıklama")
 
-            # Yağış bilgisi varsa ekle
-            if "rain" in data:
-                weather_info["yağış"] = {
-                    "son_1_saat": data["rain"].get("1h", 0),
-                    "birim": "mm"
-                }
+    Returns:
+        JSON formatında hava durumu bilgileri
+    """
 
-            if "snow" in data:
-                weather_info["kar"] = {
-                    "son_1_saat": data["snow"].get("1h", 0),
-                    "birim": "mm"
-                }
+    # Varsayılan units ve language değerlerini ayarla
+    if units is None:
+        units = DEFAULT_UNITS
+    if language is None:
+        language = LANGUAGE
 
-            return json.dumps(weather_info, ensure_ascii=False, indent=2)
+    error = _invalid_output_mode(output_mode)
+    if error is not None:
+        return error
 
-    except httpx.HTTPStatusError as e:
-        error_msg = {
-            "error": f"API hatası: {e.response.status_code}",
-            "mesaj": "Hava durumu bilgisi alınamadı. Koordinatları kontrol edin.",
-            "latitude": latitude,
-            "longitude": longitude
-        }
-        return json.dumps(error_msg, ensure_ascii=False, indent=2)
+    # Çözümlenmiş şehirler koordinat yanıtı önbelleğini kullanır
+    city_key = _city_key(city_name, country_code)
+    coords = await _resolve_city(city_key)
+    if coords is not None:
+        return await _coordinates_response(coords[0], coords[1], units, language, output_mode, fields)
 
-    except Exception as e:
-        error_msg = {
-            "error": f"Beklenmeyen hata: {str(e)}",
-            "latitude": latitude,
-            "longitude": longitude
-        }
-        return json.dumps(error_msg, ensure_ascii=False, indent=2)
+    weather_info = await _weather_for_unresolved_city(city_name, country_code, units, language, city_key)
+    return _render_weather(weather_info, output_mode, fields)
 
 @mcp.tool()
-async def get_weather_by_city(city_name: str, country_code: str = "", units: str = None) -> str:
+async def get_weather_for_locations(
+    locations: List[Union[dict, str, List[float]]],
+    units: str = None,
+    language: str = None,
+    max_concurrency: int = None,
+    include_advice: bool = False,
+    output_mode: str = None,
+    fields: str = None,
+    ctx: Context = None
+) -> str:
     """
-    Şehir adına göre hava durumu bilgilerini getirir.
+    Birden fazla konumun hava durumunu tek çağrıda, eşzamanlı olarak getirir.
+
+    İstemci ilerleme bildirimi isterse her konum tamamlandığında tamamlanma oranı
+    ve konumun kısa özeti gönderilir; sonuçlar en yavaş sorgu beklenmeden izlenebilir.
 
     Args:
-        city_name: Şehir adı
-        country_code: Ülke kodu (opsiyonel, örn: TR, US)
+        locations: Konum listesi. Her öğe {"latitude": .., "longitude": ..},
+            {"city": .., "country_code": ..}, [enlem, boylam] veya şehir adı olabilir
         units: Ölçü birimi (metric, imperial, standard)
+        language: Açıklamaların dili (tr, en, es, fr, de, it, pt, ru, ja, zh; varsayılan: LANGUAGE)
+        max_concurrency: Aynı anda yapılacak en fazla sorgu sayısı
+        include_advice: True ise her sonuca "tavsiyeler" listesi eklenir
+        output_mode: Çıktı biçimi (pretty, compact, minimal)
+        fields: Her sonuçta döndürülecek alanlar, virgülle ayrılmış
 
     Returns:
-        JSON formatında hava durumu bilgileri
+        JSON formatında, girdi sırasıyla hava durumu sonuçları
+    """
+
+    # Varsayılan units ve language değerlerini ayarla
+    if units is None:
+        units = DEFAULT_UNITS
+    if language is None:
+        language = LANGUAGE
+
+    error = _invalid_output_mode(output_mode)
+    if error is not None:
+        return error
+
+    error = _too_many_locations(locations)
+    if error is not None:
+        return _render(error, output_mode)
+
+    results = await _weather_for_locations(locations, units, language, max_concurrency, _progress_reporter(ctx))
+    failed = sum(1 for result in results if "error" in result)
+
+    # Tavsiyeler alan seçiminden önce, tüm sonuçlar için tek çağrıda hesaplanır
+    advice = advice_rules.annotate(results) if include_advice else None
+
+    if (output_mode or OUTPUT_MODE) == "minimal" and not fields:
+        fields = MINIMAL_FIELDS
+    if fields:
+        paths = _parse_fields(fields)
+        results = [
+            result if "error" in result else _select_fields(result, paths)
+            for result in results
+        ]
+
+    if advice is not None:
+        # Sonuçlar önbellekteki nesnelerle paylaşılabildiğinden kopyalanır
+        results = [
+            result if lines is None else {**result, "tavsiyeler": lines}
+            for result, lines in zip(results, advice)
+        ]
+
+    return _dumps({
+        "toplam": len(results),
+        "başarılı": len(results) - failed,
+        "hatalı": failed,
+        "sonuçlar": results
+    }, pretty=((output_mode or OUTPUT_MODE) == "pretty"))
+
+@mcp.tool()
+async def get_weather_for_area(
+    bbox: List[float] = None,
+    polygon: List[List[float]] = None,
+    resolution: float = 0.25,
+    units: str = None,
+    max_concurrency: int = None,
+    include_advice: bool = False,
+    output_mode: str = None,
+    ctx: Context = None
+) -> str:
+    """
+    Bir alanın hava durumunu ızgara halinde örnekler.
+
+    İstemci ilerleme bildirimi isterse her hücre tamamlandığında tamamlanma oranı
+    ve hücrenin kısa özeti gönderilir.
+
+    Args:
+        bbox: [güney, batı, kuzey, doğu] sınır kutusu (derece)
+        polygon: [enlem, boylam] köşelerinden oluşan çokgen; verilirse bbox yerine kullanılır
+        resolution: Izgara aralığı, derece (varsayılan 0.25)
+        units: Ölçü birimi (metric, imperial, standard)
+        max_concurrency: Aynı anda yapılacak en fazla sorgu sayısı
+        include_advice: True ise hücre başına tavsiyeler eklenir
+        output_mode: Çıktı biçimi (pretty, compact, minimal)
+
+    Returns:
+        JSON formatında, değişken başına satır×sütun dizileri; çokgen dışındaki ve
+        alınamayan hücreler null
     """
 
     # Varsayılan units değerini ayarla
     if units is None:
         units = DEFAULT_UNITS
 
-    # Şehir adı parametresi
-    if country_code:
-        q = f"{city_name},{country_code}"
-    else:
-        q = city_name
+    error = _invalid_output_mode(output_mode)
+    if error is not None:
+        return error
 
-    params = {
-        "q": q,
-        "appid": API_KEY,
-        "units": units,
-        "lang": LANGUAGE
-    }
+    area = await _weather_for_area(
+        bbox, polygon, resolution, units, max_concurrency, _progress_reporter(ctx), include_advice
+    )
+    return _dumps(area, pretty=((output_mode or OUTPUT_MODE) == "pretty"))
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(BASE_URL, params=params)
-            response.raise_for_status()
+@mcp.tool()
+async def summarize_weather_for_locations(
+    locations: List[Union[dict, str, List[float]]],
+    units: str = None,
+    target_units: str = None
+) -> str:
+    """
+    Birden fazla konumun hava durumunu getirir ve tek bir bölgesel özet döndürür.
 
-            data = response.json()
+    Args:
+        locations: Konum listesi (get_weather_for_locations ile aynı biçimler).
+            Sözlük biçimindeki konumlara "region" alanı eklenirse bölge bazında özet de hesaplanır
+        units: Sorgu ölçü birimi (metric, imperial, standard)
+        target_units: Özetin ölçü birimi (varsayılan: units)
 
-            # Koordinatları al ve get_weather_by_coordinates fonksiyonunu kullan
-            lat = data["coord"]["lat"]
-            lon = data["coord"]["lon"]
+    Returns:
+        JSON formatında ortalama/min/maks sıcaklık, en yüksek rüzgar, yağışlı nokta oranı vb.
+    """
 
-            return await get_weather_by_coordinates(lat, lon, units)
+    # Varsayılan units değerini ayarla
+    if units is None:
+        units = DEFAULT_UNITS
 
-    except httpx.HTTPStatusError as e:
-        error_msg = {
-            "error": f"API hatası: {e.response.status_code}",
-            "mesaj": "Şehir bulunamadı. Şehir adını kontrol edin.",
-            "şehir": city_name,
-            "ülke_kodu": country_code
-        }
-        return json.dumps(error_msg, ensure_ascii=False, indent=2)
+    if target_units is not None and target_units not in _TO_KELVIN:
+        return _render({
+            "error": "Geçersiz ölçü birimi. metric, imperial veya standard olmalıdır.",
+            "target_units": target_units
+        })
 
-    except Exception as e:
-        error_msg = {
-            "error": f"Beklenmeyen hata: {str(e)}",
-            "şehir": city_name,
-            "ülke_kodu": country_code
-        }
-        return json.dumps(error_msg, ensure_ascii=False, indent=2)
+    error = _too_many_locations(locations)
+    if error is not None:
+        return _render(error)
+
+    # Sonuçlar önbellekteki birimde alınır ve özet sırasında toplu olarak çevrilir
+    results = await _weather_for_locations(locations, CANONICAL_UNITS, CANONICAL_LANGUAGE)
+
+    regions = None
+    if any(isinstance(item, dict) and "region" in item for item in locations):
+        regions = [item.get("region") if isinstance(item, dict) else None for item in locations]
+
+    summary = summarize_weather(results, CANONICAL_UNITS, target_units or _response_units(units), regions)
+    return _render(summary)
+
+@mcp.tool()
+async def get_forecast_by_coordinates(
+    latitude: float,
+    longitude: float,
+    units: str = None,
+    language: str = None,
+    wind_threshold: float = None,
+    include_series: bool = False
+) -> str:
+    """
+    Koordinatlar için 5 günlük / 3 saatlik hava tahmini özetini getirir.
+
+    Args:
+        latitude: Enlem (-90 ile 90 arasında)
+        longitude: Boylam (-180 ile 180 arasında)
+        units: Ölçü birimi (metric, imperial, standard)
+        language: Açıklamaların dili (tr, en, es, fr, de, it, pt, ru, ja, zh; varsayılan: LANGUAGE)
+        wind_threshold: Rüzgarlı dönemler için hız eşiği (varsayılan: 10 m/s veya 22 mph)
+        include_series: True ise 3 saatlik adımlar değişken başına liste olarak eklenir
+
+    Returns:
+        JSON formatında günlük özetler, ilk yağış zamanı ve rüzgarlı dönemler
+    """
+
+    # Varsayılan units ve language değerlerini ayarla
+    if units is None:
+        units = DEFAULT_UNITS
+    if language is None:
+        language = LANGUAGE
+
+    if wind_threshold is None:
+        wind_threshold = 22.0 if units == "imperial" else 10.0
+
+    forecast = await _forecast_for_coordinates(latitude, longitude, units, language)
+    if isinstance(forecast, dict):
+        return _render(forecast)
+
+    return _render(forecast.summary(wind_threshold, include_series))
+
+@mcp.tool()
+async def search_cities(query: str, country_code: str = "", limit: int = 10) -> str:
+    """
+    Çevrimdışı şehir sözlüğünde adı verilen önekle başlayan şehirleri arar.
+
+    Args:
+        query: Şehir adı ya da başlangıcı (büyük/küçük harf ve Türkçe karakter duyarsız)
+        country_code: Ülke kodu (opsiyonel, örn: TR, US)
+        limit: En fazla sonuç sayısı
+
+    Returns:
+        JSON formatında, nüfusa göre sıralı şehir listesi
+    """
+    if gazetteer is None:
+        return _render({"error": "Şehir sözlüğü kapalı. GAZETTEER_FILE ayarlayın."})
+
+    results = gazetteer.search(query, country_code, max(1, min(limit, 100)))
+    return _render({
+        "sorgu": query,
+        "toplam": len(results),
+        "sonuçlar": results
+    })
+
+@mcp.tool()
+async def find_nearest_sites(
+    latitude: float,
+    longitude: float,
+    k: int = 5,
+    radius_km: float = None
+) -> str:
+    """
+    Koordinata en yakın bilinen şehirleri ve izleme listesi noktalarını bulur.
+
+    Args:
+        latitude: Enlem (-90 ile 90 arasında)
+        longitude: Boylam (-180 ile 180 arasında)
+        k: En fazla sonuç sayısı
+        radius_km: Verilirse yalnızca bu mesafe (km) içindeki noktalar döndürülür
+
+    Returns:
+        JSON formatında, yakından uzağa sıralı noktalar ve büyük daire mesafeleri
+    """
+    error = _validate_coordinates(latitude, longitude)
+    if error is not None:
+        return _render(error)
+
+    results = site_index.nearest(latitude, longitude, max(1, min(k, 100)), radius_km)
+    return _render({
+        "konum": {"enlem": latitude, "boylam": longitude},
+        "toplam": len(results),
+        "sonuçlar": results
+    })
+
+@mcp.tool()
+async def get_server_stats() -> str:
+    """
+    Server'ın çalışma zamanı istatistiklerini getirir.
+
+    Returns:
+        JSON formatında bağlantı havuzu, önbellek, API kotası ve devre kesici istatistikleri
+    """
+    stats = {
+        "http_havuzu": pool_stats.snapshot(),
+        "önbellek": {
+            **weather_cache.snapshot(),
+            "ızgara_derece": WEATHER_CACHE_GRID
+        },
+        "tahmin_önbelleği": forecast_cache.snapshot(),
+        "şehir_önbelleği": city_coords_cache.snapshot(),
+        "şehir_sözlüğü": gazetteer.snapshot() if gazetteer is not None else None,
+        "nokta_dizini": site_index.snapshot(),
+        "yanıt_önbelleği": response_cache.snapshot(),
+        "asistan_önbelleği": weather_assistant.render_cache.snapshot(),
+        "asistan_oturumları": weather_assistant.sessions.snapshot(),
+        "tavsiye_kuralları": advice_rules.snapshot(),
+        "disk_önbelleği": disk_cache.snapshot() if disk_cache is not None else None,
+        "istek_birleştirme": weather_flights.snapshot(),
+        "arka_plan_yenileme": dict(refresh_stats),
+        "ön_ısıtma": prewarmer.snapshot(),
+        "api_kotası": rate_limiter.snapshot(),
+        "devre_kesici": circuit_breaker.snapshot()
+    }
+    return _render(stats)
 
 @mcp.resource("weather://coordinates/{latitude}/{longitude}")
-def get_weather_resource(latitude: str, longitude: str) -> str:
+async def get_weather_resource(latitude: str, longitude: str) -> str:
     """
     Koordinatlara göre hava durumu kaynağı.
 
@@ -221,21 +3363,16 @@ def get_weather_resource(latitude: str, longitude: str) -> str:
     try:
         lat = float(latitude)
         lon = float(longitude)
-
-        # Senkron çağrı için asyncio kullan
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(get_weather_by_coordinates(lat, lon))
-        loop.close()
-
-        return result
     except ValueError:
         error_msg = {
             "error": "Geçersiz koordinat formatı",
             "latitude": latitude,
             "longitude": longitude
         }
-        return json.dumps(error_msg, ensure_ascii=False, indent=2)
+        return _render(error_msg)
+
+    # Araçlarla aynı istemci, önbellek ve istek birleştirme yolunu kullan
+    return await _coordinates_response(lat, lon, DEFAULT_UNITS, LANGUAGE)
 
 @mcp.prompt()
 def weather_analysis_prompt(location: str) -> str:
@@ -261,123 +3398,349 @@ def weather_analysis_prompt(location: str) -> str:
 Analizi Türkçe olarak yapın ve kullanıcı dostu bir dille sunun.
 """
 
+# ============================================================================
+# NİYET ÇÖZÜMLEME
+# ============================================================================
+
+# Anahtar kelime → niyet. Dört harf ve daha uzun kelimeler ek almış hâlleriyle
+# de eşleşir ("teşekkürler", "selamlar"); kısa kelimeler yalnızca tam eşleşir.
+INTENT_KEYWORDS = {
+    "merhaba": "selamlama", "selam": "selamlama", "hello": "selamlama", "hi": "selamlama",
+    "teşekkür": "teşekkür", "sağol": "teşekkür", "thanks": "teşekkür", "thank": "teşekkür",
+    "yardım": "yardım", "help": "yardım", "nasıl": "yardım",
+}
+
+# Aynı mesajda birden fazla niyet varsa öncelik sırası
+_KEYWORD_PRIORITY = ("selamlama", "teşekkür", "yardım")
+
+# Önceki konuma uygulanan takip ifadeleri: ifade → (bağlam alanı, değer)
+FOLLOW_UP_KEYWORDS = {
+    "bugün": ("gün", 0), "today": ("gün", 0),
+    "yarın": ("gün", 1), "tomorrow": ("gün", 1),
+    "öbür gün": ("gün", 2), "yarından sonra": ("gün", 2), "day after tomorrow": ("gün", 2),
+    "fahrenheit": ("birim", "imperial"), "fahrenhayt": ("birim", "imperial"),
+    "celsius": ("birim", "metric"), "santigrat": ("birim", "metric"), "selsiyus": ("birim", "metric"),
+    "kelvin": ("birim", "standard"),
+    "türkçe": ("dil", "tr"), "turkish": ("dil", "tr"),
+    "ingilizce": ("dil", "en"), "english": ("dil", "en"),
+    "almanca": ("dil", "de"), "german": ("dil", "de"),
+    "fransızca": ("dil", "fr"), "french": ("dil", "fr"),
+    "ispanyolca": ("dil", "es"), "spanish": ("dil", "es"),
+}
+
+# Şehir adı olarak yorumlanmaması gereken kelimeler
+_CITY_STOPWORDS = frozenset({
+    "bugün", "yarın", "şimdi", "burada", "bu", "şu", "orada", "hava", "için", "nasıl",
+    "today", "tomorrow", "now", "the", "weather", "what", "how",
+}) | frozenset(word for word in FOLLOW_UP_KEYWORDS if " " not in word)
+
+def _keyword_alternation(words) -> str:
+    """Kelimeleri uzundan kısaya sıralı bir regex alternatifine çevirir ("thanks", "thank"dan önce)"""
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+# Koordinatlar, şehir ifadeleri ve anahtar kelimeler için tek bir birleşik desen.
+# Alternatifler soldan sağa denenir; mesaj tek finditer geçişinde taranır ve
+# eşleşmeyen kelimeler Python'a hiç dönmeden atlanır. "in"/"for" sonrasındaki
+# kelime ileri bakışla yakalanır; şehir sözlüğünde yoksa kelime anahtar kelime
+# olarak taranmaya devam eder ("thank you for your help").
+_NUMBER = r"-?\d+(?:\.\d*)?"
+_WORD = r"[^\W\d_]+"
+_INTENT_PATTERN = re.compile(rf"""
+    \b(?:enlem|latitude|lat)[:\s]*(?P<lat>{_NUMBER})[,\s]*
+        (?:boylam|longitude|lon|lng)[:\s]*(?P<lon>{_NUMBER})
+  | (?P<lat_bare>{_NUMBER})[,\s]+(?P<lon_bare>{_NUMBER})
+  | \b(?:şehir|city|konum|location)[:\s]+(?P<city_after>{_WORD})
+  | \b(?:in|for)\s+(?=(?P<city_in>{_WORD}))
+  | \b(?P<city_before>{_WORD})(?:'{_WORD})?(?=\s+(?:için|hava)\b)
+  | \b(?P<keyword>{_keyword_alternation(w for w in INTENT_KEYWORDS if len(w) >= 4)})[^\W\d_]*
+  | \b(?P<short_keyword>{_keyword_alternation(w for w in INTENT_KEYWORDS if len(w) < 4)})\b
+""", re.VERBOSE)
+
+def _normalize_message(message: str) -> str:
+    """Mesajı Türkçe büyük İ harfini bozmadan küçük harfe çevirir"""
+    return message.replace("İ", "i").lower().replace("\u0307", "").strip()
+
+def parse_intent(message: str) -> tuple:
+    """
+    Sohbet mesajını tek geçişte çözümler ve (niyet, varlıklar) döndürür.
+
+    Niyetler: "koordinat" ({"enlem", "boylam"}), "geçersiz_koordinat",
+    "şehir" ({"şehir"}), "selamlama", "teşekkür", "yardım" ve "bilinmiyor".
+    Koordinatlar şehirden, şehir anahtar kelimelerden önceliklidir. "in" ve
+    "for" sonrasındaki kelime yalnızca şehir sözlüğünde varsa şehir sayılır.
+    """
+    city = None
+    keywords = set()
+
+    for match in _INTENT_PATTERN.finditer(_normalize_message(message)):
+        kind = match.lastgroup
+        if kind in ("lon", "lon_bare"):
+            if kind == "lon":
+                lat, lon = float(match.group("lat")), float(match.group("lon"))
+            else:
+                lat, lon = float(match.group("lat_bare")), float(match.group("lon_bare"))
+            if -90 <= lat <= 90 and -180 <= lon <= 180:
+                return "koordinat", {"enlem": lat, "boylam": lon}
+            return "geçersiz_koordinat", {"enlem": lat, "boylam": lon}
+
+        if kind in ("keyword", "short_keyword"):
+            keywords.add(INTENT_KEYWORDS[match.group(kind)])
+        elif kind == "city_in":
+            name = match.group(kind)
+            if city is None and gazetteer is not None and gazetteer.lookup(name) is not None:
+                city = name
+        elif city is None:
+            name = match.group(kind)
+            if len(name) > 2 and name not in _CITY_STOPWORDS:
+                city = name
+
+    if city is not None:
+        return "şehir", {"şehir": city}
+    for intent in _KEYWORD_PRIORITY:
+        if intent in keywords:
+            return intent, {}
+    return "bilinmiyor", {}
+
+# Takip ifadeleri ek almış hâlleriyle de eşleşir ("yarınki", "ingilizce'ye");
+# uzun ifadeler önce denenir ("yarından sonra", "yarın"dan önce)
+_FOLLOW_UP_PATTERN = re.compile(r"\b(" + "|".join(
+    r"\s+".join(re.escape(word) for word in phrase.split())
+    for phrase in sorted(FOLLOW_UP_KEYWORDS, key=len, reverse=True)
+) + r")[^\W\d_]*")
+
+def parse_follow_up(message: str) -> dict:
+    """
+    Mesajdaki takip ifadelerini {"gün", "birim", "dil"} alanlarına çözümler.
+
+    "ya yarın?" veya "and in Fahrenheit?" gibi konum içermeyen mesajlar
+    sohbet oturumundaki son konuma uygulanır. Aynı alan birden fazla kez
+    geçerse ilki geçerlidir.
+    """
+    context = {}
+    for match in _FOLLOW_UP_PATTERN.finditer(_normalize_message(message)):
+        slot, value = FOLLOW_UP_KEYWORDS[" ".join(match.group(1).split())]
+        context.setdefault(slot, value)
+    return context
+
 # ============================================================================
 # HAVA DURUMU ASİSTANI FONKSİYONLARI
 # ============================================================================
 
-class WeatherAssistant:
-    """Kullanıcı dostu hava durumu asistanı sınıfı"""
+# Asistan yanıt şablonları. Her parça bir kez oluşturulan format_map çağrısıdır;
+# yanıt parçaların listesi str.join ile birleştirilerek üretilir
+_HEADER_TEMPLATE = (
+    "🌍 **{şehir}, {ülke}** için hava durumu:\n\n"
+    "🌤️ **Genel Durum:** {açıklama}\n"
+    "🌡️ **Sıcaklık:** {mevcut}{birim}"
+).format_map
+_FEELS_LIKE_TEMPLATE = " (Hissedilen: {hissedilen}{birim})".format_map
+_RANGE_TEMPLATE = "📊 **Günlük Aralık:** {minimum}{birim} - {maksimum}{birim}\n".format_map
+_ATMOSPHERE_TEMPLATE = (
+    "💧 **Nem:** %{nem}\n"
+    "🔽 **Basınç:** {basınç} hPa\n"
+    "💨 **Rüzgar:** {hız} {birim}\n"
+).format_map
+_RAIN_TEMPLATE = "🌧️ **Yağış (Son 1 saat):** {son_1_saat} mm\n".format_map
+_SNOW_TEMPLATE = "❄️ **Kar (Son 1 saat):** {son_1_saat} mm\n".format_map
+_FORECAST_DAY_TEMPLATE = (
+    "📅 **{şehir}** için {gün} ({tarih}) tahmini:\n\n"
+    "🌤️ **Genel Durum:** {durum}\n"
+    "🌡️ **Sıcaklık:** {minimum}{birim} - {maksimum}{birim}\n"
+    "🌧️ **Yağış:** {yağış_mm} mm (olasılık %{yağış_olasılığı})\n"
+    "💨 **En Yüksek Rüzgar:** {maksimum_rüzgar} {rüzgar_birimi}\n"
+).format_map
+_DAY_NAMES = {0: "bugün", 1: "yarın", 2: "öbür gün"}
+
+# Oturumda hatırlanan sorgu metninin en fazla uzunluğu; daha uzun mesajlar saklanmaz
+_SESSION_QUERY_MAX_CHARS = 200
+
+class ConversationSession:
+    """
+    Tek bir sohbet oturumunun bağlamı: son konum, tercih edilen birim ve dil, son sorgular.
+
+    Son sorgular, normalize edilmiş mesajı çözümlenmiş hâliyle tutar; aynı mesaj
+    tekrar gelirse yeniden çözümlenmez. Binlerce eşzamanlı oturumun bellekte
+    küçük yer tutması için alanlar __slots__ ile tanımlanır ve son sorgular
+    ASSISTANT_SESSION_HISTORY uzunluğunda sabit boyutlu bir kuyrukta tutulur.
+    """
+
+    __slots__ = ("location", "units", "language", "queries")
 
     def __init__(self):
-        self.conversation_state = {}
+        self.location = None  # (enlem, boylam, ad)
+        self.units = None
+        self.language = None
+        self.queries = deque(maxlen=ASSISTANT_SESSION_HISTORY)  # (metin, niyet, varlıklar, takip)
+
+    def recall(self, text: str) -> Optional[tuple]:
+        """Aynı mesaj son sorgular arasındaysa (niyet, varlıklar, takip) döndürür"""
+        for query in self.queries:
+            if query[0] == text:
+                return query[1:]
+        return None
+
+    def remember(self, text: str, intent: str, entities: dict, follow_up: dict) -> None:
+        """Çözümlenmiş mesajı son sorgulara ekler; en eski sorgu düşer"""
+        if len(text) <= _SESSION_QUERY_MAX_CHARS:
+            self.queries.append((text, intent, entities, follow_up))
+
+def _session_id(session_id: Optional[str], ctx: Optional[Context]) -> str:
+    """Sohbet oturumunun anahtarı: verilen kimlik, yoksa MCP oturumu, o da yoksa ortak oturum"""
+    if session_id:
+        return str(session_id)
+    if ctx is not None:
+        try:
+            # Streamable HTTP'de her istemcinin kendi oturum başlığı vardır;
+            # stdio ve SSE'de bağlantının oturum nesnesi kullanılır
+            request = ctx.request_context.request
+            header = request.headers.get("mcp-session-id") if request is not None else None
+            return header or f"bağlantı-{id(ctx.session)}"
+        except Exception:
+            pass
+    return "varsayılan"
+
+class WeatherAssistant:
+    """Kullanıcı dostu hava durumu asistanı sınıfı"""
 
-    def format_weather_response(self, weather_data: dict) -> str:
-        """Hava durumu verisini kullanıcı dostu formatta sunar"""
+    def __init__(self, max_sessions: int = ASSISTANT_MAX_SESSIONS, session_ttl: float = ASSISTANT_SESSION_TTL):
+        # Sohbet oturumları: sınır aşılınca en az kullanılan, session_ttl
+        # boyunca kullanılmayan oturum silinir
+        self.sessions = TTLCache(session_ttl, max_sessions)
+
+        # Aynı konumun aynı ölçümü tekrar biçimlendirilmez
+        self.render_cache = TTLCache(float("inf"), ASSISTANT_CACHE_MAX_ENTRIES)
+
+    def session(self, session_id: str) -> ConversationSession:
+        """Oturumun bağlamını döndürür; yoksa ya da süresi dolduysa yenisini oluşturur"""
+        session = self.sessions.get(session_id)
+        return ConversationSession() if session is None else session
+
+    def save_session(self, session_id: str, session: ConversationSession) -> None:
+        """Oturumu en son kullanılan olarak saklar; boşta kalma süresi yeniden başlar"""
+        self.sessions.set(session_id, session)
+        self.sessions.prune()
+
+    @staticmethod
+    def _render_key(data: dict, language: str) -> Optional[tuple]:
+        """Yanıtın (konum, veri zamanı, birim, dil) anahtarı; veri zamanı yoksa None"""
+        konum = data.get("konum", {})
+        veri_zamani = data.get("zaman", {}).get("veri_zamanı")
+        if veri_zamani is None:
+            return None
+        return (
+            konum.get("enlem"),
+            konum.get("boylam"),
+            veri_zamani,
+            data.get("sıcaklık", {}).get("birim"),
+            data.get("rüzgar", {}).get("birim"),
+            language
+        )
+
+    def format_weather_response(self, weather_data: Union[dict, str], language: Optional[str] = None) -> str:
+        """
+        Hava durumu verisini kullanıcı dostu formatta sunar.
+
+        weather_data normalize edilmiş sözlük olmalıdır; geriye dönük uyumluluk için
+        JSON metni de kabul edilir. Aynı konum ve veri zamanı için üretilen metin
+        önbellekten döndürülür.
+        """
         try:
             data = json.loads(weather_data) if isinstance(weather_data, str) else weather_data
 
             if "error" in data:
                 return f"😔 Üzgünüm, bir hata oluştu: {data['error']}"
 
-            # Temel bilgileri çıkar
-            konum = data.get("konum", {})
-            hava = data.get("hava_durumu", {})
-            sicaklik = data.get("sıcaklık", {})
-            atmosfer = data.get("atmosfer", {})
-            ruzgar = data.get("rüzgar", {})
-
-            # Dostane yanıt oluştur
-            response = f"🌍 **{konum.get('şehir', 'Bilinmeyen konum')}, {konum.get('ülke', '')}** için hava durumu:\n\n"
-
-            # Ana hava durumu
-            response += f"🌤️ **Genel Durum:** {hava.get('açıklama', 'Bilinmiyor').title()}\n"
-
-            # Sıcaklık bilgileri
-            mevcut_sicaklik = sicaklik.get('mevcut', 'N/A')
-            hissedilen = sicaklik.get('hissedilen', 'N/A')
-            birim = sicaklik.get('birim', '°C')
-
-            response += f"🌡️ **Sıcaklık:** {mevcut_sicaklik}{birim}"
-            if hissedilen != 'N/A':
-                response += f" (Hissedilen: {hissedilen}{birim})"
-            response += "\n"
-
-            # Min-Max sıcaklık
-            min_temp = sicaklik.get('minimum', 'N/A')
-            max_temp = sicaklik.get('maksimum', 'N/A')
-            if min_temp != 'N/A' and max_temp != 'N/A':
-                response += f"📊 **Günlük Aralık:** {min_temp}{birim} - {max_temp}{birim}\n"
-
-            # Nem ve basınç
-            nem = atmosfer.get('nem', 'N/A')
-            basinc = atmosfer.get('basınç', 'N/A')
-            response += f"💧 **Nem:** %{nem}\n"
-            response += f"🔽 **Basınç:** {basinc} hPa\n"
-
-            # Rüzgar
-            ruzgar_hiz = ruzgar.get('hız', 0)
-            ruzgar_birim = ruzgar.get('birim', 'm/s')
-            response += f"💨 **Rüzgar:** {ruzgar_hiz} {ruzgar_birim}\n"
-
-            # Yağış bilgisi varsa
-            if "yağış" in data:
-                yagis = data["yağış"].get("son_1_saat", 0)
-                response += f"🌧️ **Yağış (Son 1 saat):** {yagis} mm\n"
-
-            if "kar" in data:
-                kar = data["kar"].get("son_1_saat", 0)
-                response += f"❄️ **Kar (Son 1 saat):** {kar} mm\n"
-
-            # Tavsiye ekle
-            response += "\n" + self._get_weather_advice(data)
+            key = self._render_key(data, language or LANGUAGE)
+            if key is not None:
+                cached = self.render_cache.get(key)
+                if cached is not None:
+                    return cached
 
+            response = self._render(data)
+            if key is not None:
+                self.render_cache.set(key, response)
             return response
 
         except Exception as e:
             return f"😔 Hava durumu bilgilerini işlerken bir hata oluştu: {str(e)}"
 
-    def _get_weather_advice(self, data: dict) -> str:
-        """Hava durumuna göre tavsiye verir"""
-        try:
-            sicaklik = data.get("sıcaklık", {}).get("mevcut", 20)
-            nem = data.get("atmosfer", {}).get("nem", 50)
-            ruzgar = data.get("rüzgar", {}).get("hız", 0)
-            hava_durumu = data.get("hava_durumu", {}).get("ana_durum", "").lower()
-
-            advice = "💡 **Tavsiyelerim:**\n"
-
-            # Sıcaklık tavsiyeleri
-            if sicaklik < 0:
-                advice += "🧥 Çok soğuk! Kalın kıyafetler giyin ve sıcak tutun.\n"
-            elif sicaklik < 10:
-                advice += "🧥 Soğuk hava, mont almayı unutmayın!\n"
-            elif sicaklik < 20:
-                advice += "👕 Serin hava, hafif bir ceket yeterli.\n"
-            elif sicaklik < 30:
-                advice += "👕 Güzel hava! Rahat kıyafetler tercih edin.\n"
-            else:
-                advice += "🌞 Çok sıcak! Bol su için ve gölgede kalın.\n"
-
-            # Hava durumu tavsiyeleri
-            if "rain" in hava_durumu or "drizzle" in hava_durumu:
-                advice += "☂️ Yağmur var, şemsiye almayı unutmayın!\n"
-            elif "snow" in hava_durumu:
-                advice += "❄️ Kar yağıyor, dikkatli yürüyün!\n"
-            elif "clear" in hava_durumu:
-                advice += "☀️ Açık hava! Dışarıda vakit geçirmek için harika!\n"
-
-            # Rüzgar tavsiyeleri
-            if ruzgar > 10:
-                advice += "💨 Rüzgarlı hava, saçınızı bağlamayı unutmayın!\n"
+    def _render(self, data: dict) -> str:
+        """Yanıt metnini şablonlardan üretir"""
+        konum = data.get("konum", {})
+        hava = data.get("hava_durumu", {})
+        sicaklik = data.get("sıcaklık", {})
+        atmosfer = data.get("atmosfer", {})
+        ruzgar = data.get("rüzgar", {})
+
+        temperature = {
+            "mevcut": sicaklik.get("mevcut", "N/A"),
+            "hissedilen": sicaklik.get("hissedilen", "N/A"),
+            "minimum": sicaklik.get("minimum", "N/A"),
+            "maksimum": sicaklik.get("maksimum", "N/A"),
+            "birim": sicaklik.get("birim", "°C")
+        }
 
-            # Nem tavsiyeleri
-            if nem > 80:
-                advice += "💧 Yüksek nem, serinletici içecekler tercih edin!\n"
+        parts = [_HEADER_TEMPLATE({
+            "şehir": konum.get("şehir", "Bilinmeyen konum"),
+            "ülke": konum.get("ülke", ""),
+            "açıklama": hava.get("açıklama", "Bilinmiyor").title(),
+            **temperature
+        })]
+        if temperature["hissedilen"] != "N/A":
+            parts.append(_FEELS_LIKE_TEMPLATE(temperature))
+        parts.append("\n")
+        if temperature["minimum"] != "N/A" and temperature["maksimum"] != "N/A":
+            parts.append(_RANGE_TEMPLATE(temperature))
+
+        parts.append(_ATMOSPHERE_TEMPLATE({
+            "nem": atmosfer.get("nem", "N/A"),
+            "basınç": atmosfer.get("basınç", "N/A"),
+            "hız": ruzgar.get("hız", 0),
+            "birim": ruzgar.get("birim", "m/s")
+        }))
+
+        # Yağış bilgisi varsa
+        if "yağış" in data:
+            parts.append(_RAIN_TEMPLATE({"son_1_saat": data["yağış"].get("son_1_saat", 0)}))
+        if "kar" in data:
+            parts.append(_SNOW_TEMPLATE({"son_1_saat": data["kar"].get("son_1_saat", 0)}))
+
+        # Tavsiye ekle
+        parts.append("\n")
+        parts.append(self._get_weather_advice(data))
+        return "".join(parts)
 
-            return advice
+    def _get_weather_advice(self, data: dict) -> str:
+        """Hava durumuna göre tavsiye verir; kurallar ADVICE_RULES_FILE dosyasından gelir"""
+        try:
+            lines = advice_rules.advise(data)
+        except Exception:
+            # Sayısal olmayan alanlar gibi beklenmeyen verilerde genel tavsiye döner
+            lines = None
 
-        except:
+        if not lines:
             return "💡 **Tavsiye:** Hava durumuna uygun kıyafet seçin ve güzel bir gün geçirin! 😊"
+        lines.append("")
+        return "💡 **Tavsiyelerim:**\n" + "\n".join(lines)
+
+    def format_forecast_day(self, forecast: ForecastSeries, day: int, name: str) -> str:
+        """Tahminin bugünden day gün sonraki (yerel) gününü kullanıcı dostu formatta sunar"""
+        today = datetime.fromtimestamp(time.time() + forecast.timezone, timezone.utc).date()
+        target = (today + timedelta(days=day)).isoformat()
+        day_name = _DAY_NAMES.get(day, target)
+
+        summary = next((item for item in forecast.daily() if item["tarih"] == target), None)
+        if summary is None:
+            return f"😅 {name} için {day_name} tahmini bulunamadı. Tahminler en fazla 5 gün sonrasını kapsar."
+
+        return _FORECAST_DAY_TEMPLATE({
+            **summary,
+            "şehir": name,
+            "gün": day_name,
+            "durum": summary["baskın_durum"].title(),
+            "birim": _temperature_unit(forecast.units),
+            "rüzgar_birimi": _wind_unit(forecast.units)
+        })
 
 # Global asistan instance
 weather_assistant = WeatherAssistant()
@@ -401,77 +3764,113 @@ async def get_weather(latitude: float, longitude: float) -> str:
     Returns:
         Kullanıcı dostu formatta hava durumu bilgileri
     """
-    # Mevcut hava durumu verisini al
-    weather_data = await get_weather_by_coordinates(latitude, longitude)
+    # Mevcut hava durumu verisini sözlük olarak al; JSON'a çevrilip geri okunmaz
+    weather_info = await _weather_for_coordinates(latitude, longitude, DEFAULT_UNITS, LANGUAGE)
 
     # Asistan formatında sun
-    return weather_assistant.format_weather_response(weather_data)
+    return weather_assistant.format_weather_response(weather_info, LANGUAGE)
 
 @mcp.tool()
-async def chat_weather_assistant(message: str) -> str:
+async def chat_weather_assistant(message: str, session_id: str = None, ctx: Context = None) -> str:
     """
     Hava durumu asistanı ile sohbet et.
 
     Bu araç kullanıcının mesajlarını analiz eder ve uygun yanıtlar verir.
-    Koordinat bilgilerini toplar ve hava durumu sorgular.
+    Koordinat bilgilerini toplar ve hava durumu sorgular. Her oturum için son
+    konum, tercih edilen birim ve dil hatırlanır; "ya yarın?" veya
+    "Fahrenheit olarak?" gibi takip soruları son konuma uygulanır.
 
     Args:
         message: Kullanıcının mesajı
+        session_id: Sohbet oturumu kimliği (verilmezse MCP oturumu kullanılır)
 
     Returns:
         Asistan yanıtı
     """
-    message = message.lower().strip()
-
-    # Koordinat arama regex'leri
-    coord_patterns = [
-        r'enlem[:\s]*(-?\d+\.?\d*)[,\s]*boylam[:\s]*(-?\d+\.?\d*)',
-        r'lat[:\s]*(-?\d+\.?\d*)[,\s]*lon[:\s]*(-?\d+\.?\d*)',
-        r'latitude[:\s]*(-?\d+\.?\d*)[,\s]*longitude[:\s]*(-?\d+\.?\d*)',
-        r'(-?\d+\.?\d*)[,\s]+(-?\d+\.?\d*)'  # Sadece sayılar
-    ]
-
-    # Koordinat arama
-    for pattern in coord_patterns:
-        match = re.search(pattern, message)
-        if match:
-            try:
-                lat = float(match.group(1))
-                lon = float(match.group(2))
-
-                # Koordinat doğrulaması
-                if -90 <= lat <= 90 and -180 <= lon <= 180:
-                    # Hava durumu bilgisini al ve formatla
-                    weather_data = await get_weather_by_coordinates(lat, lon)
-                    formatted_response = weather_assistant.format_weather_response(weather_data)
-
-                    return f"Harika! Koordinatlarınızı aldım. İşte hava durumu bilginiz:\n\n{formatted_response}"
-                else:
-                    return "😅 Koordinatlar geçerli aralıkta değil. Enlem -90 ile 90, boylam -180 ile 180 arasında olmalı."
-            except ValueError:
-                continue
-
-    # Şehir adı arama
-    city_patterns = [
-        r'(?:şehir|city|konum|location)[:\s]*([a-zA-ZğüşıöçĞÜŞİÖÇ]+)',
-        r'([a-zA-ZğüşıöçĞÜŞİÖÇ]+)(?:\s+için\s+hava|\s+hava)',
-        r'([a-zA-ZğüşıöçĞÜŞİÖÇ]+)(?:\s+için)',
-    ]
-
-    for pattern in city_patterns:
-        match = re.search(pattern, message)
-        if match:
-            city_name = match.group(1).strip()
-            if len(city_name) > 2:  # En az 3 karakter
-                try:
-                    weather_data = await get_weather_by_city(city_name)
-                    formatted_response = weather_assistant.format_weather_response(weather_data)
-                    return f"Buldum! {city_name.title()} için hava durumu:\n\n{formatted_response}"
-                except:
-                    return f"😔 Üzgünüm, '{city_name}' şehrini bulamadım. Koordinatlarınızı verebilir misiniz?"
+    key = _session_id(session_id, ctx)
+    session = weather_assistant.session(key)
+    try:
+        return await _chat_reply(message, session)
+    finally:
+        weather_assistant.save_session(key, session)
+
+async def _forecast_reply(location: tuple, day: int, units: str, language: str) -> str:
+    """Konumun day gün sonraki tahminini asistan formatında döndürür"""
+    latitude, longitude, name = location
+    forecast = await _forecast_for_coordinates(latitude, longitude, units, language)
+    if isinstance(forecast, dict):
+        return f"😔 Üzgünüm, hava tahmini alınamadı: {forecast['error']}"
+    return weather_assistant.format_forecast_day(forecast, day, name)
+
+async def _chat_reply(message: str, session: ConversationSession) -> str:
+    """Mesajı oturum bağlamıyla yanıtlar ve bağlamı günceller"""
+    # Oturumda tekrarlanan mesajlar yeniden çözümlenmez
+    text = _normalize_message(message)
+    parsed = session.recall(text)
+    if parsed is None:
+        intent, entities = parse_intent(message)
+        follow_up = parse_follow_up(message)
+        session.remember(text, intent, entities, follow_up)
+    else:
+        intent, entities, follow_up = parsed
+
+    # Birim ve dil tercihleri oturum boyunca geçerlidir; gün yalnızca bu mesaja uygulanır
+    session.units = follow_up.get("birim", session.units)
+    session.language = follow_up.get("dil", session.language)
+    units = session.units or DEFAULT_UNITS
+    language = session.language or LANGUAGE
+    day = follow_up.get("gün", 0)
+
+    if intent == "koordinat":
+        # Hava durumu bilgisini al ve formatla
+        weather_info = await _weather_for_coordinates(entities["enlem"], entities["boylam"], units, language)
+        if "error" not in weather_info:
+            session.location = (entities["enlem"], entities["boylam"], weather_info["konum"]["şehir"])
+            if day:
+                return await _forecast_reply(session.location, day, units, language)
+        formatted_response = weather_assistant.format_weather_response(weather_info, language)
+        return f"Harika! Koordinatlarınızı aldım. İşte hava durumu bilginiz:\n\n{formatted_response}"
+
+    if intent == "geçersiz_koordinat":
+        return "😅 Koordinatlar geçerli aralıkta değil. Enlem -90 ile 90, boylam -180 ile 180 arasında olmalı."
+
+    # Kalıba uymayan mesajlarda bilinen bir şehir adı geçiyorsa onu kullan
+    if intent in ("yardım", "bilinmiyor") and gazetteer is not None:
+        place = gazetteer.find_in_text(message)
+        if place is not None:
+            intent, entities = "şehir", {"şehir": place["ad"]}
+
+    if intent == "şehir":
+        city_name = entities["şehir"]
+        place = gazetteer.lookup(city_name) if gazetteer is not None else None
+        if place is not None:
+            city_name = place["ad"]
+        weather_info = await _weather_for_city(city_name, "", units, language)
+        if "error" in weather_info:
+            return f"😔 Üzgünüm, '{city_name}' şehrini bulamadım. Koordinatlarınızı verebilir misiniz?"
+
+        # Takip soruları için şehir adı değil çözümlenen koordinatlar saklanır
+        konum = weather_info["konum"]
+        session.location = (konum["enlem"], konum["boylam"], city_name.title())
+        if day:
+            return await _forecast_reply(session.location, day, units, language)
+        formatted_response = weather_assistant.format_weather_response(weather_info, language)
+        return f"Buldum! {city_name.title()} için hava durumu:\n\n{formatted_response}"
+
+    # Konum içermeyen takip soruları oturumdaki son konuma uygulanır
+    if follow_up and intent in ("yardım", "bilinmiyor"):
+        if session.location is not None:
+            if day:
+                return await _forecast_reply(session.location, day, units, language)
+            latitude, longitude, name = session.location
+            weather_info = await _weather_for_coordinates(latitude, longitude, units, language)
+            formatted_response = weather_assistant.format_weather_response(weather_info, language)
+            return f"Tabii! {name} için hava durumu:\n\n{formatted_response}"
+        if "birim" in follow_up or "dil" in follow_up:
+            return "👍 Tercihinizi kaydettim! Hangi konumun hava durumunu öğrenmek istersiniz? Koordinatlarınızı veya şehir adınızı paylaşabilirsiniz. 🌍"
 
     # Genel yanıtlar
-    if any(word in message for word in ['merhaba', 'selam', 'hello', 'hi']):
+    if intent == "selamlama":
         return """🌤️ Merhaba! Ben hava durumu asistanınızım! 😊
 
 Size hava durumu bilgisi verebilmek için şunlardan birini paylaşabilirsiniz:
@@ -486,10 +3885,10 @@ Size hava durumu bilgisi verebilmek için şunlardan birini paylaşabilirsiniz:
 
 Hangi konum için hava durumu öğrenmek istiyorsunuz? 🌍"""
 
-    elif any(word in message for word in ['teşekkür', 'sağol', 'thanks', 'thank you']):
+    elif intent == "teşekkür":
         return "😊 Rica ederim! Başka bir konumun hava durumunu öğrenmek isterseniz, koordinatlarını veya şehir adını söylemeniz yeterli! 🌤️"
 
-    elif any(word in message for word in ['yardım', 'help', 'nasıl']):
+    elif intent == "yardım":
         return """🆘 **Nasıl kullanılır:**
 
 1️⃣ **Koordinat ile:**
@@ -504,6 +3903,10 @@ Hangi konum için hava durumu öğrenmek istiyorsunuz? 🌍"""
    • "İstanbul'da hava nasıl?"
    • "Ankara'nın hava durumu nedir?"
 
+4️⃣ **Takip soruları ile:**
+   • "Ya yarın?"
+   • "Fahrenheit olarak"
+
 Koordinatlarınızı bilmiyorsanız, şehir adınızı söylemeniz yeterli! 😊"""
 
     else:
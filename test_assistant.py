@@ -7,12 +7,21 @@ Bu dosya, yeni entegre edilen hava durumu asistanının fonksiyonlarını test e
 
 import asyncio
 import json
+import time
 from server import (
     get_weather, 
     chat_weather_assistant, 
     weather_greeting,
     get_weather_by_coordinates,
-    weather_assistant
+    weather_assistant,
+    parse_intent,
+    parse_follow_up,
+    WeatherAssistant,
+    _normalize_weather,
+    _convert_weather,
+    advice_rules,
+    _ConditionRule,
+    ASSISTANT_SESSION_HISTORY
 )
 
 async def test_assistant():
@@ -37,6 +46,8 @@ async def test_assistant():
         "İstanbul için hava durumu",
         "Enlem: 41.0082, Boylam: 28.9784",
         "39.9334, 32.8597",  # Ankara koordinatları
+        "Ya yarın?",  # Son konum için yarının tahmini
+        "Fahrenheit olarak",  # Son konum, tercih edilen birimle
         "Teşekkürler"
     ]
     
@@ -84,6 +95,223 @@ async def test_error_handling():
     response = await chat_weather_assistant("XYZ123 şehri için hava durumu")
     print(response)
 
+def test_intent_parser():
+    """Niyet çözümleme testleri (ağ gerektirmez)"""
+
+    print("\n🧭 NİYET ÇÖZÜMLEME TESTLERİ:")
+    print("-" * 30)
+
+    cases = [
+        ("Merhaba", "selamlama", {}),
+        ("Teşekkürler!", "teşekkür", {}),
+        ("Yardım", "yardım", {}),
+        ("İstanbul için hava durumu", "şehir", {"şehir": "istanbul"}),
+        ("Ankara'nın hava durumu nedir?", "şehir", {"şehir": "ankara"}),
+        ("weather in London", "şehir", {"şehir": "london"}),
+        ("Enlem: 41.0082, Boylam: 28.9784", "koordinat", {"enlem": 41.0082, "boylam": 28.9784}),
+        ("39.9334, 32.8597", "koordinat", {"enlem": 39.9334, "boylam": 32.8597}),
+        ("lat 91 lon 5", "geçersiz_koordinat", {"enlem": 91.0, "boylam": 5.0}),
+        ("Bugün yağmur yağacak mı?", "bilinmiyor", {}),
+        # "in"/"for" sonrası yalnızca bilinen şehirler şehir sayılır
+        ("thank you for your help", "teşekkür", {}),
+        ("thanks for everything", "teşekkür", {}),
+        ("I need help for this", "yardım", {}),
+        ("weather for Ankara", "şehir", {"şehir": "ankara"}),
+    ]
+
+    passed = 0
+    for message, intent, entities in cases:
+        result = parse_intent(message)
+        ok = result == (intent, entities)
+        passed += ok
+        print(f"{'✅' if ok else '❌'} '{message}' → {result}")
+
+    print(f"\n📊 {passed}/{len(cases)} mesaj doğru çözümlendi")
+    return passed == len(cases)
+
+def test_format_engine():
+    """Asistan yanıt biçimlendirmesi ve önbelleği testleri (ağ gerektirmez)"""
+
+    print("\n💬 YANIT BİÇİMLENDİRME TESTLERİ:")
+    print("-" * 30)
+
+    payload = {
+        "coord": {"lat": 39.9334, "lon": 32.8597},
+        "weather": [{"id": 500, "main": "Rain", "description": "hafif yağmur", "icon": "10d"}],
+        "main": {"temp": 4.1, "feels_like": 1.5, "temp_min": 2.0, "temp_max": 6.0,
+                 "pressure": 1016, "humidity": 85},
+        "wind": {"speed": 11.2, "deg": 40},
+        "clouds": {"all": 90},
+        "rain": {"1h": 0.6},
+        "sys": {"country": "TR", "sunrise": 1700000000, "sunset": 1700040000},
+        "dt": 1700020000,
+        "timezone": 10800,
+        "name": "Ankara"
+    }
+    data = _normalize_weather(payload, "metric")
+    assistant = WeatherAssistant()
+
+    from_dict = assistant.format_weather_response(data)
+    from_json = assistant.format_weather_response(json.dumps(data, ensure_ascii=False))
+    print(from_dict)
+
+    checks = [
+        ("sözlük ve JSON aynı metni üretir", from_dict == from_json),
+        ("ikinci çağrı önbellekten döner", assistant.render_cache.hits == 1),
+        ("yağış satırı var", "🌧️ **Yağış (Son 1 saat):** 0.6 mm" in from_dict),
+        ("tavsiyeler eklendi", "☂️ Yağmur var" in from_dict and "💨 Rüzgarlı hava" in from_dict),
+        ("hata mesajı", assistant.format_weather_response({"error": "x"}).startswith("😔")),
+    ]
+
+    passed = 0
+    for name, ok in checks:
+        passed += ok
+        print(f"{'✅' if ok else '❌'} {name}")
+
+    print(f"\n📊 {passed}/{len(checks)} kontrol başarılı")
+    return passed == len(checks)
+
+def test_advice_rules():
+    """Tavsiye kuralları testleri (ağ gerektirmez)"""
+
+    print("\n💡 TAVSİYE KURALLARI TESTLERİ:")
+    print("-" * 30)
+
+    def record(temp, condition_id, wind=3.0, humidity=50):
+        return _normalize_weather({
+            "coord": {"lat": 41.0, "lon": 29.0},
+            "weather": [{"id": condition_id, "main": "", "description": "", "icon": "01d"}],
+            "main": {"temp": temp, "feels_like": temp, "temp_min": temp, "temp_max": temp,
+                     "pressure": 1013, "humidity": humidity},
+            "wind": {"speed": wind, "deg": 0},
+            "clouds": {"all": 0},
+            "sys": {"country": "TR", "sunrise": 0, "sunset": 0},
+            "dt": 0,
+            "timezone": 0
+        }, "metric")
+
+    cases = [
+        ("-0.5°C çok soğuk", record(-0.5, 804), "🧥 Çok soğuk!"),
+        ("0°C soğuk bandında", record(0, 804), "🧥 Soğuk hava"),
+        ("30°C çok sıcak", record(30, 804), "🌞 Çok sıcak!"),
+        ("çisenti şemsiye", record(15, 301), "☂️ Yağmur var"),
+        ("kar", record(-3, 601), "❄️ Kar yağıyor"),
+        ("açık hava", record(22, 800), "☀️ Açık hava!"),
+        ("10.5 m/s rüzgarlı", record(22, 804, wind=10.5), "💨 Rüzgarlı hava"),
+        ("nem %81", record(22, 804, humidity=81), "💧 Yüksek nem"),
+        ("Fahrenheit çevrilir", _convert_weather(record(15, 804), "imperial", "tr"), "👕 Serin hava"),
+    ]
+    absent = [
+        ("10 m/s rüzgarlı sayılmaz", record(22, 804, wind=10), "💨"),
+        ("gök gürültüsünde şemsiye yok", record(22, 211), "☂️"),
+    ]
+
+    passed = 0
+    for name, data, expected in cases:
+        ok = any(line.startswith(expected) for line in advice_rules.advise(data))
+        passed += ok
+        print(f"{'✅' if ok else '❌'} {name}")
+    for name, data, unexpected in absent:
+        ok = not any(line.startswith(unexpected) for line in advice_rules.advise(data))
+        passed += ok
+        print(f"{'✅' if ok else '❌'} {name}")
+
+    # Toplu işaretleme tek tek sonuçlarla aynı olmalı; hatalı kayıtlar None döner
+    records = [data for _, data, _ in cases] + [{"error": "x"}]
+    batch = advice_rules.annotate(records)
+    ok = batch[:-1] == [advice_rules.advise(data) for data in records[:-1]] and batch[-1] is None
+    passed += ok
+    print(f"{'✅' if ok else '❌'} toplu işaretleme")
+
+    # Derlenmiş kurallar ızgaradaki sütun sütun değerlendirmeyle aynı sonucu vermeli
+    metric = records[:-2]
+    columns = advice_rules.evaluate(
+        lambda path: [data[path[0]][path[1]] for data in metric],
+        lambda section: metric[0][section].get("birim"),
+        [True] * len(metric)
+    )
+    ok = columns == [advice_rules.advise(data) for data in metric]
+    passed += ok
+    print(f"{'✅' if ok else '❌'} sütun değerlendirmesi")
+
+    # Sayısal olmayan alanlarda asistan genel tavsiyeye döner
+    assistant = WeatherAssistant()
+    ok = all(
+        assistant._get_weather_advice(data).startswith("💡 **Tavsiye:**")
+        for data in ({"sıcaklık": {"mevcut": "N/A"}}, {"atmosfer": {"nem": "N/A"}})
+    )
+    passed += ok
+    print(f"{'✅' if ok else '❌'} sayısal olmayan alanda genel tavsiye")
+
+    # OpenWeatherMap kodları dışındaki aralıklar reddedilir
+    try:
+        _ConditionRule({"alan": "hava_durumu.kod", "kodlar": [{"aralık": [0, 100000000], "tavsiye": "x"}]})
+        ok = False
+    except ValueError:
+        ok = True
+    passed += ok
+    print(f"{'✅' if ok else '❌'} geçersiz kod aralığı reddedildi")
+
+    total = len(cases) + len(absent) + 4
+    print(f"\n📊 {passed}/{total} kontrol başarılı")
+    return passed == total
+
+def test_conversation_sessions():
+    """Sohbet oturumu bağlamı testleri (ağ gerektirmez)"""
+
+    print("\n🗂️ SOHBET OTURUMU TESTLERİ:")
+    print("-" * 30)
+
+    checks = []
+
+    # Takip ifadeleri konum olarak yorumlanmaz
+    checks.append(("'ya yarın?' → gün 1", parse_follow_up("ya yarın?") == {"gün": 1}))
+    checks.append(("'yarından sonra' → gün 2", parse_follow_up("Ankara'da yarından sonra") == {"gün": 2}))
+    checks.append(("'and in Fahrenheit?' → imperial",
+                   parse_follow_up("and in Fahrenheit?") == {"birim": "imperial"}
+                   and parse_intent("and in Fahrenheit?") == ("bilinmiyor", {})))
+    checks.append(("'İngilizce' → en", parse_follow_up("İngilizce lütfen") == {"dil": "en"}))
+    checks.append(("konumsuz mesajda bağlam yok", parse_follow_up("Merhaba") == {}))
+
+    # En az kullanılan oturum sınır aşılınca çıkarılır
+    assistant = WeatherAssistant(max_sessions=2)
+    for key in ["a", "b"]:
+        session = assistant.session(key)
+        session.location = (41.0, 29.0, key)
+        assistant.save_session(key, session)
+    assistant.save_session("a", assistant.session("a"))
+    assistant.save_session("c", assistant.session("c"))
+    checks.append(("LRU: 'b' çıkarıldı, 'a' korundu",
+                   assistant.session("b").location is None and assistant.session("a").location is not None))
+
+    # Boşta kalan oturumun süresi dolar
+    assistant = WeatherAssistant(session_ttl=0.05)
+    session = assistant.session("a")
+    session.units = "imperial"
+    assistant.save_session("a", session)
+    time.sleep(0.1)
+    assistant.save_session("b", assistant.session("b"))
+    checks.append(("boşta kalan oturum silindi", len(assistant.sessions) == 1 and assistant.session("a").units is None))
+
+    # Son sorgular sınırlıdır, uzun mesajlar saklanmaz ve kayıt __dict__ taşımaz
+    for i in range(ASSISTANT_SESSION_HISTORY + 3):
+        session.remember(f"mesaj {i}", "bilinmiyor", {}, {})
+    session.remember("x" * 500, "bilinmiyor", {}, {})
+    checks.append(("son sorgular sınırlı",
+                   len(session.queries) == ASSISTANT_SESSION_HISTORY
+                   and session.recall("mesaj 0") is None
+                   and session.recall(f"mesaj {ASSISTANT_SESSION_HISTORY + 2}") == ("bilinmiyor", {}, {})
+                   and session.recall("x" * 500) is None
+                   and not hasattr(session, "__dict__")))
+
+    passed = 0
+    for name, ok in checks:
+        passed += ok
+        print(f"{'✅' if ok else '❌'} {name}")
+
+    print(f"\n📊 {passed}/{len(checks)} kontrol başarılı")
+    return passed == len(checks)
+
 def interactive_test():
     """İnteraktif test modu"""
     
@@ -119,6 +347,18 @@ if __name__ == "__main__":
     
     # Hata testleri
     asyncio.run(test_error_handling())
+
+    # Niyet çözümleme testleri
+    test_intent_parser()
+
+    # Yanıt biçimlendirme testleri
+    test_format_engine()
+
+    # Tavsiye kuralları testleri
+    test_advice_rules()
+
+    # Sohbet oturumu testleri
+    test_conversation_sessions()
     
     # İnteraktif mod seçeneği
     choice = input("\n🎮 İnteraktif test modunu başlatmak ister misiniz? (e/h): ").lower()
@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Weather Forecast MCP Server Ağ Gerektirmeyen Testler
+
+Bu dosya, server'ın iç bileşenlerini OpenWeatherMap'e çıkmadan test eder.
+HTTP katmanı httpx.MockTransport ile taklit edilir.
+
+Kullanım:
+    python test_offline.py
+"""
+
+import asyncio
+import json
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+
+# Paylaşılan disk önbelleğine dokunulmaz; disk testleri kendi geçici dosyalarını kullanır
+os.environ["WEATHER_DISK_CACHE_PATH"] = ""
+
+# Server modülünü import et
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import httpx
+import server
+
+@contextmanager
+def patched(**attrs):
+    """server modülündeki adları test süresince değiştirir, sonra eski hâllerine döndürür"""
+    saved = {name: getattr(server, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(server, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(server, name, value)
+
+def mock_http(handler):
+    """
+    Sahte transport kullanan istemci fabrikası ve gelen isteklerin listesini döndürür.
+
+    handler her istek için httpx.Response döndürür ya da httpx.TransportError fırlatır.
+    """
+    requests = []
+
+    def record(request):
+        requests.append(request)
+        return handler(request)
+
+    return requests, lambda: httpx.AsyncClient(transport=httpx.MockTransport(record))
+
+def owm_payload(latitude: float = 41.01, longitude: float = 28.98, temp: float = 20.0) -> dict:
+    """Örnek OpenWeatherMap güncel hava durumu yanıtı"""
+    return {
+        "coord": {"lat": latitude, "lon": longitude},
+        "weather": [{"id": 800, "main": "Clear", "description": "clear sky", "icon": "01d"}],
+        "main": {"temp": temp, "feels_like": temp, "temp_min": temp - 2, "temp_max": temp + 2,
+                 "pressure": 1013, "humidity": 60},
+        "visibility": 10000,
+        "wind": {"speed": 3.5, "deg": 180},
+        "clouds": {"all": 0},
+        "sys": {"country": "TR", "sunrise": 1700000000, "sunset": 1700040000},
+        "dt": 1700020000,
+        "timezone": 10800,
+        "name": "Istanbul"
+    }
+
+def report(checks: list) -> bool:
+    """(ad, sonuç) kontrollerini yazdırır ve hepsi başarılıysa True döndürür"""
+    for name, ok in checks:
+        print(f"{'✅' if ok else '❌'} {name}")
+    return all(ok for _, ok in checks)
+
+def test_http_client_loop_change():
+    """Event loop değiştiğinde önceki HTTP istemcisinin kapatıldığını test et."""
+    print("\n🔌 HTTP istemcisi yaşam döngüsü testi...")
+
+    clients = []
+
+    async def use():
+        clients.append(server.get_http_client())
+        await clients[-1].get("https://api.openweathermap.org/data/2.5/weather")
+
+    _, factory = mock_http(lambda request: httpx.Response(200, json={}))
+    with patched(_create_http_client=factory, _http_client=None, _http_client_loop=None, _http_client_guard=None):
+        # asyncio.run loop'u kapatmadan önce istemciyi de kapatır
+        asyncio.run(use())
+        closed_with_run = clients[0].is_closed
+
+        # Açık kalan bir loop'un istemcisi, loop değişince o loop'ta kapatılır
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(use())
+            asyncio.run(use())
+            loop.run_until_complete(asyncio.sleep(0))
+            closed_on_old_loop = clients[1].is_closed
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    return report([
+        ("asyncio.run sonunda istemci kapandı", closed_with_run),
+        ("loop değişince önceki istemci kapandı", closed_on_old_loop),
+        ("her loop kendi istemcisini kullandı", len({id(client) for client in clients}) == 3)
+    ])
+
+def test_rate_limiter():
+    """API bütçesinin bekletme, reddetme, 429 ve bayat kayıt davranışlarını test et."""
+    print("\n🪣 API kotası testi...")
+
+    checks = []
+
+    async def queue_until_refill():
+        # Saniyede 10 jeton: boş kovada sıradaki çağrı ~0.1 saniye bekler
+        limiter = server.RateLimiter(60, 0)
+        limiter.buckets["dakikalık"] = server.TokenBucket(2, 0.2)
+        await limiter.acquire(0)
+        await limiter.acquire(0)
+        started = time.monotonic()
+        await limiter.acquire(1.0)
+        waited = time.monotonic() - started
+        checks.append(("boş kovada deadline içinde beklendi", 0.05 <= waited < 1.0 and limiter.queued == 1))
+        checks.append(("bekleyen çağrı jeton aldı", limiter.acquired == 3 and limiter.rejected == 0))
+
+    async def reject_after_deadline():
+        limiter = server.RateLimiter(60, 0)
+        limiter.buckets["dakikalık"] = server.TokenBucket(1, 10)
+        await limiter.acquire(0)
+        started = time.monotonic()
+        try:
+            await limiter.acquire(0.5)
+            rejected = False
+        except server.RateLimitExceeded as e:
+            rejected = e.retry_after > 0.5
+        checks.append(("deadline'ı aşacak çağrı beklemeden reddedildi",
+                       rejected and time.monotonic() - started < 0.1 and limiter.rejected == 1))
+
+    async def drain_on_429():
+        limiter = server.RateLimiter(60, 0)
+        _, factory = mock_http(lambda request: httpx.Response(429, json={"message": "limit"}))
+        with patched(_create_http_client=factory, _http_client=None, _http_client_loop=None,
+                     rate_limiter=limiter, circuit_breaker=server.CircuitBreaker(5, 30)):
+            try:
+                await server._owm_get(server.BASE_URL, {"lat": 1, "lon": 1}, max_wait=0)
+            except httpx.HTTPStatusError:
+                pass
+            try:
+                await limiter.acquire(0)
+                blocked = False
+            except server.RateLimitExceeded:
+                blocked = True
+        checks.append(("429 sonrası dakikalık kova boşaltıldı",
+                       limiter.throttled == 1 and limiter.buckets["dakikalık"].remaining() == 0 and blocked))
+
+    async def stale_fallback():
+        # Kova boş ve 5 saniyede dolmayacak: güncel veri yerine bayat kayıt döner
+        limiter = server.RateLimiter(60, 0)
+        limiter.buckets["dakikalık"] = server.TokenBucket(1, 3600)
+        await limiter.acquire(0)
+        cache = server.TTLCache(60, 10, 3600)
+        cache_key = server._cache_key(41.01, 28.98)
+        cache.set(cache_key, server._normalize_weather(owm_payload(), "metric"), stored_at=time.time() - 120)
+        requests, factory = mock_http(lambda request: httpx.Response(200, json=owm_payload()))
+        with patched(_create_http_client=factory, _http_client=None, _http_client_loop=None,
+                     rate_limiter=limiter, weather_cache=cache, STALE_WHILE_REVALIDATE=False):
+            result = await server._canonical_weather_for_coordinates(41.01, 28.98)
+            missing = await server._canonical_weather_for_coordinates(39.93, 32.86)
+        info = result.get("önbellek", {})
+        checks.append(("kota dolunca bayat kayıt döndü",
+                       info.get("bayat") is True and info.get("neden") == "API istek limiti aşıldı" and not requests))
+        checks.append(("önbellekte kayıt yoksa kota hatası döndü", missing.get("error") == "API istek limiti aşıldı"))
+
+    for scenario in (queue_until_refill, reject_after_deadline, drain_on_429, stale_fallback):
+        asyncio.run(scenario())
+    return report(checks)
+
+def test_circuit_breaker():
+    """Devre kesicinin durum geçişlerini test et."""
+    print("\n🔁 Devre kesici testi...")
+
+    checks = []
+    breaker = server.CircuitBreaker(3, 0.1)
+
+    def rejected() -> bool:
+        try:
+            breaker.check()
+            return False
+        except server.CircuitOpenError:
+            return True
+
+    # Eşiğin altındaki hatalar devreyi açmaz, eşikte açılır
+    for _ in range(2):
+        breaker.check()
+        breaker.record(False)
+    checks.append(("eşik altında devre kapalı", breaker.state == breaker.CLOSED))
+    breaker.check()
+    breaker.record(False)
+    checks.append(("3 hatadan sonra devre açıldı", breaker.state == breaker.OPEN and rejected()))
+
+    # Bekleme süresi dolunca yalnızca tek deneme çağrısına izin verilir
+    time.sleep(0.15)
+    breaker.check()
+    checks.append(("yarı açıkta tek deneme çağrısı", breaker.state == breaker.HALF_OPEN and rejected()))
+    breaker.record(True)
+    checks.append(("başarılı deneme devreyi kapattı", breaker.state == breaker.CLOSED and breaker.failures == 0))
+
+    # Yarı açıktaki başarısız deneme devreyi eşik beklenmeden yeniden açar
+    for _ in range(3):
+        breaker.check()
+        breaker.record(False)
+    time.sleep(0.15)
+    breaker.check()
+    breaker.record(False)
+    checks.append(("başarısız deneme devreyi yeniden açtı",
+                   breaker.state == breaker.OPEN and breaker.times_opened == 3 and rejected()))
+
+    # None sonuç (örneğin kota hatası) deneme hakkını geri verir, durumu değiştirmez
+    time.sleep(0.15)
+    breaker.check()
+    breaker.record(None)
+    checks.append(("sonuçsuz deneme yeni denemeye izin verdi", breaker.state == breaker.HALF_OPEN and not rejected()))
+
+    return report(checks)
+
+def test_retries():
+    """Yeniden deneme sayısını, geri çekilme sınırını ve devre kesiciyle birlikte çalışmayı test et."""
+    print("\n🔄 Yeniden deneme testi...")
+
+    checks = []
+    delays = []
+
+    def record_delay(attempt: int) -> float:
+        delays.append(attempt)
+        return 0.0
+
+    async def call(handler, breaker):
+        requests, factory = mock_http(handler)
+        with patched(_create_http_client=factory, _http_client=None, _http_client_loop=None,
+                     circuit_breaker=breaker, rate_limiter=server.RateLimiter(0, 0),
+                     HTTP_MAX_RETRIES=2, _backoff_delay=record_delay):
+            try:
+                result = await server._owm_get(server.BASE_URL, {"lat": 1, "lon": 1}, max_wait=0)
+            except Exception as e:
+                result = e
+        return result, len(requests)
+
+    def fail(request):
+        raise httpx.ConnectError("bağlantı reddedildi", request=request)
+
+    responses = iter([httpx.Response(503), httpx.Response(200, json=owm_payload())])
+
+    async def scenarios():
+        breaker = server.CircuitBreaker(2, 30)
+        result, count = await call(lambda request: next(responses), breaker)
+        checks.append(("503 yeniden denendi ve başarılı oldu", isinstance(result, dict) and count == 2))
+
+        delays.clear()
+        result, count = await call(fail, breaker)
+        checks.append(("bağlantı hatası 1 + HTTP_MAX_RETRIES kez denendi",
+                       isinstance(result, httpx.ConnectError) and count == 3 and delays == [0, 1]))
+
+        result, count = await call(lambda request: httpx.Response(404, json={}), breaker)
+        checks.append(("4xx yeniden denenmedi ve servisi sağlıklı saydı",
+                       isinstance(result, httpx.HTTPStatusError) and count == 1 and breaker.failures == 0))
+
+        await call(fail, breaker)
+        await call(fail, breaker)
+        result, count = await call(fail, breaker)
+        checks.append(("açık devre ağa çıkmadan reddetti",
+                       isinstance(result, server.CircuitOpenError) and count == 0))
+
+    asyncio.run(scenarios())
+
+    # Tam rastgele sapmalı geri çekilme her zaman [0, min(üst sınır, taban * 2^deneme)] aralığında
+    with patched(HTTP_RETRY_BASE_DELAY=0.25, HTTP_RETRY_MAX_DELAY=2.0):
+        samples = [(attempt, server._backoff_delay(attempt)) for attempt in range(10) for _ in range(200)]
+    checks.append(("geri çekilme üst sınırı aşmadı",
+                   all(0 <= delay <= min(2.0, 0.25 * 2 ** attempt) for attempt, delay in samples)))
+    checks.append(("geri çekilme rastgele dağıldı",
+                   len({round(delay, 3) for attempt, delay in samples if attempt >= 3}) > 100))
+
+    return report(checks)
+
+def test_stale_while_revalidate():
+    """Bayat kaydın sunulmasını ve arka plan yenilemesinin tekilleştirilmesini test et."""
+    print("\n♻️ Bayat kayıt yenileme testi...")
+
+    checks = []
+
+    async def scenario(revalidate: bool):
+        cache = server.TTLCache(60, 10, 3600)
+        cache_key = server._cache_key(41.01, 28.98)
+        cache.set(cache_key, server._normalize_weather(owm_payload(temp=10.0), "metric"), stored_at=time.time() - 120)
+
+        async def slow_response(request):
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json=owm_payload(temp=25.0))
+
+        requests, factory = mock_http(slow_response)
+        with patched(_create_http_client=factory, _http_client=None, _http_client_loop=None,
+                     weather_cache=cache, STALE_WHILE_REVALIDATE=revalidate,
+                     rate_limiter=server.RateLimiter(0, 0), circuit_breaker=server.CircuitBreaker(5, 30)):
+            first, second = await asyncio.gather(
+                server._canonical_weather_for_coordinates(41.01, 28.98),
+                server._canonical_weather_for_coordinates(41.01, 28.98)
+            )
+            await asyncio.gather(*list(server._refresh_tasks.values()))
+            after = await server._canonical_weather_for_coordinates(41.01, 28.98)
+        return first, second, after, len(requests)
+
+    first, second, after, calls = asyncio.run(scenario(revalidate=False))
+    checks.append(("varsayılan: süresi dolan kayıt istek sırasında yenilendi",
+                   not server.STALE_WHILE_REVALIDATE and first["sıcaklık"]["mevcut"] == 25.0 and calls == 1))
+
+    first, second, after, calls = asyncio.run(scenario(revalidate=True))
+    checks.append(("açıkken bayat kayıt beklemeden döndü",
+                   first["önbellek"]["bayat"] and second["önbellek"]["bayat"] and first["sıcaklık"]["mevcut"] == 10.0))
+    checks.append(("eşzamanlı isteklerde tek arka plan yenilemesi", calls == 1))
+    checks.append(("yenilenen veri sonraki isteğe ulaştı",
+                   not after["önbellek"]["bayat"] and after["sıcaklık"]["mevcut"] == 25.0))
+
+    return report(checks)
+
+def test_prewarmer_config():
+    """Ön ısıtmanın sıfır bütçe payı ve sınırsız dakikalık bütçeyle çalıştığını test et."""
+    print("\n🔥 Ön ısıtma ayarları testi...")
+
+    locations = [("koordinat", 41.01, 28.98), ("koordinat", 39.93, 32.86)]
+    checks = []
+
+    async def scenario():
+        # Pay 0: hata yerine ön ısıtma kapalı
+        disabled = server.Prewarmer(locations, 600, 0.0)
+        disabled.start()
+        checks.append(("pay 0 ile ön ısıtma kapalı",
+                       not disabled.enabled and disabled._task is None and disabled.interval == float("inf")))
+        checks.append(("pay 0 ile istatistikler üretildi", disabled.snapshot()["aralık_saniye"] is None))
+
+        # Dakikalık bütçe yok: aralık yalnızca TTL penceresine göre seçilir
+        with patched(OWM_CALLS_PER_MINUTE=0):
+            unlimited = server.Prewarmer(locations, 600, 0.5)
+            checks.append(("sınırsız bütçede aralık TTL'ye göre", unlimited.interval == 600 * 0.8 / 2))
+
+        # Dakikada 60 çağrının yarısı: en fazla 2 saniyede bir yenileme
+        with patched(OWM_CALLS_PER_MINUTE=60):
+            limited = server.Prewarmer(locations * 500, 600, 0.5)
+            checks.append(("bütçe payı aralığı sınırladı", limited.interval == 2.0))
+
+    asyncio.run(scenario())
+    return report(checks)
+
+def test_disk_cache():
+    """SQLite disk önbelleğinin süre, sınır, namespace ve belleğe taşıma davranışını test et."""
+    print("\n💾 Disk önbelleği testi...")
+
+    checks = []
+    value = server._normalize_weather(owm_payload(), "metric")
+
+    async def scenario(directory: str):
+        path = os.path.join(directory, "cache.sqlite3")
+
+        # stale_ttl'yi aşan kayıt okunmaz
+        expiring = server.DiskCache(path, 100, 0.1, "test")
+        await expiring.set_weather((1, 1), value)
+        fresh = await expiring.get_weather((1, 1))
+        await asyncio.sleep(0.15)
+        checks.append(("süresi dolan kayıt okunmadı", fresh is not None and await expiring.get_weather((1, 1)) is None))
+
+        # Sınır aşılınca en eski kayıtlar silinir
+        bounded = server.DiskCache(os.path.join(directory, "bounded.sqlite3"), 5, 3600, "sınır")
+        bounded.EVICT_EVERY = 4
+        for i in range(12):
+            await bounded.set_weather((i, i), value)
+        rows = await bounded._run(lambda conn: conn.execute("SELECT key FROM weather ORDER BY stored_at").fetchall())
+        checks.append(("kayıt sayısı max_entries'e indirildi",
+                       [row[0] for row in rows] == [f"sınır|{i}|{i}" for i in range(7, 12)]
+                       and bounded.evictions == 7))
+
+        # Şehir çözümlemeleri de aynı sınırla kırpılır
+        for i in range(12):
+            await bounded.set_city((f"şehir{i}", ""), i, i)
+        rows = await bounded._run(lambda conn: conn.execute("SELECT key FROM cities ORDER BY stored_at").fetchall())
+        checks.append(("şehir kayıtları max_entries'e indirildi",
+                       [row[0] for row in rows] == [f"şehir{i}|" for i in range(7, 12)]
+                       and await bounded.get_city(("şehir11", "")) == (11.0, 11.0)))
+
+        # Yazılma zamanı olmayan eski şehir tablosu açılışta yükseltilir
+        legacy_path = os.path.join(directory, "legacy.sqlite3")
+        legacy_conn = sqlite3.connect(legacy_path)
+        legacy_conn.execute("CREATE TABLE cities (key TEXT PRIMARY KEY, lat REAL NOT NULL, lon REAL NOT NULL)")
+        legacy_conn.execute("INSERT INTO cities VALUES ('eski|', 1.0, 2.0)")
+        legacy_conn.commit()
+        legacy_conn.close()
+        legacy = server.DiskCache(legacy_path, 100, 3600, "eski")
+        await legacy.set_city(("yeni", ""), 3.0, 4.0)
+        checks.append(("eski şehir tablosu yükseltildi",
+                       await legacy.get_city(("eski", "")) == (1.0, 2.0)
+                       and await legacy.get_city(("yeni", "")) == (3.0, 4.0)))
+
+        # Izgara değişince aynı indisler eski kaydı döndürmez
+        old_grid = server.DiskCache(path, 100, 3600, "v2|ızgara=0.01|yapıştırma_km=0.0")
+        new_grid = server.DiskCache(path, 100, 3600, "v2|ızgara=0.1|yapıştırma_km=0.0")
+        await old_grid.set_weather((4101, 2898), value)
+        checks.append(("farklı ızgaranın kaydı okunmadı",
+                       await old_grid.get_weather((4101, 2898)) is not None
+                       and await new_grid.get_weather((4101, 2898)) is None))
+
+        # Bellekte olmayan kayıt diskten yaşı korunarak belleğe taşınır
+        disk = server.DiskCache(path, 100, 3600, "taşıma")
+        cache_key = server._cache_key(41.01, 28.98)
+        await disk.set_weather(cache_key, value)
+        memory = server.TTLCache(600, 10, 3600)
+        requests, factory = mock_http(lambda request: httpx.Response(200, json=owm_payload()))
+        with patched(_create_http_client=factory, _http_client=None, _http_client_loop=None,
+                     disk_cache=disk, weather_cache=memory):
+            result = await server._canonical_weather_for_coordinates(41.01, 28.98)
+        promoted = memory.get_stale(cache_key)
+        checks.append(("diskteki kayıt API'ye gidilmeden döndü", not requests and result["önbellek"]["bayat"] is False))
+        checks.append(("kayıt yaşı korunarak belleğe taşındı", promoted is not None and promoted[1] < 5))
+
+        for cache in (expiring, bounded, legacy, old_grid, new_grid, disk):
+            cache._conn.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(scenario(directory))
+    return report(checks)
+
+def close_enough(left, right) -> bool:
+    """İç içe sözlük/liste değerlerini küçük kayan nokta farklarını yok sayarak karşılaştırır"""
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(close_enough(left[k], right[k]) for k in left)
+    if isinstance(left, (list, tuple)) and isinstance(right, (list, tuple)):
+        return len(left) == len(right) and all(close_enough(a, b) for a, b in zip(left, right))
+    if isinstance(left, (int, float)) and isinstance(right, (int, float)):
+        return abs(left - right) <= 0.011
+    return left == right
+
+def test_summary_engines():
+    """Toplu özetin NumPy ve saf Python ile aynı sonucu verdiğini ve bölge adlarını test et."""
+    print("\n📊 Özet motorları testi...")
+
+    results = [server._normalize_weather(owm_payload(temp=temp), "metric")
+               for temp in (-3.7, 12.25, 18.4, 25.15, 31.9, 7.05)]
+    results[2]["yağış"] = {"son_1_saat": 1.2}
+    results.insert(3, {"error": "bulunamadı"})
+    regions = ["Ege", ["Marmara"], None, "x", {"ad": "İç Anadolu"}, "", "Ege"]
+    checks = []
+
+    by_engine = {}
+    for engine, numpy_module in (("numpy", server.np), ("python", None)):
+        with patched(np=numpy_module):
+            by_engine[engine] = server.summarize_weather(results, "metric", "imperial", regions)
+    if server.np is None:
+        print("ℹ️ NumPy kurulu değil, iki çalıştırma da saf Python ile yapıldı")
+
+    numpy_summary, python_summary = by_engine["numpy"], by_engine["python"]
+    numpy_summary.pop("motor")
+    python_summary.pop("motor")
+    checks.append(("NumPy ve saf Python özetleri aynı", close_enough(numpy_summary, python_summary)))
+    checks.append(("hatalı sonuç özete katılmadı",
+                   python_summary["hatalı"] == 1 and python_summary["genel"]["nokta_sayısı"] == 6))
+    checks.append(("bölge adları metne çevrildi",
+                   set(python_summary["bölgeler"]) == {"Ege", "['Marmara']", "{'ad': 'İç Anadolu'}", "Belirtilmemiş"}))
+    checks.append(("boş bölgeler birlikte toplandı",
+                   python_summary["bölgeler"]["Belirtilmemiş"]["nokta_sayısı"] == 2))
+
+    return report(checks)
+
+def test_output_modes():
+    """minimal kipin alan alt kümesinin yalnızca hava durumu yanıtlarına uygulandığını test et."""
+    print("\n📏 Çıktı biçimi testi...")
+
+    checks = []
+    requests, factory = mock_http(lambda request: httpx.Response(200, json=owm_payload()))
+
+    async def scenario():
+        with patched(OUTPUT_MODE="minimal", _create_http_client=factory, _http_client=None,
+                     _http_client_loop=None, weather_cache=server.TTLCache(600, 10, 600)):
+            weather = json.loads(await server.get_weather_by_coordinates(41.01, 28.98))
+            checks.append(("hava durumu yanıtı alt kümeyle döndü",
+                           weather["sıcaklık"]["mevcut"] == 20.0 and "zaman" not in weather))
+
+            stats = await server.get_server_stats()
+            checks.append(("istatistikler eksiksiz ve boşluksuz döndü",
+                           "\n" not in stats and "api_kotası" in json.loads(stats)))
+
+            sites = json.loads(await server.find_nearest_sites(41.01, 28.98, k=2))
+            checks.append(("en yakın noktalar eksiksiz döndü", sites["toplam"] == len(sites["sonuçlar"]) == 2))
+
+            cities = json.loads(await server.search_cities("ist"))
+            checks.append(("şehir araması eksiksiz döndü",
+                           cities["sorgu"] == "ist" and cities["toplam"] == len(cities["sonuçlar"]) > 0))
+
+    asyncio.run(scenario())
+    return report(checks)
+
+def test_session_queries():
+    """Oturumda tekrarlanan sohbet mesajının yeniden çözümlenmediğini test et."""
+    print("\n🗂️ Oturum sorguları testi...")
+
+    checks = []
+    calls = []
+    parse_intent = server.parse_intent
+
+    def counting_parse_intent(message):
+        calls.append(message)
+        return parse_intent(message)
+
+    async def scenario():
+        session = server.ConversationSession()
+        with patched(parse_intent=counting_parse_intent):
+            first = await server._chat_reply("Merhaba!", session)
+            second = await server._chat_reply("  merhaba!", session)
+            await server._chat_reply("Fahrenheit olarak", session)
+        checks.append(("tekrarlanan mesaj yeniden çözümlenmedi", first == second and len(calls) == 2))
+        checks.append(("tercih oturuma kaydedildi", session.units == "imperial"))
+        checks.append(("son sorgular kaydedildi",
+                       [query[0] for query in session.queries] == ["merhaba!", "fahrenheit olarak"]))
+
+    asyncio.run(scenario())
+    return report(checks)
+
+def main():
+    """Ana test fonksiyonu."""
+    print("🧪 Ağ Gerektirmeyen Testler Başlıyor...\n")
+
+    tests = [
+        ("HTTP İstemcisi Testi", test_http_client_loop_change),
+        ("API Kotası Testi", test_rate_limiter),
+        ("Devre Kesici Testi", test_circuit_breaker),
+        ("Yeniden Deneme Testi", test_retries),
+        ("Bayat Kayıt Yenileme Testi", test_stale_while_revalidate),
+        ("Ön Isıtma Ayarları Testi", test_prewarmer_config),
+        ("Disk Önbelleği Testi", test_disk_cache),
+        ("Özet Motorları Testi", test_summary_engines),
+        ("Çıktı Biçimi Testi", test_output_modes),
+        ("Oturum Sorguları Testi", test_session_queries),
+    ]
+
+    passed = 0
+    total = len(tests)
+
+    for test_name, test_func in tests:
+        print(f"🔄 {test_name} çalışıyor...")
+        try:
+            if test_func():
+                passed += 1
+                print(f"✅ {test_name} başarılı!")
+            else:
+                print(f"❌ {test_name} başarısız!")
+        except Exception as e:
+            print(f"❌ {test_name} hata: {str(e)}")
+
+        print("-" * 50)
+
+    print(f"\n📊 Test Sonuçları: {passed}/{total} test başarılı")
+
+    if passed == total:
+        print("🎉 Tüm testler başarılı!")
+        return 0
+    else:
+        print("⚠️ Bazı testler başarısız!")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
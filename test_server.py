@@ -12,7 +12,17 @@ import os
 
 # Server modülünü import et
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from server import get_weather_by_coordinates, get_weather_by_city
+from server import (
+    get_weather_by_coordinates,
+    get_weather_by_city,
+    get_weather_for_locations,
+    get_weather_for_area,
+    iter_weather_for_locations,
+    get_forecast_by_coordinates,
+    search_cities,
+    find_nearest_sites,
+    get_server_stats
+)
 
 async def test_coordinates():
     """Koordinat tabanlı hava durumu testini çalıştır."""
@@ -108,6 +118,348 @@ async def test_different_units():
     
     return True
 
+async def test_connection_reuse():
+    """Paylaşılan HTTP istemcisinin bağlantıları yeniden kullandığını test et."""
+    print("\n🔌 Bağlantı havuzu testi...")
+
+    try:
+        for latitude, longitude in [(41.0082, 28.9784), (39.9334, 32.8597)]:
+            await get_weather_by_coordinates(latitude, longitude)
+
+        stats = json.loads(await get_server_stats())["http_havuzu"]
+        print(f"📊 İstek: {stats['istek_sayısı']}, açılan bağlantı: {stats['açılan_bağlantı']}")
+
+        if stats["yeniden_kullanılan_bağlantı"] < 1:
+            print("❌ Bağlantı yeniden kullanılmadı!")
+            return False
+
+        print("✅ Bağlantılar yeniden kullanılıyor")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_cache_hit():
+    """Yakın koordinatların önbellekten yanıtlandığını test et."""
+    print("\n🗄️ Önbellek testi...")
+
+    try:
+        before = json.loads(await get_server_stats())["önbellek"]["isabet"]
+
+        # Aynı ızgara hücresine düşen iki yakın nokta
+        await get_weather_by_coordinates(41.0082, 28.9784)
+        result = await get_weather_by_coordinates(41.0084, 28.9781)
+        data = json.loads(result)
+
+        if "error" in data:
+            print(f"❌ Hata: {data['error']}")
+            return False
+
+        after = json.loads(await get_server_stats())["önbellek"]["isabet"]
+        if after <= before:
+            print("❌ Önbellek isabeti olmadı!")
+            return False
+
+        print(f"✅ Önbellek isabeti: {after - before}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_request_coalescing():
+    """Eşzamanlı aynı sorguların tek API çağrısında birleştirildiğini test et."""
+    print("\n🔗 İstek birleştirme testi...")
+
+    try:
+        before = json.loads(await get_server_stats())["istek_birleştirme"]["birleştirilen"]
+
+        # İzmir koordinatları için 5 eşzamanlı istek
+        results = await asyncio.gather(*[
+            get_weather_by_coordinates(38.4237, 27.1428) for _ in range(5)
+        ])
+
+        if any("error" in json.loads(result) for result in results):
+            print("❌ İsteklerden biri hata döndürdü!")
+            return False
+
+        after = json.loads(await get_server_stats())["istek_birleştirme"]["birleştirilen"]
+        print(f"✅ Birleştirilen istek: {after - before}")
+        return after - before == 4
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_batch_locations():
+    """Toplu konum sorgusunu test et."""
+    print("\n📦 Toplu sorgu testi...")
+
+    try:
+        locations = [[41.0082, 28.9784], {"city": "Ankara", "country_code": "TR"}, [999, 999]]
+        result = await get_weather_for_locations(locations)
+        data = json.loads(result)
+
+        print(f"📊 Toplam: {data['toplam']}, başarılı: {data['başarılı']}, hatalı: {data['hatalı']}")
+
+        # Geçersiz koordinat yalnızca kendi sonucunu etkilemeli
+        if data["başarılı"] != 2 or "error" not in data["sonuçlar"][2]:
+            print("❌ Beklenmeyen sonuç!")
+            return False
+
+        print(f"✅ Sıra korundu: {data['sonuçlar'][1]['konum']['şehir']}")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_forecast():
+    """5 günlük tahmin özetini test et."""
+    print("\n📅 Hava tahmini testi...")
+
+    try:
+        result = await get_forecast_by_coordinates(41.0082, 28.9784, include_series=True)
+        data = json.loads(result)
+
+        if "error" in data:
+            print(f"❌ Hata: {data['error']}")
+            return False
+
+        print(f"✅ {data['adım_sayısı']} adım, {len(data['günlük'])} gün")
+        for day in data["günlük"]:
+            print(f"   {day['tarih']}: {day['minimum']} / {day['maksimum']}{data['birimler']['sıcaklık']}")
+
+        ilk_yagis = data["ilk_yağış"]
+        print(f"🌧️ İlk yağış: {ilk_yagis['zaman'] if ilk_yagis else 'yok'}")
+        return len(data["seriler"]["sıcaklık"]) == data["adım_sayısı"]
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_output_modes():
+    """Çıktı biçimlerini ve alan seçimini test et."""
+    print("\n🗜️ Çıktı biçimi testi...")
+
+    try:
+        pretty = await get_weather_by_coordinates(41.0082, 28.9784)
+        compact = await get_weather_by_coordinates(41.0082, 28.9784, output_mode="compact")
+        minimal = await get_weather_by_coordinates(41.0082, 28.9784, output_mode="minimal")
+        print(f"📏 pretty: {len(pretty)}, compact: {len(compact)}, minimal: {len(minimal)} karakter")
+
+        selected = json.loads(await get_weather_by_coordinates(
+            41.0082, 28.9784, fields="sıcaklık.mevcut,hava_durumu.açıklama"
+        ))
+        if "error" in selected:
+            print(f"❌ Hata: {selected['error']}")
+            return False
+
+        print(f"✅ Seçilen alanlar: {selected}")
+        return (
+            len(minimal) < len(compact) < len(pretty)
+            and set(selected) == {"sıcaklık", "hava_durumu"}
+        )
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_response_cache():
+    """Hazır yanıt önbelleğini test et."""
+    print("\n📝 Yanıt önbelleği testi...")
+
+    try:
+        first = await get_weather_by_coordinates(39.9334, 32.8597, output_mode="compact")
+        if "error" in json.loads(first):
+            print(f"❌ Hata: {json.loads(first)['error']}")
+            return False
+
+        before = json.loads(await get_server_stats())["yanıt_önbelleği"]
+        second = await get_weather_by_coordinates(39.9334, 32.8597, output_mode="compact")
+        third = await get_weather_by_coordinates(39.9334, 32.8597, output_mode="compact")
+        after = json.loads(await get_server_stats())["yanıt_önbelleği"]
+
+        print(f"📊 İsabet: {before['isabet']} → {after['isabet']}, boyut: {after['bayt']} bayt")
+        if after["isabet"] <= before["isabet"]:
+            print("❌ Hazır yanıt kullanılmadı!")
+            return False
+
+        print("✅ Tekrarlanan sorgu hazır metinden yanıtlandı")
+        return json.loads(second)["sıcaklık"] == json.loads(third)["sıcaklık"]
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_shared_unit_cache():
+    """Farklı birimlerdeki sorguların tek önbellek kaydını paylaştığını test et."""
+    print("\n🌡️ Birimden bağımsız önbellek testi...")
+
+    try:
+        before = json.loads(await get_server_stats())["istek_birleştirme"]["başlatılan"]
+
+        # Antalya koordinatları, üç farklı birimde
+        metric = json.loads(await get_weather_by_coordinates(36.8969, 30.7133, "metric"))
+        imperial = json.loads(await get_weather_by_coordinates(36.8969, 30.7133, "imperial"))
+        standard = json.loads(await get_weather_by_coordinates(36.8969, 30.7133, "standard"))
+        for data in (metric, imperial, standard):
+            if "error" in data:
+                print(f"❌ Hata: {data['error']}")
+                return False
+
+        after = json.loads(await get_server_stats())["istek_birleştirme"]["başlatılan"]
+        print(f"📡 API çağrısı: {after - before}")
+        print(f"🌡️ {metric['sıcaklık']['mevcut']}{metric['sıcaklık']['birim']} = "
+              f"{imperial['sıcaklık']['mevcut']}{imperial['sıcaklık']['birim']} = "
+              f"{standard['sıcaklık']['mevcut']}{standard['sıcaklık']['birim']}")
+
+        if after - before > 1:
+            print("❌ Birimler ayrı API çağrısı yaptı!")
+            return False
+
+        expected = metric["sıcaklık"]["mevcut"] * 9 / 5 + 32
+        if abs(imperial["sıcaklık"]["mevcut"] - expected) > 0.01 or imperial["rüzgar"]["birim"] != "mph":
+            print("❌ Birim dönüşümü hatalı!")
+            return False
+
+        print("✅ Üç birim tek önbellek kaydından yanıtlandı")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_languages():
+    """Farklı dillerdeki sorguların tek önbellek kaydını paylaştığını test et."""
+    print("\n🌍 Çok dilli açıklama testi...")
+
+    try:
+        before = json.loads(await get_server_stats())["istek_birleştirme"]["başlatılan"]
+
+        # Kayseri koordinatları, dört farklı dilde
+        results = {}
+        for language in ["tr", "en", "de", "ja"]:
+            data = json.loads(await get_weather_by_coordinates(38.7312, 35.4787, language=language))
+            if "error" in data:
+                print(f"❌ Hata: {data['error']}")
+                return False
+            results[language] = data["hava_durumu"]
+            print(f"🗣️ {language}: {data['hava_durumu']['açıklama']}")
+
+        after = json.loads(await get_server_stats())["istek_birleştirme"]["başlatılan"]
+        print(f"📡 API çağrısı: {after - before}")
+        if after - before > 1:
+            print("❌ Diller ayrı API çağrısı yaptı!")
+            return False
+
+        if len({result["kod"] for result in results.values()}) != 1:
+            print("❌ Koşul kodları farklı!")
+            return False
+
+        print("✅ Dört dil tek önbellek kaydından yanıtlandı")
+        return True
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_city_gazetteer():
+    """Çevrimdışı şehir sözlüğünü test et."""
+    print("\n🗺️ Şehir sözlüğü testi...")
+
+    try:
+        data = json.loads(await search_cities("ista", "TR"))
+        if "error" in data:
+            print(f"❌ Hata: {data['error']}")
+            return False
+
+        names = [city["ad"] for city in data["sonuçlar"]]
+        print(f"🔎 'ista' → {names}")
+
+        # Sözlükteki şehir ad sorgusu yapılmadan koordinatlarla sorgulanmalı
+        result = json.loads(await get_weather_by_city("ISTANBUL", "TR"))
+        if "error" in result:
+            print(f"❌ Hata: {result['error']}")
+            return False
+
+        print(f"✅ {result['konum']['şehir']}: {result['sıcaklık']['mevcut']}{result['sıcaklık']['birim']}")
+        return "İstanbul" in names
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_nearest_sites():
+    """En yakın nokta sorgusunu test et."""
+    print("\n📌 En yakın nokta testi...")
+
+    try:
+        data = json.loads(await find_nearest_sites(40.99, 29.03, k=3))
+        if "error" in data:
+            print(f"❌ Hata: {data['error']}")
+            return False
+
+        for site in data["sonuçlar"]:
+            print(f"   {site['ad']}, {site['ülke']}: {site['mesafe_km']} km")
+
+        nearby = json.loads(await find_nearest_sites(40.99, 29.03, k=10, radius_km=50))
+        distances = [site["mesafe_km"] for site in data["sonuçlar"]]
+        return (
+            data["sonuçlar"][0]["ad"] == "İstanbul"
+            and distances == sorted(distances)
+            and all(site["mesafe_km"] <= 50 for site in nearby["sonuçlar"])
+        )
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_area_grid():
+    """Alan örneklemesini test et."""
+    print("\n🗺️ Alan örnekleme testi...")
+
+    try:
+        data = json.loads(await get_weather_for_area(bbox=[40.8, 28.6, 41.3, 29.4], resolution=0.25))
+        if "error" in data:
+            print(f"❌ Hata: {data['error']}")
+            return False
+
+        print(f"📐 {data['satır']}×{data['sütun']} ızgara, hücreler: {data['hücreler']}")
+        for lat, row in zip(data["enlemler"], data["değişkenler"]["sıcaklık"]):
+            print(f"   {lat}: {row}")
+
+        # Aynı alan ikinci kez tamamen önbellekten doldurulmalı
+        again = json.loads(await get_weather_for_area(bbox=[40.8, 28.6, 41.3, 29.4], resolution=0.25))
+        return (
+            len(data["değişkenler"]["sıcaklık"]) == data["satır"]
+            and again["hücreler"]["önbellekten"] == again["hücreler"]["sorgu"] - again["hücreler"]["hatalı"]
+        )
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
+async def test_streaming_batch():
+    """Toplu sorgunun sonuçları tamamlandıkça üretmesini test et."""
+    print("\n🌊 Akışlı toplu sorgu testi...")
+
+    try:
+        locations = [[39.9334, 32.8597], [38.4237, 27.1428], [999, 0], [37.0000, 35.3213]]
+        seen = []
+        async for index, result in iter_weather_for_locations(locations, max_concurrency=2):
+            status = "hata" if "error" in result else result["konum"]["şehir"]
+            print(f"   #{index} tamamlandı: {status}")
+            seen.append(index)
+
+        print(f"✅ {len(seen)}/{len(locations)} sonuç alındı")
+        return sorted(seen) == list(range(len(locations)))
+
+    except Exception as e:
+        print(f"❌ Test hatası: {str(e)}")
+        return False
+
 async def main():
     """Ana test fonksiyonu."""
     print("🧪 Weather Forecast MCP Server Test Başlıyor...\n")
@@ -116,7 +468,20 @@ async def main():
         ("Koordinat Testi", test_coordinates),
         ("Şehir Testi", test_city),
         ("Geçersiz Koordinat Testi", test_invalid_coordinates),
-        ("Ölçü Birimleri Testi", test_different_units)
+        ("Ölçü Birimleri Testi", test_different_units),
+        ("Bağlantı Havuzu Testi", test_connection_reuse),
+        ("Önbellek Testi", test_cache_hit),
+        ("İstek Birleştirme Testi", test_request_coalescing),
+        ("Toplu Sorgu Testi", test_batch_locations),
+        ("Hava Tahmini Testi", test_forecast),
+        ("Çıktı Biçimi Testi", test_output_modes),
+        ("Yanıt Önbelleği Testi", test_response_cache),
+        ("Birimden Bağımsız Önbellek Testi", test_shared_unit_cache),
+        ("Çok Dilli Açıklama Testi", test_languages),
+        ("Şehir Sözlüğü Testi", test_city_gazetteer),
+        ("En Yakın Nokta Testi", test_nearest_sites),
+        ("Alan Örnekleme Testi", test_area_grid),
+        ("Akışlı Toplu Sorgu Testi", test_streaming_batch)
     ]
     
     passed = 0